@@ -1,14 +1,31 @@
 import asyncio
+import concurrent.futures
 import json
 import logging
+import os
 import time
 #import pickle
 import socket
 from event_dispatcher import dispatcher
+from game_outbox import get_outbox
+from game_sync import get_game_sync
+from lane_dispatcher import get_lane_dispatcher
+from message_framing import FrameEncoder, FrameReader, COMPRESSION_CODECS, MAX_MESSAGE_SIZE
+from wire_codec import WIRE_CODECS
+from message_router import MessageRouter
+from inbound_scheduler import InboundScheduler
+from session_stream import SessionStream
+from task_supervisor import TaskSupervisor
+from health_probe import HealthProber
+from liveness import LivenessTracker, wall_timestamp
+from transport_profile import TransportProfile, TCP_ESTABLISHED, tcp_info, tune_connection
+from lane_metrics import get_metrics, snapshot_all, write_snapshots, METRICS_FILE
 from dataclasses import dataclass
 from typing import Optional, Dict, Any
 import struct
 from datetime import datetime
+import uuid
+from collections import OrderedDict
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -20,6 +37,12 @@ def lane_call():
 lane_settings = lane_call()
 LaneID = lane_settings["Lane"]
 
+SERVER_CACHE_FILE = 'database/last_server.json'
+P2P_PORT = lane_settings.get("P2PPort", 50006)
+TRANSPORT_PROFILE = TransportProfile.from_settings(lane_settings.get("Transport"))
+P2P_MESSAGE_TYPES = {'team_move', 'pair_ready', 'frame_update', 'bowler_move'}  # Sent direct to the paired lane when linked
+P2P_ACKED_TYPES = {'team_move', 'pair_ready', 'bowler_move'}  # Re-sent via the server if the peer does not ack
+
 @dataclass
 class LaneConnectionConfig:
 	lane_id: str
@@ -29,14 +52,68 @@ class LaneConnectionConfig:
 	peer_port: Optional[int] = None
 
 class P2PLaneConnection:
-	def __init__(self, config: LaneConnectionConfig):
+	"""
+	Direct links to paired lanes, held in a ConnectionManager keyed by lane.
+	Traffic goes to peer_lane; links to earlier partners stay warm in the
+	pool until they idle out, so league re-pairing between games reuses
+	them. The dialing side introduces itself with a p2p_hello so the
+	accepting side can key the link by lane.
+	"""
+	def __init__(self, config: LaneConnectionConfig, profile: Optional[TransportProfile] = None,
+				 pool: Optional['ConnectionManager'] = None, metrics=None):
 		self.config = config
-		self.reader: Optional[asyncio.StreamReader] = None
-		self.writer: Optional[asyncio.StreamWriter] = None
+		self.pool = pool or ConnectionManager(profile)
+		self.metrics = metrics or get_metrics(config.lane_id)
+		self.peer_lane: Optional[str] = None
+		self.writer: Optional[asyncio.StreamWriter] = None  # Link to peer_lane while it is up
 		self.connected = asyncio.Event()
 		self.running = False
 		self._shutdown = asyncio.Event()
+		self._wake = asyncio.Event()  # Peer changed or its link dropped - the dialer has work to do
+		self._retry_timer = None
 		self.data_callback = None
+		self._read_tasks: Dict[str, asyncio.Task] = {}  # Pool key -> task reading that link
+		self.hello_timeout = 2.0
+		self.encoder = FrameEncoder()  # Compression is enabled from the peer's p2p_offer
+		self.stats = {'connects': 0, 'sent': 0, 'received': 0, 'reused': 0}
+	
+	@staticmethod
+	def _key(lane_id) -> str:
+		return f"lane:{lane_id}"
+	
+	@property
+	def link(self):
+		"""ConnectionStats of the link to peer_lane"""
+		conn = self.pool.get(self._key(self.peer_lane), check=False) if self.peer_lane else None
+		return conn.link if conn else None
+	
+	def set_peer(self, lane_id: str, host: Optional[str] = None, port: Optional[int] = None):
+		"""Send paired traffic to lane_id; host and port are given when this side dials"""
+		changed = self.peer_lane != lane_id
+		if self.peer_lane and changed:
+			self.pool.pin(self._key(self.peer_lane), False)  # Stays warm until it idles out
+		self.peer_lane = lane_id
+		self.config.peer_ip, self.config.peer_port = host, port
+		self.pool.pin(self._key(lane_id))
+		if self._refresh_link() and changed:
+			self.stats['reused'] += 1
+			logger.info(f"Reusing the open link to lane {lane_id}")
+		self._wake.set()
+	
+	def _refresh_link(self) -> bool:
+		"""Point writer/connected at peer_lane's pooled link; True if it is up"""
+		conn = self.pool.get(self._key(self.peer_lane)) if self.peer_lane else None
+		self.writer = conn.writer if conn else None
+		if conn:
+			self.connected.set()
+		else:
+			self.connected.clear()
+		return conn is not None
+	
+	def _wake_later(self, delay: float):
+		if self._retry_timer:
+			self._retry_timer.cancel()
+		self._retry_timer = asyncio.get_running_loop().call_later(delay, self._wake.set)
 		
 	async def start_server(self):
 		"""Start listening for peer connection"""
@@ -53,47 +130,91 @@ class P2PLaneConnection:
 			return None
 
 	async def connect_to_peer(self) -> bool:
-		"""Attempt to connect to peer lane"""
-		if not self.config.peer_ip or not self.config.peer_port:
+		"""Link to peer_lane through the pool - an open link is reused, concurrent dials share one connect"""
+		if not self.peer_lane or not self.config.peer_ip or not self.config.peer_port:
 			logger.error("Peer connection details not configured")
 			return False
-			
+		
+		key = self._key(self.peer_lane)
 		try:
-			self.reader, self.writer = await asyncio.open_connection(
-				self.config.peer_ip,
-				self.config.peer_port
-			)
-			self.connected.set()
-			logger.info(f"Connected to peer at {self.config.peer_ip}:{self.config.peer_port}")
-			return True
+			conn = await self.pool.acquire(key, self.config.peer_ip, self.config.peer_port, timeout=3.0)
 		except Exception as e:
-			logger.error(f"Failed to connect to peer: {e}")
+			logger.warning(f"Failed to connect to peer: {e}")
 			return False
+		
+		if key not in self._read_tasks:
+			logger.info(f"Connected to peer at {self.config.peer_ip}:{self.config.peer_port}")
+			conn.writer.write(self.encoder.encode({'type': 'p2p_hello', 'lane_id': self.config.lane_id}))
+			self._read_tasks[key] = asyncio.create_task(self._read_loop(key, conn, FrameReader(conn.reader)),
+														name=f'p2p_reader_{self.peer_lane}')
+		return self._refresh_link()
 
 	async def _handle_peer_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
 		"""Handle incoming peer connection"""
-		self.reader = reader
-		self.writer = writer
-		self.connected.set()
 		addr = writer.get_extra_info('peername')
 		logger.info(f"Peer connected from {addr}")
+		frames = FrameReader(reader)
+		try:
+			first = await asyncio.wait_for(frames.read_message(), timeout=self.hello_timeout)
+		except asyncio.TimeoutError:
+			first = None  # Peer without p2p_hello; assume it is the lane we are paired with
+		except Exception as e:
+			logger.error(f"Error handling peer connection: {e}")
+			writer.close()
+			return
+		if first is not None and first.get('type') == 'p2p_hello':
+			lane_id, first = str(first.get('lane_id')), None
+			if self.peer_lane is None:
+				self.set_peer(lane_id)  # Not paired yet - the first lane to dial in is the peer
+		elif self.peer_lane:
+			lane_id = self.peer_lane
+		else:
+			logger.warning(f"Unidentified peer connection from {addr}, closing")
+			writer.close()
+			return
 		
+		key = self._key(lane_id)
+		conn = self.pool.adopt(key, reader, writer)  # The newest link to a lane replaces any older one
+		self._read_tasks[key] = asyncio.current_task()
+		await self._read_loop(key, conn, frames, first)
+	
+	async def _read_loop(self, key: str, conn: 'PooledConnection', frames: FrameReader,
+						 pending: Optional[Dict[str, Any]] = None):
+		"""Read one pooled link until it drops"""
+		self.stats['connects'] += 1
+		self.metrics.counter('p2p_connects').inc()
+		bytes_received = self.metrics.counter('bytes_received', link='peer')
+		self._refresh_link()
 		try:
+			if pending is not None:
+				await self._deliver(key, pending)
 			while not self._shutdown.is_set():
-				data = await reader.readline()
-				if not data:
+				seen = frames.stats['bytes']
+				message = await frames.read_message()
+				if message is None:
 					break
-					
-				message = json.loads(data.decode())
-				if self.data_callback:
-					await self.data_callback(message)
-					
+				bytes_received.inc(frames.stats['bytes'] - seen)
+				await self._deliver(key, message)
+				
+		except asyncio.CancelledError:
+			pass
 		except Exception as e:
 			logger.error(f"Error handling peer connection: {e}")
 		finally:
-			self.connected.clear()
-			writer.close()
-			await writer.wait_closed()
+			frames.close()
+			if self._read_tasks.get(key) is asyncio.current_task():
+				del self._read_tasks[key]
+			self.pool.discard(key, conn)
+			if self.peer_lane and key == self._key(self.peer_lane) and not self._refresh_link():
+				logger.warning("Peer link closed")
+				self._wake.set()
+	
+	async def _deliver(self, key: str, message: Dict[str, Any]):
+		self.pool.touch(key)
+		self.stats['received'] += 1
+		self.metrics.counter('p2p_received', type=message.get('type')).inc()
+		if message.get('type') != 'p2p_hello' and self.data_callback:
+			await self.data_callback(message)
 
 	async def send_data(self, data: Dict[str, Any]):
 		"""Send data to peer lane"""
@@ -102,14 +223,35 @@ class P2PLaneConnection:
 			return False
 			
 		try:
-			message = json.dumps(data).encode() + b'\n'
+			message = self.encoder.encode(data)
 			self.writer.write(message)
 			await self.writer.drain()
+			self._record_sent(data, len(message))
+			return True
+		except Exception as e:
+			logger.error(f"Failed to send data to peer: {e}")
+			return False
+	
+	def send_nowait(self, data: Dict[str, Any]) -> bool:
+		"""Queue data on the peer socket from the loop thread; False if there is no live link"""
+		writer = self.writer
+		if not self.connected.is_set() or not writer or writer.is_closing():
+			return False
+		try:
+			message = self.encoder.encode(data)
+			writer.write(message)
+			self._record_sent(data, len(message))
 			return True
 		except Exception as e:
 			logger.error(f"Failed to send data to peer: {e}")
 			return False
 
+	def _record_sent(self, data: Dict[str, Any], size: int):
+		self.stats['sent'] += 1
+		self.pool.touch(self._key(self.peer_lane), size)
+		self.metrics.counter('p2p_sent', type=data.get('type')).inc()
+		self.metrics.counter('bytes_sent', link='peer').inc(size)
+
 	async def handle_p2p_data(self, data):
 		"""Handle data received from peer lane"""
 		try:
@@ -128,22 +270,27 @@ class P2PLaneConnection:
 		"""Start P2P connection handler"""
 		self.data_callback = data_callback
 		self.running = True
+		if self.peer_lane is None and self.config.peer_ip and self.config.peer_port:
+			# Peer given in the config rather than through set_peer; key it by address
+			self.set_peer(f"{self.config.peer_ip}:{self.config.peer_port}", self.config.peer_ip, self.config.peer_port)
 		
 		# Start server
 		server = await self.start_server()
 		if not server:
+			self.running = False
 			return False
 			
-		# If peer details are configured, try to connect
-		if self.config.peer_ip and self.config.peer_port:
-			await self.connect_to_peer()
-			
 		try:
 			while not self._shutdown.is_set():
-				if not self.connected.is_set():
-					await asyncio.sleep(5)
-					await self.connect_to_peer()
-				await asyncio.sleep(1)
+				# Woken when the peer changes or its link drops, not on a timer
+				await self._wake.wait()
+				self._wake.clear()
+				# Only dial when we know where the peer is; otherwise wait for it to dial us
+				if self._shutdown.is_set() or self._refresh_link() or not self.config.peer_ip or not self.config.peer_port:
+					continue
+				delay = self.pool.retry_delay(self._key(self.peer_lane))
+				if delay > 0 or not await self.connect_to_peer():
+					self._wake_later(delay or self.pool.retry_delay(self._key(self.peer_lane)))
 		except asyncio.CancelledError:
 			pass
 		finally:
@@ -154,8 +301,35 @@ class P2PLaneConnection:
 	def stop(self):
 		"""Stop P2P connection handler"""
 		self._shutdown.set()
-		if self.writer:
-			self.writer.close()
+		self._wake.set()
+		if self._retry_timer:
+			self._retry_timer.cancel()
+		# Closing the links ends their read loops
+		for key in list(self._read_tasks):
+			self.pool.discard(key)
+
+class _DiscoveryProtocol(asyncio.DatagramProtocol):
+	"""Resolves a future with (host, port) from the first valid discovery response"""
+	def __init__(self, found: asyncio.Future):
+		self.found = found
+
+	def datagram_received(self, data, addr):
+		logger.info(f"Received response from {addr}")
+		if self.found.done() or not data.startswith(b'LANE_DISCOVERY_RESPONSE'):
+			return
+		try:
+			response = json.loads(data[24:].decode())
+		except (UnicodeDecodeError, json.JSONDecodeError) as je:
+			logger.warning(f"Invalid JSON in discovery response: {je}")
+			logger.debug(f"Raw response data: {data[24:]}")
+			return
+		if response.get('type') == 'server_info' and response.get('host'):
+			host, port = response['host'], response.get('port', 50005)
+			logger.info(f"Server discovered at {host}:{port}")
+			self.found.set_result((host, port))
+
+	def error_received(self, exc):
+		logger.debug(f"Discovery socket error: {exc}")
 
 class AsyncLaneClient:
 	def __init__(self, lane_id=LaneID, host='172.20.10.2', port=50005):
@@ -166,16 +340,65 @@ class AsyncLaneClient:
 		self.port = port
 		self.HEADERSIZE = 10
 		self.p2p_connection = None
+		self.p2p_port = P2P_PORT
+		self.p2p_ack_timeout = 3.0
+		self._p2p_pending = {}  # relay_id -> (message, fallback timer)
+		self._peer_offers = {}  # lane_id -> latest p2p_offer (host, port, compression)
+		self._seen_relays = OrderedDict()  # Recent relay_ids, so a fallback copy is not applied twice
+		self.p2p_stats = {'direct': 0, 'via_server': 0, 'fallback': 0, 'duplicates': 0, 'local': 0}
+		self.metrics = get_metrics(self.lane_id)  # Counters, gauges and histograms for diagnostics
+		self.metrics_interval = 60.0  # How often the metrics file is rewritten
+		
+		# Lanes hosted on this client's loop (host_lane); a hosted lane points back at its host
+		self.lanes = {self.lane_id: self}
+		self.mux_parent = None
+		self.via_parent = False  # Hosted lane sharing the host's server connection
+		self.multiplexed = False  # Server accepted hosted lanes on our connection
+		self.dispatcher = dispatcher  # The process's own lane; hosted lanes get their own in host_lane
 		
 		# Connection state
-		self.message_queue = asyncio.Queue(maxsize=100)
+		# Pings/pongs pre-empt a backlog, stateful messages keep their order, and a full queue resyncs instead of blocking the listener
+		self.message_queue = InboundScheduler(on_overflow=self._on_inbound_overflow)
+		self.outbound_queue = asyncio.Queue(maxsize=500)  # Drained by writer_loop on the client loop
+		self.write_batch_max = 32			# Max messages coalesced into one write
+		self.write_batch_max_bytes = 64 * 1024
+		self.write_batch_window = 0.005	  # Max extra latency spent waiting for a burst
+		self.write_stats = {'batches': 0, 'messages': 0, 'bytes': 0, 'max_batch': 0, 'failed_batches': 0}
+		self._writer_task = None
 		self.reader = None
 		self.writer = None
+		self.frame_reader = None
+		self.frame_encoder = FrameEncoder()  # Compresses large frames once the server accepts zlib
+		self.transport_profile = TRANSPORT_PROFILE  # Socket options for the server and peer links
+		self.server_link = None  # ConnectionStats of the current server socket
+		self.max_message_size = MAX_MESSAGE_SIZE
+		self.idle_timeout = 90.0  # Match server's heartbeat timeout; liveness normally notices a dead link first
+		self.liveness = LivenessTracker()  # Heartbeats only when the link is quiet
+		self._heartbeat_ack = asyncio.Event()
+		self.health = HealthProber()  # Cached reachability, connect time and ping RTT
+		self.health_interval = 30.0
+		self.ping_timeout = 5.0
+		self._pings = {}  # ping_id -> Future resolved by the matching pong
+		self.session = SessionStream()  # Sequenced, replayable stream once the server supports it
+		self.session_ack_delay = 1.0  # Max time an inbound message waits for its ack to piggyback
+		self._session_ack_timer = None
 		self.running = False
 		self.registered = asyncio.Event()
 		
-		# Connection manager
-		self.connection_manager = ConnectionManager()
+		# Pooled server and peer connections; registration always takes a fresh server connection
+		self.connection_manager = ConnectionManager(self.transport_profile)
+		self.connection_manager.pin('server')
+		self._register_lock = asyncio.Lock()  # One registration at a time; the listener and heartbeat loop both retry
+		
+		# Inbound message routing
+		self.router = self._build_router()
+		
+		# Depths are read when a snapshot is taken
+		self.metrics.gauge('queue_depth', self.message_queue.qsize, queue='inbound')
+		self.metrics.gauge('queue_depth', self.outbound_queue.qsize, queue='outbound')
+		self.metrics.gauge('session_unacked', lambda: len(self.session.unacked))
+		self.metrics.gauge('p2p_pending_acks', lambda: len(self._p2p_pending))
+		self.metrics.gauge('pool_connections', lambda: len(self.connection_manager.connections))
 		
 		# Game state
 		self.paired_lane = None
@@ -184,16 +407,39 @@ class AsyncLaneClient:
 		self.current_players = []
 		self.current_frame = 0
 		self.bowler_stats = {}
+		self.game_sync = get_game_sync(self.lane_id)  # Same instance the lane's game publishes to
+		
+		# Server discovery
+		self.discovery_concurrency = 8		# Parallel TCP probes during a subnet scan
+		self.discovery_probe_timeout = 1.0
+		self.discovery_multicast_timeout = 2.0  # Per multicast attempt
+		
+		# Outbox upload state
+		self.outbox = get_outbox()
+		self.outbox_batch_size = 20
+		self.outbox_ack_timeout = 15.0
+		self.outbox_poll_interval = 2.0
+		self._outbox_acks = {}  # batch_id -> Future resolved by game_records_ack
 		
 		# Event loop
 		self.loop = None
-		self.tasks = []
+		self.supervisor = TaskSupervisor(keep_running=lambda: not self._shutdown.is_set())  # Restarts critical tasks that crash
 		self._shutdown = asyncio.Event()
 
 		logger.info(f"Initializing Async Lane Client {self.lane_id} connecting to {self.host}:{self.port}")
 	
 	async def start(self):
 		"""Start with simplified connection logic"""
+		# The server we last registered with is the most likely to still be there
+		cached = self._load_cached_server()
+		if cached and cached != (self.host, self.port):
+			configured = (self.host, self.port)
+			self.host, self.port = cached
+			logger.info(f"Attempting to connect to last known server at {self.host}:{self.port}")
+			if await self.register_with_server():
+				return True
+			self.host, self.port = configured
+		
 		logger.info(f"Attempting to connect to server at {self.host}:{self.port}")
 		
 		# Try direct connection without discovery
@@ -201,6 +447,9 @@ class AsyncLaneClient:
 
 	async def run_client(self):
 		"""Main client runner with simplified reconnection logic"""
+		# Remember the loop we run on so other threads can hand us messages
+		self.loop = asyncio.get_running_loop()
+		self.game_sync.attach(self.post_message, self.lane_id)
 		try:
 			if not await self.start():
 				logger.error("Failed to connect to server")
@@ -219,61 +468,145 @@ class AsyncLaneClient:
 			self.running = True
 			
 			# Create tasks
-			self.tasks = [
-				asyncio.create_task(self.heartbeat_loop(), name='heartbeat'),
-				asyncio.create_task(self.listen_for_messages(), name='listener'),
-				asyncio.create_task(self.monitor_tasks(), name='monitor'),
-				asyncio.create_task(self.message_processor(), name='processor')
-			]
+			self.supervisor = TaskSupervisor(keep_running=lambda: not self._shutdown.is_set())
+			supervisor = self.supervisor
+			supervisor.spawn('heartbeat', self.heartbeat_loop, critical=True)
+			supervisor.spawn('listener', self.listen_for_messages, critical=True)
+			supervisor.spawn('processor', self.message_processor, critical=True)
+			supervisor.spawn('writer', self.writer_loop, critical=True)
+			if self.mux_parent is None:
+				# The outbox is shared by every lane in the process; only the host uploads it
+				supervisor.spawn('outbox', self.outbox_uploader, critical=True)
+				supervisor.spawn('health', self.health_loop, critical=True)
+				supervisor.spawn('metrics', self.metrics_loop)
+			for lane in self.lanes.values():
+				if lane is not self:
+					self._start_hosted(lane)
 			
 			# Wait for shutdown signal
 			await self._shutdown.wait()
 			
-			# Cancel all tasks
-			for task in self.tasks:
-				if not task.done():
-					task.cancel()
+			for lane in self.lanes.values():
+				if lane is not self:
+					lane.stop()
+			if self.p2p_connection:
+				self.p2p_connection.stop()
 			
-			# Wait for all tasks to complete
-			await asyncio.gather(*self.tasks, return_exceptions=True)
+			# Cancel all tasks and wait for them to complete
+			await self.supervisor.stop()
+			await self.connection_manager.close_all()
 			
 		except Exception as e:
 			logger.error(f"Error in run_client: {e}")
 		finally:
 			self.running = False
 	
-	async def monitor_tasks(self):
-		"""Monitor the status of our running tasks"""
-		while self.running:
-			try:
-				current_tasks = asyncio.all_tasks()
-				for task in current_tasks:
-					if task.done() and not task.cancelled():
-						exception = task.exception()
-						if exception:
-							logger.error(f"Task {task.get_name()} failed with: {exception}")
-							# Consider restarting critical tasks
-							if task.get_name() == 'heartbeat':
-								logger.info("Restarting heartbeat task")
-								self.tasks.append(asyncio.create_task(self.heartbeat_loop(), name='heartbeat'))
-							elif task.get_name() == 'listener':
-								logger.info("Restarting listener task")
-								self.tasks.append(asyncio.create_task(self.listen_for_messages(), name='listener'))
-
-				await asyncio.sleep(2)
-			except Exception as e:
-				logger.error(f"Monitor error: {e}")
-				await asyncio.sleep(2)
+	def host_lane(self, lane_id, dispatcher=None):
+		"""
+		Run another lane's session on this client's loop and return its client,
+		which offers the usual post_message/post_to_lane API. Once the server
+		accepts multiplexing the lane registers over this connection and has
+		no heartbeat, listener or writer of its own; otherwise it opens its own
+		connection from the same loop. The lane's events go to its own
+		dispatcher (get_lane_dispatcher unless one is given), which its BaseUI
+		and games register with, so hosted lanes never hear each other.
+		"""
+		lane_id = str(lane_id)
+		if lane_id in self.lanes:
+			return self.lanes[lane_id]
+		lane = AsyncLaneClient(lane_id=lane_id, host=self.host, port=self.port)
+		lane.mux_parent = self
+		lane.dispatcher = dispatcher or get_lane_dispatcher(lane_id)
+		lane.p2p_port = self.p2p_port + len(self.lanes)  # Lanes in one process cannot share a listen port
+		self.lanes[lane_id] = lane
+		if self.running and self.loop and self.loop.is_running():
+			self.loop.call_soon_threadsafe(self._start_hosted, lane)
+		return lane
+	
+	def _start_hosted(self, lane):
+		self.supervisor.spawn(f'lane_{lane.lane_id}', lane.run_hosted)
+	
+	async def run_hosted(self):
+		"""Session of a lane hosted by mux_parent"""
+		parent = self.mux_parent
+		self.loop = asyncio.get_running_loop()
+		if not parent.multiplexed:
+			logger.info(f"Server does not multiplex lanes, lane {self.lane_id} opens its own connection")
+			self.host, self.port = parent.host, parent.port
+			return await self.run_client()
+		
+		self.game_sync.attach(self.post_message, self.lane_id)
+		self.via_parent = True
+		self.running = True
+		self.supervisor = TaskSupervisor(keep_running=lambda: not self._shutdown.is_set())
+		self.supervisor.spawn('processor', self.message_processor, critical=True)
+		parent._register_hosted(self)
+		try:
+			await self._shutdown.wait()
+		finally:
+			await self.supervisor.stop()
+			if self.p2p_connection:
+				self.p2p_connection.stop()
+			self.running = False
+	
+	def _register_hosted(self, lane):
+		"""Register a hosted lane over this connection; the reply arrives addressed to it"""
+		lane.registered.clear()
+		self._enqueue_outbound({
+			'type': 'registration',
+			'lane_id': lane.lane_id,
+			'via_lane': self.lane_id,
+			'listen_port': self.port
+		}, None)
+	
+	async def _on_registration_response(self, data):
+		"""Reply to a hosted lane's registration, delivered through the host's listener"""
+		if data.get('status') == 'success':
+			logger.info(f"Lane {self.lane_id} registered over the shared server connection")
+			self.registered.set()
+			self._resync_game_state()
+			return
+		logger.warning(f"Hosted registration for lane {self.lane_id} refused: {data}")
+		return False
+	
+	def _local_lane(self, lane_id):
+		"""Client of another lane hosted in this process, if any"""
+		lane = (self.mux_parent or self).lanes.get(str(lane_id))
+		return lane if lane is not self else None
+	
+	def get_task_table(self):
+		"""Supervised tasks with state, restart count, uptime and last error"""
+		return self.supervisor.table()
 	
 	async def send_message(self, message):
-		"""Send a message to the server."""
+		"""Send a message to the server. Returns True if it was written."""
+		if self.via_parent:
+			return await self.mux_parent.send_message(dict(message, from_lane=self.lane_id))
+		writer_task = self._writer_task
+		if writer_task and not writer_task.done() and asyncio.current_task() is not writer_task:
+			# Go through the writer so bursts share one write and one drain
+			future = asyncio.get_running_loop().create_future()
+			await self.outbound_queue.put((message, future))
+			return await future
+		
+		return await self._write_payload(self._frame(message))
+	
+	def _frame(self, message):
+		"""Wire bytes for a message, counted by type"""
+		data = self.frame_encoder.frame(self.session.encode(message, self.frame_encoder.serialize))
+		self.metrics.counter('messages_sent', type=message.get('type')).inc()
+		return data
+	
+	async def _write_payload(self, payload):
+		"""Write pre-serialized newline-terminated messages and drain once"""
 		try:
 			if not self.writer:
 				raise ConnectionError("No writer available to send message.")
 	
-			message_data = json.dumps(message).encode('utf-8') + b'\n'
-			self.writer.write(message_data)
+			self.writer.write(payload)
 			await self.writer.drain()
+			self._record_write(payload)
+			return True
 		except Exception as e:
 			logger.error(f"Error sending message: {e}")
 			# Attempt reconnection on failure
@@ -281,47 +614,300 @@ class AsyncLaneClient:
 				if await self.reconnect_to_server():
 					# Retry sending if reconnection succeeded
 					try:
-						message_data = json.dumps(message).encode('utf-8') + b'\n'
-						self.writer.write(message_data)
+						self.writer.write(payload)
 						await self.writer.drain()
+						self._record_write(payload)
+						return True
 					except Exception as inner_e:
 						logger.error(f"Failed to send message after reconnect: {inner_e}")
+			return False
+	
+	def _record_write(self, payload):
+		self.liveness.sent()
+		self.server_link.sent(len(payload))
+		self.metrics.counter('bytes_sent', link='server').inc(len(payload))
+	
+	def post_message(self, message):
+		"""Thread-safe fire-and-forget send. Returns False if the client loop is not running."""
+		if not self.loop or not self.loop.is_running():
+			logger.error(f"Client loop not running, dropping {message.get('type')} message")
+			return False
+		self.loop.call_soon_threadsafe(self._enqueue_outbound, message, None)
+		return True
+	
+	def submit_message(self, message):
+		"""
+		Thread-safe send returning a concurrent.futures.Future that resolves to
+		True/False once the writer task has handled the message. Await it from
+		another loop with asyncio.wrap_future, or block on .result(timeout).
+		"""
+		future = concurrent.futures.Future()
+		if not self.loop or not self.loop.is_running():
+			future.set_exception(ConnectionError("Client loop not running"))
+			return future
+		self.loop.call_soon_threadsafe(self._enqueue_outbound, message, future)
+		return future
+	
+	def _enqueue_outbound(self, message, future):
+		"""Runs on the client loop: put a message on the bounded outbound queue"""
+		if self.via_parent:
+			return self.mux_parent._enqueue_outbound(dict(message, from_lane=self.lane_id), future)
+		try:
+			self.outbound_queue.put_nowait((message, future))
+		except asyncio.QueueFull:
+			logger.error(f"Outbound queue full ({self.outbound_queue.qsize()}), dropping {message.get('type')} message")
+			if future and not future.done():
+				future.set_exception(asyncio.QueueFull())
+	
+	def pair_with_lane(self, lane_id):
+		"""Thread-safe: open a direct link to the paired lane for league traffic"""
+		if not self.loop or not self.loop.is_running():
+			logger.error("Client loop not running, cannot pair lanes")
+			return False
+		self.loop.call_soon_threadsafe(self._start_pairing, str(lane_id))
+		return True
+	
+	def _start_pairing(self, lane_id):
+		self.paired_lane = lane_id
+		if self._local_lane(lane_id):
+			logger.info(f"Paired lane {lane_id} runs in this process, league traffic stays local")
+			return
+		if self.p2p_connection is None:
+			config = LaneConnectionConfig(lane_id=self.lane_id, eth_ip='0.0.0.0', eth_port=self.p2p_port)
+			self.p2p_connection = P2PLaneConnection(config, self.transport_profile, self.connection_manager, self.metrics)
+			self.supervisor.spawn('p2p', lambda: self.p2p_connection.start(self._on_p2p_message))
+		self._apply_peer_offer(lane_id)
+		
+		# Tell the peer where to reach us; the server relays this like any lane_command
+		logger.info(f"Offering direct link to paired lane {lane_id}")
+		self._enqueue_outbound({
+			'type': 'lane_command',
+			'lane_id': lane_id,
+			'data': {'type': 'p2p_offer', 'lane_id': self.lane_id, 'host': self.get_local_ip(), 'port': self.p2p_port,
+					 'compression': COMPRESSION_CODECS, 'codecs': WIRE_CODECS}
+		}, None)
+	
+	async def _on_p2p_offer(self, data):
+		offer = data['data']
+		peer = str(offer.get('lane_id'))
+		self._peer_offers[peer] = offer
+		if peer == self.paired_lane:
+			self._apply_peer_offer(peer)
+	
+	def _apply_peer_offer(self, peer):
+		"""The lower-numbered lane dials so the pair does not open two links"""
+		if not self.p2p_connection:
+			return
+		offer = self._peer_offers.get(peer, {})
+		host, port = offer.get('host'), offer.get('port')
+		if not host or not port:
+			self.p2p_connection.set_peer(peer)
+			return
+		self.p2p_connection.encoder.negotiate(offer.get('compression'))
+		self.p2p_connection.encoder.negotiate_codec(offer.get('codecs'))
+		try:
+			dials = int(self.lane_id) < int(peer)
+		except ValueError:
+			dials = self.lane_id < peer
+		if dials:
+			logger.info(f"Paired lane {peer} reachable at {host}:{port}, connecting directly")
+			self.p2p_connection.set_peer(peer, host, port)
+		else:
+			self.p2p_connection.set_peer(peer)
+	
+	def post_to_lane(self, target_lane, message_type, data):
+		"""Thread-safe send to another lane: direct to the paired lane when linked, otherwise via the server"""
+		if not self.loop or not self.loop.is_running():
+			logger.error(f"Client loop not running, dropping {message_type} for lane {target_lane}")
+			return False
+		self.loop.call_soon_threadsafe(self._route_to_lane, str(target_lane), message_type, data)
+		return True
+	
+	def _route_to_lane(self, target_lane, message_type, data):
+		message = {'type': 'lane_command', 'lane_id': target_lane, 'data': data}
+		local = self._local_lane(target_lane)
+		if local and local.message_queue.put_nowait(dict(message, from_lane=self.lane_id)):
+			self._count_route('local')
+			return
+		p2p = self.p2p_connection
+		if p2p and target_lane == self.paired_lane and message_type in P2P_MESSAGE_TYPES and isinstance(data, dict):
+			relay_id = None
+			if message_type in P2P_ACKED_TYPES:
+				relay_id = uuid.uuid4().hex
+				message['data'] = dict(data, relay_id=relay_id)
+			if p2p.send_nowait(message):
+				self._count_route('direct')
+				if relay_id:
+					timer = self.loop.call_later(self.p2p_ack_timeout, self._p2p_fallback, relay_id)
+					self._p2p_pending[relay_id] = (message, timer)
+				return
+		self._count_route('via_server')
+		self._enqueue_outbound(message, None)
+	
+	def _count_route(self, route):
+		self.p2p_stats[route] += 1
+		self.metrics.counter('lane_messages', route=route).inc()
+	
+	def _p2p_fallback(self, relay_id):
+		"""No ack from the peer in time - send the same message through the server"""
+		pending = self._p2p_pending.pop(relay_id, None)
+		if pending:
+			logger.warning(f"No ack for {pending[0]['data'].get('type')} from paired lane, sending via server")
+			self._count_route('fallback')
+			self._enqueue_outbound(pending[0], None)
+	
+	async def _on_p2p_message(self, message):
+		"""
+		Paired-lane game traffic joins the normal inbound path. The listener
+		is open to the whole LAN, so anything else - server messages above
+		all - is dropped rather than routed.
+		"""
+		if message.get('type') == 'p2p_ack':
+			pending = self._p2p_pending.pop(message.get('relay_id'), None)
+			if pending:
+				pending[1].cancel()
+			return
+		message_data = message.get('data')
+		if message.get('type') != 'lane_command' or not isinstance(message_data, dict) or message_data.get('type') not in P2P_MESSAGE_TYPES:
+			inner = message_data.get('type') if isinstance(message_data, dict) else None
+			logger.warning(f"Dropping {message.get('type')}{f'/{inner}' if inner else ''} from P2P link, only paired lane game traffic is accepted")
+			self.metrics.counter('p2p_rejected').inc()
+			return
+		if message_data.get('relay_id'):
+			self.p2p_connection.send_nowait({'type': 'p2p_ack', 'relay_id': message_data['relay_id']})
+		await self.message_queue.put(message)
+	
+	def _is_duplicate_relay(self, message_data):
+		"""True if this relayed message already arrived by the other path"""
+		relay_id = message_data.get('relay_id')
+		if not relay_id:
+			return False
+		if relay_id in self._seen_relays:
+			self.p2p_stats['duplicates'] += 1
+			return True
+		self._seen_relays[relay_id] = None
+		if len(self._seen_relays) > 256:
+			self._seen_relays.popitem(last=False)
+		return False
+	
+	async def writer_loop(self):
+		"""
+		Single writer task for outbound messages. Messages queued within
+		write_batch_window of each other are coalesced (up to write_batch_max
+		messages / write_batch_max_bytes) into one write and one drain, in
+		queue order.
+		"""
+		self._writer_task = asyncio.current_task()
+		while not self._shutdown.is_set():
+			futures = []
+			try:
+				batch = [await self.outbound_queue.get()]
+				if self.write_batch_window > 0 and self.outbound_queue.empty():
+					# Give a burst a moment to arrive instead of draining per message
+					await asyncio.sleep(self.write_batch_window)
+				
+				payload = []
+				size = 0
+				while True:
+					message, future = batch[-1]
+					try:
+						data = self._frame(message)
+						payload.append(data)
+						size += len(data)
+						futures.append(future)
+					except (TypeError, ValueError) as e:
+						logger.error(f"Cannot serialize {message.get('type')} message: {e}")
+						if future and not future.done():
+							future.set_exception(e)
+					if len(batch) >= self.write_batch_max or size >= self.write_batch_max_bytes:
+						break
+					try:
+						batch.append(self.outbound_queue.get_nowait())
+					except asyncio.QueueEmpty:
+						break
+				
+				try:
+					sent = await self._write_payload(b''.join(payload)) if payload else False
+					self._record_write_batch(len(payload), size, sent)
+					for future in futures:
+						if future and not future.done():
+							future.set_result(sent)
+				except Exception as e:
+					for future in futures:
+						if future and not future.done():
+							future.set_exception(e)
+				finally:
+					for _ in batch:
+						self.outbound_queue.task_done()
+			except asyncio.CancelledError:
+				# Don't leave senders of the in-flight batch waiting forever
+				for future in futures:
+					if future and not future.done():
+						future.cancel()
+				break
+			except Exception as e:
+				logger.error(f"Writer loop error: {e}")
+				await asyncio.sleep(1)
+		self._writer_task = None
+	
+	def _record_write_batch(self, messages, size, sent):
+		stats = self.write_stats
+		stats['batches'] += 1
+		stats['messages'] += messages
+		stats['bytes'] += size
+		stats['max_batch'] = max(stats['max_batch'], messages)
+		if not sent:
+			stats['failed_batches'] += 1
+		if messages > 1:
+			logger.debug(f"Coalesced {messages} messages ({size} bytes) into one write")
+	
+	def get_write_stats(self):
+		"""Outbound batching counters, including the average batch size"""
+		stats = dict(self.write_stats)
+		stats['avg_batch'] = round(stats['messages'] / stats['batches'], 2) if stats['batches'] else 0
+		stats['queued'] = self.outbound_queue.qsize()
+		return stats
 
 	async def register_with_server(self):
+		"""Register over a fresh pooled connection; a failed attempt drops that connection"""
+		async with self._register_lock:
+			if self.registered.is_set() and self.writer and not self.writer.is_closing():
+				return True  # A concurrent attempt already registered
+			with self.metrics.timer('registration_ms'):
+				registered = await self._register()
+			self.metrics.counter('registrations', result='ok' if registered else 'failed').inc()
+			if registered:
+				return True
+			self.connection_manager.discard('server')
+			return False
+	
+	async def _register(self):
 		try:
 			logger.info(f"Attempting to connect to server at {self.host}:{self.port}")
 			
 			# Print network information for debugging
-			try:
-				local_ip = self.get_local_ip()
-				logger.info(f"Client local IP: {local_ip}")
-				logger.info(f"Client is running on lane_id: {self.lane_id}")
-				
-				# Try to check if server port is reachable using a socket
-				sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-				sock.settimeout(2)
-				result = sock.connect_ex((self.host, self.port))
-				if result == 0:
-					logger.info(f"Port {self.port} on {self.host} is OPEN and reachable")
-				else:
-					logger.error(f"Port {self.port} on {self.host} is NOT reachable (error code: {result})")
-				sock.close()
-			except Exception as net_e:
-				logger.error(f"Network diagnostics error: {net_e}")
+			local_ip = await self.health.local_ip()
+			logger.info(f"Client local IP: {local_ip}")
+			logger.info(f"Client is running on lane_id: {self.lane_id}")
 			
-			# Try to establish connection with debug info
+			# The connection itself is the reachability probe; its timing feeds the health cache
 			try:
 				logger.info("Opening connection...")
-				connection_future = asyncio.open_connection(self.host, self.port)
-				self.reader, self.writer = await asyncio.wait_for(connection_future, timeout=10.0)
-				logger.info("Connection opened successfully")
+				conn = await self.connection_manager.acquire('server', self.host, self.port, timeout=10.0, fresh=True)
+				self.reader, self.writer, self.server_link = conn.reader, conn.writer, conn.link
+				self.metrics.histogram('connect_ms', link='server').observe(conn.connect_ms or 0)
+				probe = self.health.record(self.host, self.port, True, conn.connect_ms)
+				logger.info(f"Connection opened successfully in {probe.connect_ms} ms")
 			except asyncio.TimeoutError:
+				self.health.record(self.host, self.port, False, error="connect timed out")
 				logger.error("Connection timed out after 10 seconds")
 				return False
 			except ConnectionRefusedError:
+				self.health.record(self.host, self.port, False, error="connection refused")
 				logger.error("Connection refused - server not running or firewall blocking")
 				return False
 			except Exception as conn_e:
+				self.health.record(self.host, self.port, False, error=str(conn_e))
 				logger.error(f"Connection failed: {type(conn_e).__name__}: {conn_e}")
 				return False
 				
@@ -340,7 +926,11 @@ class AsyncLaneClient:
 				"type": "registration",
 				"lane_id": self.lane_id,
 				"listen_port": self.port,
-				"client_ip": local_ip
+				"client_ip": local_ip,
+				"session": self.session.resume_info(),
+				"compression": COMPRESSION_CODECS,
+				"codecs": WIRE_CODECS,
+				"multiplex": True
 			}
 			
 			logger.info(f"Sending registration data: {registration_data}")
@@ -362,7 +952,26 @@ class AsyncLaneClient:
 				
 				if response.get("status") == "success":
 					logger.info(f"Lane {self.lane_id} successfully registered")
+					if self.frame_encoder.negotiate(response.get("compression")):
+						logger.info(f"Server accepts compressed frames over {self.frame_encoder.threshold} bytes")
+					if self.frame_encoder.negotiate_codec(response.get("codecs")):
+						logger.info("Server accepts binary frames")
+					replay = self.session.on_registered(response)
+					if replay is not None:
+						# Resumed: the server already has everything it acked, send the rest
+						if replay:
+							logger.info(f"Session resumed, replaying {len(replay)} unacknowledged messages")
+							self.writer.write(b''.join(self.frame_encoder.frame(line) for line in replay))
+							await self.writer.drain()
+					self.multiplexed = bool(response.get("multiplex"))
+					self.liveness.reset()
 					self.registered.set()
+					self._save_cached_server()
+					if replay is None:
+						self._resync_game_state()
+					for lane in self.lanes.values():
+						if lane.via_parent:
+							self._register_hosted(lane)
 					return True
 				else:
 					logger.warning(f"Unexpected server response: {response}")
@@ -400,12 +1009,11 @@ class AsyncLaneClient:
 				await asyncio.sleep(1)  # Prevent tight loop on errors
 	
 	async def heartbeat_loop(self):
-		"""Improved heartbeat with better error handling and logging"""
+		"""Keeps the lane registered, and heartbeats only when the link has gone quiet"""
 		retry_count = 0
 		max_retries = 5
 		base_delay = 1
 		max_delay = 30
-		heartbeat_interval = 30  # Send heartbeat every 30 seconds
 		
 		logger.info("Starting heartbeat loop")
 		
@@ -415,7 +1023,9 @@ class AsyncLaneClient:
 				if not self.registered.is_set():
 					if retry_count >= max_retries:
 						logger.info("Maximum registration retries reached, rediscovering server")
-						self.host, self.port = await self.discover_server()
+						new_host, new_port = await self.discover_server()
+						if new_host:
+							self.host, self.port = new_host, new_port
 						retry_count = 0
 					
 					logger.info(f"Not registered, attempting to register (attempt {retry_count+1})")
@@ -429,7 +1039,18 @@ class AsyncLaneClient:
 						logger.info("Registration successful")
 						retry_count = 0
 				
-				# Send heartbeat if registered
+				# Any traffic proves the link is alive; heartbeat only once it has been quiet
+				action, delay = self.liveness.poll()
+				if action == 'wait':
+					await asyncio.sleep(delay)
+					continue
+				if action == 'dead':
+					logger.warning(f"Server missed {self.liveness.max_missed} heartbeats, dropping the connection")
+					self.liveness.reset()
+					if self.writer and not self.writer.is_closing():
+						self.writer.close()  # The listener sees EOF and reconnects
+					continue
+				
 				try:
 					logger.debug("Sending heartbeat")
 					await self.send_heartbeat()
@@ -444,9 +1065,7 @@ class AsyncLaneClient:
 						logger.warning(f"Multiple heartbeat failures ({retry_count}), attempting to reconnect")
 						self.registered.clear()  # Mark as not registered to trigger reconnection
 						retry_count = 0
-				
-				# Wait for the next heartbeat interval
-				await asyncio.sleep(heartbeat_interval)
+					await asyncio.sleep(self.liveness.min_interval)
 				
 			except asyncio.CancelledError:
 				logger.info("Heartbeat loop cancelled")
@@ -468,38 +1087,19 @@ class AsyncLaneClient:
 			heartbeat_message = {
 				'type': 'heartbeat',
 				'lane_id': self.lane_id,
-				'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+				'timestamp': wall_timestamp()
 			}
 			
-			# Send the heartbeat
+			# The listener owns the reader, so wait for it to see the response
+			self._heartbeat_ack.clear()
 			await self.send_message(heartbeat_message)
 			
-			# Wait for a response with timeout
 			try:
-				# Use a separate task for the read to allow timeout
-				read_task = asyncio.create_task(self.reader.readline())
-				response_data = await asyncio.wait_for(read_task, timeout=5.0)
-				
-				if not response_data:
-					logger.warning("Empty response to heartbeat")
-					return False
-					
-				response = json.loads(response_data.decode('utf-8'))
-				
-				# Check if it's a proper heartbeat response
-				if response.get('type') == 'heartbeat_response':
-					return True
-					
-				# If we got some other response, something's wrong
-				logger.warning(f"Unexpected response to heartbeat: {response.get('type')}")
-				return False
-					
+				await asyncio.wait_for(self._heartbeat_ack.wait(), timeout=5.0)
+				return True
 			except asyncio.TimeoutError:
 				logger.warning("Heartbeat response timeout")
 				return False
-			except json.JSONDecodeError:
-				logger.warning("Invalid JSON in heartbeat response")
-				return False
 		except Exception as e:
 			logger.error(f"Error checking connection: {e}")
 			return False
@@ -512,21 +1112,16 @@ class AsyncLaneClient:
 		max_delay = 30
 		
 		logger.info(f"Attempting to reconnect to server at {self.host}:{self.port}...")
+		self.metrics.counter('reconnects').inc()
 		
 		while retry_count < max_retries and not self._shutdown.is_set():
 			try:
-				# Close existing connection if any
-				if self.writer:
-					try:
-						if not self.writer.is_closing():
-							self.writer.close()
-							await self.writer.wait_closed()
-					except Exception as close_e:
-						logger.warning(f"Error closing existing writer: {close_e}")
+				if self.registered.is_set() and self.writer and not self.writer.is_closing():
+					return True  # The heartbeat loop registered again meanwhile
 				
 				# Before attempting reconnection, attempt to rediscover the server
 				# This helps if the server has changed IP or port
-				if retry_count > 2:  # Only try rediscovery after a few direct reconnection attempts
+				if retry_count > 0:  # Discovery is cheap now, so only give the old address one try
 					logger.info("Attempting to rediscover server...")
 					new_host, new_port = await self.discover_server()
 					if new_host and new_port:
@@ -535,20 +1130,14 @@ class AsyncLaneClient:
 							self.host = new_host
 							self.port = new_port
 				
-				# Create new connection with timeout
-				logger.info(f"Opening connection to {self.host}:{self.port}...")
-				connect_task = asyncio.open_connection(self.host, self.port)
-				self.reader, self.writer = await asyncio.wait_for(connect_task, timeout=10.0)
-				
-				logger.info("Reconnected to server, attempting registration")
-				
-				# Re-register
+				# Registration replaces the pooled server connection with a fresh one
+				logger.info(f"Reconnecting to {self.host}:{self.port} and registering...")
 				registration_success = await self.register_with_server()
 				if registration_success:
 					logger.info("Successfully reconnected and registered with server")
 					return True
 				else:
-					logger.warning("Reconnected but registration failed")
+					logger.warning("Reconnection or registration failed")
 					retry_count += 1
 			except asyncio.TimeoutError:
 				logger.warning(f"Connection attempt timed out (attempt {retry_count+1}/{max_retries})")
@@ -570,36 +1159,87 @@ class AsyncLaneClient:
 		
 		return False
 	
+	def _schedule_session_ack(self):
+		"""Ack received messages explicitly if no outbound message carries the ack first"""
+		if self._session_ack_timer is None:
+			self._session_ack_timer = asyncio.get_running_loop().call_later(self.session_ack_delay, self._flush_session_ack)
+	
+	def _flush_session_ack(self):
+		self._session_ack_timer = None
+		if self.session.needs_ack():
+			self._enqueue_outbound(self.session.ack_message(), None)
+	
+	def get_compression_stats(self):
+		"""Frame compression savings and binary frame counts on the server link and the peer link"""
+		stats = {'server': dict(self.frame_encoder.stats, enabled=self.frame_encoder.compress, binary_enabled=self.frame_encoder.binary)}
+		if self.frame_reader:
+			stats['server']['received_compressed'] = self.frame_reader.stats['compressed']
+			stats['server']['received_binary'] = self.frame_reader.stats['binary']
+		if self.p2p_connection:
+			encoder = self.p2p_connection.encoder
+			stats['peer'] = dict(encoder.stats, enabled=encoder.compress, binary_enabled=encoder.binary)
+		return stats
+	
+	def get_transport_stats(self):
+		"""Socket options applied and traffic/TCP figures for the server and peer connections"""
+		stats = {}
+		if self.server_link:
+			stats['server'] = self.server_link.snapshot()
+			if self.frame_reader:
+				stats['server']['bytes_received'] = self.frame_reader.stats['bytes']
+		if self.p2p_connection and self.p2p_connection.link:
+			stats['peer'] = self.p2p_connection.link.snapshot()
+		return stats
+	
+	def get_pool_stats(self):
+		"""Pooled server/peer connections with reuse, eviction and failure counters"""
+		return self.connection_manager.get_stats()
+	
+	def get_liveness_stats(self):
+		"""Heartbeat counters, the current adaptive interval and idle times"""
+		return self.liveness.get_stats()
+	
+	def get_session_stats(self):
+		"""Resumption counters with the current replay buffer depth"""
+		stats = dict(self.session.stats)
+		stats.update(enabled=self.session.enabled, unacked=len(self.session.unacked), last_received=self.session.last_received)
+		return stats
+	
+	def _get_frame_reader(self):
+		"""Frame reader for the current server connection, replaced after a reconnect"""
+		if self.frame_reader is None or self.frame_reader.reader is not self.reader:
+			if self.frame_reader:
+				self.frame_reader.close()
+			self.frame_reader = FrameReader(
+				self.reader,
+				max_message_size=self.max_message_size,
+				idle_timeout=self.idle_timeout,
+				on_idle=self._on_server_idle
+			)
+		return self.frame_reader
+	
+	def _on_server_idle(self):
+		"""Nothing heard from the server for idle_timeout - drop the connection so the listener reconnects"""
+		logger.warning(f"Server silent for {self.idle_timeout} seconds, closing connection")
+		if self.writer and not self.writer.is_closing():
+			self.writer.close()
+	
 	async def receive_message(self):
-		"""Receive a message from the server with enhanced debugging"""
+		"""Receive a message from the server"""
 		try:
 			if not self.reader:
 				logger.warning("Receive_message called with no reader")
 				return None
 				
-			logger.debug("Reading from server...")
-			data = await self.reader.readline()
-			
-			if not data:
-				logger.debug("Received empty data")
+			message = await self._get_frame_reader().read_message()
+			if message is None:
+				logger.debug("Connection closed while reading")
 				return None
-	
-			# Log raw data
-			logger.debug(f"Raw data received: {data[:50]}...")
-			
-			# Decode and parse
-			message_str = data.decode('utf-8').strip()
-			message = json.loads(message_str)
 			logger.debug(f"Parsed message with type: {message.get('type')}")
-			
 			return message
 			
 		except asyncio.CancelledError:
 			raise
-		except json.JSONDecodeError as jde:
-			logger.error(f"JSON decode error: {jde}")
-			logger.error(f"Problematic data: {data.decode('utf-8', errors='replace')}")
-			return None
 		except Exception as e:
 			logger.error(f"Error receiving message: {e}")
 			return None
@@ -614,110 +1254,138 @@ class AsyncLaneClient:
 			message = {
 				'type': 'heartbeat', 
 				'lane_id': self.lane_id,
-				'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+				'timestamp': wall_timestamp()
 			}
 			
-			logger.debug(f"Sending heartbeat with timestamp: {message['timestamp']}")
-			
 			# Send the message
-			await self.send_message(message)
+			if not await self.send_message(message):
+				raise ConnectionError("Heartbeat was not written")
+			self.liveness.heartbeat_sent()
 			return True
 		except Exception as e:
 			logger.error(f"Error sending heartbeat: {e}")
 			raise  # Re-raise to allow the heartbeat_loop to handle it
 		
+	def _build_router(self):
+		"""Routing table for server messages; anything unlisted is dispatched as an event"""
+		router = MessageRouter(default=self._dispatch_generic)
+		router.register("heartbeat_response", self._on_heartbeat_response)
+		router.register("registration_response", self._on_registration_response)
+		router.register("ping", self._on_ping)
+		router.register("pong", self._on_pong)
+		router.register("heartbeat", self._on_heartbeat)
+		router.register("game_records_ack", self._on_game_records_ack)
+		
+		# STANDARDIZED GAME HANDLING - direct or wrapped in a lane_command
+		router.register("quick_game", self.handle_quick_game)
+		router.register("league_game", self._on_league_game)
+		router.register("pre_bowl", self._on_pre_bowl)
+		for game_type in ("quick_game", "league_game", "pre_bowl"):
+			router.register("lane_command", self._on_game_command, inner_type=game_type)
+		router.register("lane_command", self._on_lane_command)
+		router.register("lane_command", self._on_p2p_offer, inner_type="p2p_offer")
+		
+		# Full game snapshots, requested when the server misses a delta
+		for request_type in ("game_sync_request", "game_data_request"):
+			router.register(request_type, self.handle_game_data_request)
+			router.register("lane_command", self.handle_game_data_request, inner_type=request_type)
+		return router
+	
 	async def process_message(self, data):
-		"""Process incoming messages with standardized quick_game handling."""
-		try:
-			message_type = data.get('type')
-			message_data = data.get('data')
-			
-			logger.info(f"Processing message of type: {message_type}")
-			if message_data:
-				logger.info(f"Message data sample: {json.dumps(message_data)[:100]}...")
-			
-			if message_type == "heartbeat_response":
-				logger.debug(f"Received heartbeat response: {data}")
-				return True
-				
-			if message_type == "ping":
-				logger.info("Received ping, sending pong")
-				pong_message = {
-					'type': 'pong',
-					'lane_id': self.lane_id,
-					'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-				}
-				await self.send_message(pong_message)
-				return True
-				
-			if message_type == "heartbeat":
-				logger.debug("Received heartbeat, ignoring.")
-				return True
-				
-			# STANDARDIZED GAME HANDLING
-			if message_type in ["quick_game", "league_game", "pre_bowl"]:
-				logger.info(f"*** RECEIVED {message_type.upper()} ***")
-				
-				# Handle based on message type
-				if message_type == "quick_game":
-					await self.handle_quick_game(data)
-				elif message_type == "league_game":
-					# For league_game, the actual data might be inside the data field
-					if message_data and isinstance(message_data, dict):
-						await dispatcher.dispatch_event("league_game", message_data)
-					else:
-						await dispatcher.dispatch_event("league_game", data)
-				elif message_type == "pre_bowl":
-					await dispatcher.dispatch_event("pre_bowl", data)
-				
-				return True
-			
-			# Handle lane_command messages
-			if message_type == "lane_command" and isinstance(message_data, dict):
-				inner_type = message_data.get('type')
-				logger.info(f"Received lane_command with inner type: {inner_type}")
-				
-				# For game commands, use their specific handlers
-				if inner_type in ["quick_game", "league_game", "pre_bowl"]:
-					logger.info(f"*** RECEIVED {inner_type.upper()} VIA LANE_COMMAND ***")
-					
-					# Create a standardized message format
-					standardized_message = {
-						'type': inner_type,
-						'data': message_data
-					}
-					
-					# Recursively process with the standardized format
-					return await self.process_message(standardized_message)
-				
-				# For other command types
-				if inner_type:
-					logger.info(f"Dispatching {inner_type} event")
-					await dispatcher.dispatch_event(inner_type, message_data)
-					return True
-			
-			# For other message types, try to dispatch the event
-			try:
-				if message_type:
-					logger.info(f"Dispatching generic event: {message_type}")
-					await dispatcher.dispatch_event(message_type, message_data or data)
-					return True
-			except Exception as dispatch_e:
-				logger.error(f"Error dispatching event {message_type}: {dispatch_e}")
-			
+		"""Route an incoming message to its registered handler"""
+		logger.info(f"Processing message of type: {data.get('type')}")
+		return await self.router.route(data)
+	
+	async def _on_heartbeat_response(self, data):
+		logger.debug(f"Received heartbeat response: {data}")
+		self._heartbeat_ack.set()
+	
+	async def _on_ping(self, data):
+		logger.info("Received ping, sending pong")
+		pong_message = {
+			'type': 'pong',
+			'lane_id': self.lane_id,
+			'timestamp': wall_timestamp()
+		}
+		if data.get('ping_id'):
+			pong_message['ping_id'] = data['ping_id']
+		await self.send_message(pong_message)
+	
+	async def _on_pong(self, data):
+		"""Answer to measure_rtt; a pong without ping_id answers the oldest outstanding ping"""
+		ping_id = data.get('ping_id')
+		future = self._pings.get(ping_id) if ping_id else next(iter(self._pings.values()), None)
+		if future and not future.done():
+			future.set_result(True)
+	
+	async def _on_heartbeat(self, data):
+		logger.debug("Received heartbeat, ignoring.")
+	
+	async def _on_game_records_ack(self, data):
+		await self.handle_game_records_ack(data.get('data') or data)
+	
+	async def _on_league_game(self, data):
+		logger.info("*** RECEIVED LEAGUE_GAME ***")
+		# For league_game, the actual data might be inside the data field
+		message_data = data.get('data')
+		if message_data and isinstance(message_data, dict):
+			await self._dispatch("league_game", message_data)
+		else:
+			await self._dispatch("league_game", data)
+	
+	async def _on_pre_bowl(self, data):
+		logger.info("*** RECEIVED PRE_BOWL ***")
+		await self._dispatch("pre_bowl", data)
+	
+	async def _on_game_command(self, data):
+		"""Game commands sent as a lane_command are unwrapped to the standard format"""
+		message_data = data['data']
+		inner_type = message_data['type']
+		logger.info(f"*** RECEIVED {inner_type.upper()} VIA LANE_COMMAND ***")
+		return await self.router.route({'type': inner_type, 'data': message_data})
+	
+	async def _on_lane_command(self, data):
+		message_data = data.get('data')
+		inner_type = message_data.get('type') if isinstance(message_data, dict) else None
+		if not inner_type:
+			return await self._dispatch_generic(data)
+		if self._is_duplicate_relay(message_data):
+			logger.info(f"Ignoring duplicate {inner_type} from paired lane")
+			return
+		logger.info(f"Dispatching {inner_type} event")
+		await self._dispatch(inner_type, message_data)
+	
+	async def _dispatch_generic(self, data):
+		"""Fallback route: dispatch the message type as an event"""
+		message_type = data.get('type')
+		if not message_type:
 			logger.warning(f"Unhandled message type: {message_type}")
 			return False
-			
-		except Exception as e:
-			logger.error(f"Error in process_message: {e}")
-			import traceback
-			logger.error(f"Traceback: {traceback.format_exc()}")
-			return False
+		logger.info(f"Dispatching generic event: {message_type}")
+		await self._dispatch(message_type, data.get('data') or data)
+	
+	async def _dispatch(self, event, data):
+		"""Hand an event to the game's listeners, counting and timing it"""
+		start = time.perf_counter()
+		try:
+			await self.dispatcher.dispatch_event(event, data)
+		except Exception:
+			self.metrics.counter('event_errors', event=event).inc()
+			raise
+		finally:
+			self.metrics.counter('events_dispatched', event=event).inc()
+			self.metrics.histogram('event_dispatch_ms', event=event).observe((time.perf_counter() - start) * 1000)
+	
+	def get_route_stats(self):
+		"""Per-message-type counts and handler timing"""
+		return self.router.get_stats()
 
 	async def handle_quick_game(self, data):
 		"""Handle quick game command with increased logging."""
 		try:
-			logger.info(f"Received quick_game command with data: {json.dumps(data)[:200]}...")
+			logger.info("*** RECEIVED QUICK_GAME ***")
+			if logger.isEnabledFor(logging.DEBUG):
+				logger.debug(f"Received quick_game command with data: {json.dumps(data)[:200]}...")
 			
 			# Extract the game data - handle different message formats
 			game_data = data
@@ -736,8 +1404,10 @@ class AsyncLaneClient:
 				logger.info("Removed redundant nested type field")
 			
 			# Simply dispatch the event to the BaseUI through the dispatcher
-			logger.info(f"Dispatching quick_game event with data: {json.dumps(game_data)[:200]}...")
-			await dispatcher.dispatch_event('quick_game', game_data)
+			logger.info("Dispatching quick_game event")
+			if logger.isEnabledFor(logging.DEBUG):
+				logger.debug(f"Quick game data: {json.dumps(game_data)[:200]}...")
+			await self._dispatch('quick_game', game_data)
 			
 			# Store game information
 			self.game_started = True
@@ -753,6 +1423,78 @@ class AsyncLaneClient:
 			logger.error(f"Traceback: {traceback.format_exc()}")
 			return False
 
+	async def outbox_uploader(self):
+		"""Upload queued game records in batches whenever registered"""
+		retry_delay = 1
+		max_delay = 60
+		
+		while not self._shutdown.is_set():
+			try:
+				if not self.registered.is_set() or not self.outbox.has_pending():
+					await asyncio.sleep(self.outbox_poll_interval)
+					continue
+				
+				batch = self.outbox.peek_batch(self.outbox_batch_size)
+				batch_id = uuid.uuid4().hex
+				ack_future = asyncio.get_running_loop().create_future()
+				self._outbox_acks[batch_id] = ack_future
+				
+				try:
+					await self.send_message({
+						'type': 'game_records_batch',
+						'lane_id': self.lane_id,
+						'batch_id': batch_id,
+						'records': batch
+					})
+					acked_ids, rejected_ids = await asyncio.wait_for(ack_future, timeout=self.outbox_ack_timeout)
+				finally:
+					self._outbox_acks.pop(batch_id, None)
+				
+				# Rejected records go to the dead-letter file; the rest get max_attempts answered batches
+				loop = asyncio.get_running_loop()
+				acked, rejected = await loop.run_in_executor(None, self._settle_outbox, acked_ids, rejected_ids, "rejected by server")
+				logger.info(f"Server acknowledged {acked}/{len(batch)} queued records, rejected {rejected}")
+				answered = set(acked_ids) | set(rejected_ids)
+				unanswered = [record['id'] for record in batch if record['id'] not in answered]
+				if not unanswered:
+					retry_delay = 1
+					continue
+				exhausted = self.outbox.not_accepted(unanswered)
+				if exhausted:
+					await loop.run_in_executor(None, self.outbox.reject, exhausted,
+											   f"not accepted after {self.outbox.max_attempts} attempts")
+				raise ConnectionError(f"Server did not accept {len(unanswered)} records")
+				
+			except asyncio.CancelledError:
+				break
+			except Exception as e:
+				logger.warning(f"Outbox upload failed ({type(e).__name__}: {e}), retrying in {retry_delay}s")
+				await asyncio.sleep(retry_delay)
+				retry_delay = min(retry_delay * 2, max_delay)
+	
+	async def handle_game_records_ack(self, data):
+		"""Resolve the pending upload for an acknowledged batch; 'rejected' lists IDs the server refuses"""
+		batch_id = data.get('batch_id')
+		ids = data.get('ids', [])
+		rejected = data.get('rejected', [])
+		future = self._outbox_acks.get(batch_id)
+		if future and not future.done():
+			future.set_result((ids, rejected))
+			return
+		# Late ack for a batch we already gave up on - the records are still safe to drop
+		logger.info(f"Late ack for batch {batch_id}, clearing {len(ids)} queued records")
+		try:
+			await asyncio.get_running_loop().run_in_executor(None, self._settle_outbox, ids, rejected,
+															 f"rejected by server (late ack for batch {batch_id})")
+		except Exception as e:
+			logger.error(f"Error settling late ack for batch {batch_id}: {e}")
+	
+	def _settle_outbox(self, acked_ids, rejected_ids, reason):
+		"""Runs in an executor: ack and rejection both rewrite and fsync the outbox files"""
+		acked = self.outbox.ack(acked_ids)
+		rejected = self.outbox.reject(rejected_ids, reason) if rejected_ids else 0
+		return acked, rejected
+	
 	async def handle_game_data_request(self, request_data):
 		"""Handle a request for current game data"""
 		try:
@@ -773,85 +1515,91 @@ class AsyncLaneClient:
 			logger.error(f"Error handling game data request: {e}")
 	
 	def collect_current_game_data(self):
-		"""Collect current game data from active game"""
+		"""Full snapshot of the active game, stamped with the last delta sequence it includes"""
 		game_data = {
 			'lane_id': self.lane_id,
 			'current_game_type': self.current_game_type,
 		}
-		
-		# Get data from current game
-		if hasattr(self, 'quick_game') and self.quick_game:
-			# It's a quick game
-			game_data['type'] = 'quick_game'
-			game_data['current_game'] = getattr(self.quick_game, 'current_game_number', 1)
-			game_data['total_games'] = getattr(self.quick_game.settings, 'total_games', 1)
-			
-			# Collect bowler data
-			bowlers_data = []
-			for bowler in getattr(self.quick_game, 'bowlers', []):
-				bowler_data = {
-					'name': bowler.name,
-					'frames': [],
-					'total_score': bowler.total_score,
-					'current_frame': bowler.current_frame
-				}
-				
-				# Collect frame data
-				for frame in bowler.frames:
-					frame_data = {
-						'balls': [],
-						'total': frame.total,
-						'is_strike': frame.is_strike,
-						'is_spare': frame.is_spare
-					}
-					
-					# Collect ball data
-					for ball in frame.balls:
-						ball_data = {
-							'value': ball.value,
-							'symbol': ball.symbol,
-							'pin_config': ball.pin_config
-						}
-						frame_data['balls'].append(ball_data)
-					
-					bowler_data['frames'].append(frame_data)
-				
-				bowlers_data.append(bowler_data)
-			
-			game_data['bowlers'] = bowlers_data
-			
-		elif hasattr(self, 'league_game') and self.league_game:
-			# It's a league game
-			game_data['type'] = 'league_game'
-			game_data['current_game'] = getattr(self.league_game, 'current_game_number', 1)
-			game_data['total_games'] = getattr(self.league_game.settings, 'total_games', 1)
-			game_data['paired_lane'] = getattr(self.league_game, 'paired_lane', None)
-			
-			# Collect bowler data similar to quick game
-			# [Same code as for quick game]
-			
-		elif hasattr(self, 'hangman_game') and self.hangman_game:
-			# It's a hangman game
-			game_data['type'] = 'hangman'
-			game_data['players'] = [{'name': b.name} for b in self.hangman_game.bowlers]
-			game_data['hangman_states'] = self.hangman_game.hangman_states
-		
+		game_data.update(self.game_sync.snapshot())
 		return game_data
+	
+	def _on_inbound_overflow(self, queue):
+		"""Inbound game messages were dropped - send a snapshot so the server can put the lane right"""
+		self.metrics.counter('inbound_overflows', queue=queue).inc()
+		self._resync_game_state()
+	
+	def _resync_game_state(self):
+		"""After (re)registering or dropping inbound game messages, send a snapshot so the server catches up"""
+		if self.game_sync.game is None:
+			return
+		self.post_message({
+			'type': 'game_data_response',
+			'lane_id': self.lane_id,
+			'data': self.collect_current_game_data()
+		})
 			
 	async def discover_server(self):
-		"""Discover server using multiple methods"""
-		# Try multicast discovery first
-		result = await self._discover_via_multicast()
-		if result[0]:
-			return result
-			
-		# If multicast fails, try subnet scanning
-		result = await self._discover_via_subnet_scan()
-		if result[0]:
-			return result
+		"""Discover server: last known address first, then multicast and subnet scan in parallel"""
+		with self.metrics.timer('discovery_ms'):
+			host, port = await self._discover()
+		self.metrics.counter('discoveries', result='found' if host else 'failed').inc()
+		return host, port
+	
+	async def _discover(self):
+		cached = self._load_cached_server()
+		if cached and await self._probe_server(*cached, timeout=self.discovery_probe_timeout):
+			logger.info(f"Last known server {cached[0]}:{cached[1]} is reachable")
+			return cached
+		
+		# Whichever method answers first wins; the other is cancelled
+		tasks = [
+			asyncio.create_task(self._discover_via_multicast(), name='discover_multicast'),
+			asyncio.create_task(self._discover_via_subnet_scan(), name='discover_scan')
+		]
+		try:
+			for next_done in asyncio.as_completed(tasks):
+				host, port = await next_done
+				if host:
+					return host, port
+		finally:
+			for task in tasks:
+				if not task.done():
+					task.cancel()
+			await asyncio.gather(*tasks, return_exceptions=True)
 			
 		# If all else fails, return None
 		return None, None
+	
+	def _load_cached_server(self):
+		"""Last server we registered with, or None"""
+		try:
+			with open(SERVER_CACHE_FILE, 'r') as f:
+				cached = json.load(f)
+			return cached['host'], int(cached['port'])
+		except FileNotFoundError:
+			return None
+		except Exception as e:
+			logger.warning(f"Ignoring unreadable server cache: {e}")
+			return None
+	
+	def _save_cached_server(self):
+		"""Remember the current server so the next discovery tries it first"""
+		if self._load_cached_server() == (self.host, self.port):
+			return
+		try:
+			os.makedirs(os.path.dirname(SERVER_CACHE_FILE), exist_ok=True)
+			tmp_file = SERVER_CACHE_FILE + '.tmp'
+			with open(tmp_file, 'w') as f:
+				json.dump({'host': self.host, 'port': self.port, 'saved': time.time()}, f)
+			os.replace(tmp_file, SERVER_CACHE_FILE)
+		except Exception as e:
+			logger.warning(f"Could not cache server address: {e}")
+	
+	async def _probe_server(self, host, port, timeout=1.0):
+		"""True if a TCP connection to host:port is accepted within timeout"""
+		# Discovery needs a current answer; failures are expected for non-server IPs
+		result = await self.health.probe_tcp(host, port, timeout=timeout, max_age=0)
+		return result.reachable
 				
 	async def _discover_via_multicast(self):
 		"""Discover server using multicast"""
@@ -859,50 +1607,27 @@ class AsyncLaneClient:
 		multicast_port = 50005
 		message = b'LANE_DISCOVERY_REQUEST'
 		
-		sock = None
-		
 		logger.info("Attempting server discovery via multicast...")
 		
+		loop = asyncio.get_running_loop()
+		transport = None
 		try:
-			# Create UDP socket for multicast
 			sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-			sock.settimeout(5.0)  # Increased timeout to 5 seconds
-			ttl = struct.pack('b', 2)  # Increased TTL to 2 for better network reach
+			ttl = struct.pack('b', 2)  # TTL of 2 for better network reach
 			sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, ttl)
+			sock.setblocking(False)
+			
+			found = loop.create_future()
+			transport, _ = await loop.create_datagram_endpoint(lambda: _DiscoveryProtocol(found), sock=sock)
 			
 			# Try multiple times
 			for attempt in range(3):
-				# Send discovery request
 				logger.info(f"Sending discovery request to {multicast_group}:{multicast_port} (attempt {attempt+1}/3)")
-				sock.sendto(message, (multicast_group, multicast_port))
-				
-				# Listen for responses with timeout
-				start_time = time.time()
-				while time.time() - start_time < 8:  # Increased to 8 seconds
-					try:
-						data, server = sock.recvfrom(1024)
-						logger.info(f"Received response from {server}")
-						if data.startswith(b'LANE_DISCOVERY_RESPONSE'):
-							try:
-								response_data = data[24:].decode()
-								logger.debug(f"Response data: {response_data}")
-								response = json.loads(response_data)
-								if response.get('type') == 'server_info':
-									host = response.get('host')
-									port = response.get('port', 50005)
-									if host:
-										logger.info(f"Server discovered at {host}:{port}")
-										return host, port
-							except json.JSONDecodeError as je:
-								logger.warning(f"Invalid JSON in discovery response: {je}")
-								logger.debug(f"Raw response data: {data[24:]}")
-								continue
-					except socket.timeout:
-						continue
-				
-				# If we've waited the full time without a response, try again
-				logger.info(f"No response received on attempt {attempt+1}")
-				await asyncio.sleep(0.5)  # Small delay between attempts
+				transport.sendto(message, (multicast_group, multicast_port))
+				try:
+					return await asyncio.wait_for(asyncio.shield(found), timeout=self.discovery_multicast_timeout)
+				except asyncio.TimeoutError:
+					logger.info(f"No response received on attempt {attempt+1}")
 			
 			logger.warning("Multicast discovery failed after 3 attempts")
 			return None, None
@@ -910,15 +1635,15 @@ class AsyncLaneClient:
 			logger.error(f"Multicast discovery error: {e}")
 			return None, None
 		finally:
-			if sock:
-				sock.close()
+			if transport:
+				transport.close()
 	
 	async def _discover_via_subnet_scan(self):
-		"""Scan local subnet for server"""
+		"""Probe likely server addresses in parallel and return the first that accepts"""
 		logger.info("Attempting server discovery via subnet scan...")
 		
 		# Get local IP to determine subnet
-		local_ip = self.get_local_ip()
+		local_ip = await self.health.local_ip()
 		if local_ip == '127.0.0.1':
 			logger.warning("Could not determine local IP, using default subnet")
 			subnet_base = "192.168.1."
@@ -948,44 +1673,89 @@ class AsyncLaneClient:
 			if ip not in potential_ips:
 				potential_ips.append(ip)
 		
-		# Try connection to each IP
-		for ip in potential_ips:
-			try:
-				logger.info(f"Trying to connect to {ip}:{server_port}")
-				reader, writer = await asyncio.wait_for(
-					asyncio.open_connection(ip, server_port),
-					timeout=1.0
-				)
-				
-				# If we can connect, try registering
-				logger.info(f"Connected to {ip}:{server_port}, testing if it's a lane server")
-				
-				# Close the test connection
-				writer.close()
-				await writer.wait_closed()
-				
-				# Return the IP for actual registration
-				return ip, server_port
-				
-			except (asyncio.TimeoutError, ConnectionRefusedError):
-				# Expected for non-server IPs, continue silently
-				pass
-			except Exception as e:
-				logger.debug(f"Error scanning {ip}: {e}")
+		# Bound concurrency so a scan does not exhaust sockets on the lane PC
+		limit = asyncio.Semaphore(self.discovery_concurrency)
+		
+		async def probe(ip):
+			async with limit:
+				if await self._probe_server(ip, server_port, timeout=self.discovery_probe_timeout):
+					return ip
+				return None
+		
+		tasks = [asyncio.create_task(probe(ip)) for ip in potential_ips]
+		try:
+			for next_done in asyncio.as_completed(tasks):
+				ip = await next_done
+				if ip:
+					logger.info(f"Lane server accepted connection at {ip}:{server_port}")
+					return ip, server_port
+		finally:
+			for task in tasks:
+				if not task.done():
+					task.cancel()
+			await asyncio.gather(*tasks, return_exceptions=True)
 		
 		logger.warning("Subnet scan completed, no server found")
 		return None, None
 
 	def get_local_ip(self):
-		"""Get local IP address"""
+		"""Local address the server sees when connected, otherwise the last one probed; never blocks"""
+		if self.via_parent:
+			return self.mux_parent.get_local_ip()
+		if self.writer and not self.writer.is_closing():
+			sockname = self.writer.get_extra_info('sockname')
+			if sockname:
+				return sockname[0]
+		return self.health.cached_local_ip() or '127.0.0.1'
+	
+	def get_link_quality(self):
+		"""Server reachability, connect time and ping RTT statistics"""
+		if self.via_parent:
+			return self.mux_parent.get_link_quality()
+		return self.health.link_quality(self.host, self.port)
+	
+	async def measure_rtt(self):
+		"""Round trip of a ping to the server in ms, or None if no pong arrived in time"""
+		ping_id = uuid.uuid4().hex[:12]
+		future = asyncio.get_running_loop().create_future()
+		self._pings[ping_id] = future
+		start = time.perf_counter()
+		rtt = None
 		try:
-			s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-			s.connect(('8.8.8.8', 80))
-			ip = s.getsockname()[0]
-			s.close()
-			return ip
-		except:
-			return '127.0.0.1'
+			if await self.send_message({'type': 'ping', 'lane_id': self.lane_id, 'ping_id': ping_id}):
+				await asyncio.wait_for(future, timeout=self.ping_timeout)
+				rtt = (time.perf_counter() - start) * 1000
+		except asyncio.TimeoutError:
+			logger.warning(f"No pong from server within {self.ping_timeout} seconds")
+		finally:
+			self._pings.pop(ping_id, None)
+		self.health.record_rtt(rtt)
+		if rtt is None:
+			self.metrics.counter('ping_timeouts').inc()
+		else:
+			self.metrics.histogram('rtt_ms').observe(rtt)
+		return rtt
+	
+	async def health_loop(self):
+		"""Ping the server periodically so get_link_quality() stays current"""
+		while not self._shutdown.is_set():
+			await asyncio.sleep(self.health_interval)
+			if self.registered.is_set():
+				await self.measure_rtt()
+	
+	async def metrics_loop(self):
+		"""Rewrite the metrics file for every lane in the process, for lane_metrics.py to show"""
+		loop = asyncio.get_running_loop()
+		while not self._shutdown.is_set():
+			await asyncio.sleep(self.metrics_interval)
+			try:
+				await loop.run_in_executor(None, write_snapshots, snapshot_all(), METRICS_FILE)
+			except Exception as e:
+				logger.error(f"Error writing metrics: {e}")
+	
+	def get_metrics_snapshot(self):
+		"""Counters, gauges and histograms recorded for this lane"""
+		return self.metrics.snapshot()
 
 	def stop(self):
 		"""Stop the client and cancel tasks."""
@@ -1012,7 +1782,9 @@ class AsyncLaneClient:
 		"""Clean up resources"""
 		logger.info("Starting cleanup")
 		
-		self.connection_manager.close_all()
+		# Normally already done by run_client; the loop has stopped, so run it here
+		if self.loop and not self.loop.is_closed() and not self.loop.is_running():
+			self.loop.run_until_complete(self.connection_manager.close_all())
 		
 		# Signal tasks to shut down
 		if not self._shutdown.is_set():
@@ -1056,7 +1828,7 @@ class AsyncLaneClient:
 			
 			# 1. Network Diagnostics
 			logger.info("Running network diagnostics...")
-			local_ip = self.get_local_ip()
+			local_ip = await self.health.local_ip()
 			diagnostics["network"]["local_ip"] = local_ip
 			diagnostics["network"]["server_ip"] = self.host
 			diagnostics["network"]["server_port"] = self.port
@@ -1064,17 +1836,21 @@ class AsyncLaneClient:
 			# Ping the server IP to check basic connectivity
 			ping_result = await self._ping_host(self.host)
 			diagnostics["network"]["ping_server"] = ping_result
+			diagnostics["network"]["link"] = self.get_link_quality()
 			
 			# 2. Connection Diagnostics
 			logger.info("Running connection diagnostics...")
 			diagnostics["connection"]["registered"] = self.registered.is_set()
 			diagnostics["connection"]["writer_available"] = self.writer is not None
 			diagnostics["connection"]["writer_closing"] = self.writer.is_closing() if self.writer else True
+			diagnostics["connection"]["transport"] = self.get_transport_stats()
+			diagnostics["connection"]["pool"] = self.get_pool_stats()
 			
 			# Test the connection with a ping message
 			if self.writer and not self.writer.is_closing():
 				connection_good = await self.check_connection()
 				diagnostics["connection"]["ping_test"] = connection_good
+				diagnostics["connection"]["rtt_ms"] = await self.measure_rtt()
 			else:
 				diagnostics["connection"]["ping_test"] = False
 			
@@ -1092,13 +1868,15 @@ class AsyncLaneClient:
 			
 			# 4. Event System Diagnostics
 			logger.info("Running event system diagnostics...")
-			if hasattr(dispatcher, 'listeners'):
+			if hasattr(self.dispatcher, 'listeners'):
 				# Count listeners for each event type
 				event_listeners = {}
-				for event_type, handlers in dispatcher.listeners.items():
+				for event_type, handlers in self.dispatcher.listeners.items():
 					event_listeners[event_type] = len(handlers)
 				diagnostics["event_system"]["listeners"] = event_listeners
 			
+			diagnostics["metrics"] = self.get_metrics_snapshot()
+			
 			# Calculate total time
 			diagnostics["total_time"] = f"{time.time() - start_time:.2f} seconds"
 			
@@ -1117,22 +1895,8 @@ class AsyncLaneClient:
 	async def _ping_host(self, host, count=3, timeout=1.0):
 		"""Ping a host to check connectivity"""
 		try:
-			# Create socket for a simple connection test
-			sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-			sock.settimeout(timeout)
-			
-			# Wrap in asyncio to not block
-			def _do_ping():
-				try:
-					sock.connect((host, self.port))
-					sock.close()
-					return True
-				except Exception:
-					return False
-			
-			# Run in a separate thread
-			result = await asyncio.get_event_loop().run_in_executor(None, _do_ping)
-			return result
+			result = await self.health.probe_tcp(host, self.port, timeout=timeout)
+			return result.reachable
 		except Exception as e:
 			logger.error(f"Error pinging host: {e}")
 			return False
@@ -1166,44 +1930,52 @@ class AsyncLaneClient:
 		
 		while not self._shutdown.is_set():
 			try:
-				if not self.reader:
-					logger.warning("No reader available, waiting...")
-					await asyncio.sleep(1)
+				if not self.reader or not self.registered.is_set():
+					# Registration reads its own reply on a new connection; read once it hands over
+					try:
+						await asyncio.wait_for(self.registered.wait(), timeout=1.0)
+					except asyncio.TimeoutError:
+						pass
 					continue
 					
 				logger.debug("Waiting for incoming message...")
 				
-				# Add timeout to read operation - increased to 90 seconds
-				try:
-					read_task = asyncio.create_task(self.reader.readline())
-					data = await asyncio.wait_for(read_task, timeout=90.0)  # Match server's heartbeat timeout
-					
-					# Reset reconnection attempts on successful read
-					reconnection_attempts = 0
-					
-					if data:
-						# Process the data as before
-						logger.debug(f"Raw data received ({len(data)} bytes): {data[:50]}...")
-						
-						try:
-							message_str = data.decode('utf-8').strip()
-							message = json.loads(message_str)
-							
-							# Put message in processing queue
-							await self.message_queue.put(message)
-						except json.JSONDecodeError as jde:
-							logger.error(f"JSON decode error: {jde}")
-						except Exception as parse_e:
-							logger.error(f"Error parsing message: {parse_e}")
-					else:
-						# Empty data means the connection was closed
-						logger.warning("Received empty data - connection may be closed")
-						raise ConnectionError("Connection closed by server (empty read)")
-						
-				except asyncio.TimeoutError:
-					# Timeout on read could mean server is unresponsive
-					logger.debug("Read timeout - normal if no messages")
+				# One await per chunk; idle peers are caught by the reader's watchdog
+				frames = self._get_frame_reader()
+				seen = frames.stats['bytes']
+				message = await frames.read_message()
+				if message is None:
+					if frames.reader is not self.reader:
+						continue  # Re-registration replaced this connection
+					# EOF means the connection was closed (or dropped as idle)
+					logger.warning("Received empty data - connection may be closed")
+					raise ConnectionError("Connection closed by server (empty read)")
+				
+				# Reset reconnection attempts on successful read
+				reconnection_attempts = 0
+				self.liveness.received()
+				self.metrics.counter('bytes_received', link='server').inc(frames.stats['bytes'] - seen)
+				self.metrics.counter('messages_received', type=message.get('type')).inc()
+				
+				accepted = self.session.accept(message)
+				if accepted is None:
+					# Missed a message - drop this one and ask for everything from the gap
+					request = self.session.resend_request()
+					if request:
+						logger.warning(f"Message sequence gap, requesting resend from {request['from_seq']}")
+						self._enqueue_outbound(request, None)
 					continue
+				if not accepted or message.get('type') == 'session_ack':
+					continue  # Duplicate, or a bare ack already applied by accept()
+				if self.session.needs_ack():
+					self._schedule_session_ack()
+				
+				# Put message in the processing queue of the lane it is addressed to
+				lane = self.lanes.get(str(message.get('to_lane', self.lane_id)))
+				if lane is None:
+					logger.warning(f"Dropping {message.get('type')} for lane {message.get('to_lane')}, not hosted here")
+					continue
+				await lane.message_queue.put(message)
 					
 			except ConnectionError as ce:
 				logger.warning(f"Connection error: {ce}")
@@ -1234,23 +2006,195 @@ class AsyncLaneClient:
 				logger.error(f"Traceback: {traceback.format_exc()}")
 				await asyncio.sleep(1)
 
-# Rest of the code remains the same
+class PooledConnection:
+	__slots__ = ('key', 'host', 'port', 'reader', 'writer', 'link', 'created', 'last_used', 'uses', 'connect_ms')
+	
+	def __init__(self, key: str, host: Optional[str], port: Optional[int], reader: asyncio.StreamReader,
+				 writer: asyncio.StreamWriter, link, connect_ms: Optional[float] = None):
+		self.key = key
+		self.host = host
+		self.port = port
+		self.reader = reader
+		self.writer = writer
+		self.link = link  # transport_profile.ConnectionStats
+		self.created = self.last_used = time.monotonic()
+		self.uses = 1
+		self.connect_ms = connect_ms
+	
+	def healthy(self) -> bool:
+		"""Open on our side, no EOF seen, and established as far as the kernel can tell"""
+		if self.writer.is_closing() or self.reader.at_eof():
+			return False
+		state = tcp_info(self.writer.get_extra_info('socket')).get('state')
+		return state is None or state == TCP_ESTABLISHED
+
 class ConnectionManager:
-	def __init__(self):
-		self.connections = {}
+	"""
+	Pool of keyed connections ('server', 'lane:<id>'). acquire() connects
+	lazily and returns the pooled connection while it stays healthy;
+	concurrent acquires of one key share a single connect. Connections
+	accepted from peers join with adopt(). Unpinned connections idle for
+	idle_timeout seconds are closed by a sweep timer, and failed connects
+	give a per-key backoff through retry_delay().
+	"""
+	def __init__(self, profile: Optional[TransportProfile] = None, idle_timeout: float = 300.0,
+				 base_retry: float = 1.0, max_retry: float = 30.0):
+		self.profile = profile or TRANSPORT_PROFILE
+		self.idle_timeout = idle_timeout
+		self.base_retry = base_retry
+		self.max_retry = max_retry
+		self.connections: Dict[str, PooledConnection] = {}
+		self.pinned = set()  # Keys never evicted for idleness
 		self.lock = asyncio.Lock()
-		self.connection_timeouts = {}  # Track connection attempts
+		self.connection_timeouts = {}  # key -> (consecutive failures, monotonic time the next attempt is due)
+		self._connecting: Dict[str, asyncio.Future] = {}
+		self._sweep_timer = None
+		self.stats = {'connects': 0, 'reused': 0, 'shared_connects': 0, 'adopted': 0, 'failures': 0,
+					  'unhealthy': 0, 'evicted': 0}
+	
+	def get(self, key: str, check: bool = True) -> Optional[PooledConnection]:
+		"""Pooled connection for key if it is still usable; a dead one is dropped"""
+		conn = self.connections.get(key)
+		if conn is None or not check:
+			return conn
+		if conn.healthy():
+			return conn
+		self.stats['unhealthy'] += 1
+		logger.info(f"Pooled connection {key} is no longer healthy, dropping it")
+		self.discard(key, conn)
+		return None
+	
+	async def acquire(self, key: str, host: str, port: int, timeout: float = 10.0, fresh: bool = False) -> PooledConnection:
+		"""Healthy pooled connection to host:port under key, connecting if needed; fresh replaces any open one"""
+		future = self._connecting.get(key)
+		if future:
+			self.stats['shared_connects'] += 1
+			return await asyncio.shield(future)
+		conn = self.get(key)
+		if conn and (conn.host, conn.port) == (host, port) and not fresh:
+			conn.uses += 1
+			conn.last_used = time.monotonic()
+			self.stats['reused'] += 1
+			return conn
+		if conn:
+			self.discard(key, conn)
 		
+		future = asyncio.get_running_loop().create_future()
+		self._connecting[key] = future
+		try:
+			conn = await self._connect(key, host, port, timeout)
+			future.set_result(conn)
+			return conn
+		except asyncio.CancelledError:
+			future.cancel()
+			raise
+		except Exception as e:
+			failures = self.connection_timeouts.get(key, (0, 0.0))[0] + 1
+			self.connection_timeouts[key] = (failures, time.monotonic() + min(self.base_retry * 2 ** (failures - 1), self.max_retry))
+			self.stats['failures'] += 1
+			future.set_exception(e)
+			future.exception()  # Waiters re-raise it; don't log it as unretrieved
+			raise
+		finally:
+			del self._connecting[key]
+	
+	async def _connect(self, key: str, host: str, port: int, timeout: float) -> PooledConnection:
+		start = time.perf_counter()
+		reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout=timeout)
+		connect_ms = round((time.perf_counter() - start) * 1000, 2)
+		self.stats['connects'] += 1
+		self.connection_timeouts.pop(key, None)
+		return self._add(PooledConnection(key, host, port, reader, writer,
+										  tune_connection(writer, self.profile, key), connect_ms))
+	
+	def adopt(self, key: str, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> PooledConnection:
+		"""Pool a connection the other side opened, replacing any older one under key"""
+		old = self.connections.get(key)
+		if old:
+			self.discard(key, old)
+		host, port = (writer.get_extra_info('peername') or (None, None))[:2]
+		self.stats['adopted'] += 1
+		self.connection_timeouts.pop(key, None)
+		return self._add(PooledConnection(key, host, port, reader, writer, tune_connection(writer, self.profile, key)))
+	
+	def _add(self, conn: PooledConnection) -> PooledConnection:
+		self.connections[conn.key] = conn
+		if self._sweep_timer is None:
+			self._sweep_timer = asyncio.get_running_loop().call_later(self.idle_timeout / 2, self._sweep)
+		return conn
+	
+	def touch(self, key: str, sent: int = 0):
+		"""Mark a connection as in use; sent bytes go to its stats"""
+		conn = self.connections.get(key)
+		if conn:
+			conn.last_used = time.monotonic()
+			if sent:
+				conn.link.sent(sent)
+	
+	def pin(self, key: str, pinned: bool = True):
+		if pinned:
+			self.pinned.add(key)
+		else:
+			self.pinned.discard(key)
+	
+	def retry_delay(self, key: str) -> float:
+		"""Seconds until the next connect to key is worth trying after failures"""
+		failures, due = self.connection_timeouts.get(key, (0, 0.0))
+		return max(0.0, due - time.monotonic())
+	
+	def discard(self, key: str, conn: Optional[PooledConnection] = None):
+		"""Close and forget the connection under key (only if it is still conn, when given)"""
+		current = self.connections.get(key)
+		if current is None or (conn is not None and current is not conn):
+			if conn is not None and not conn.writer.is_closing():
+				conn.writer.close()
+			return
+		del self.connections[key]
+		if not current.writer.is_closing():
+			current.writer.close()
+	
+	def evict_idle(self) -> int:
+		"""Close unpinned connections unused for idle_timeout seconds"""
+		cutoff = time.monotonic() - self.idle_timeout
+		idle = [key for key, conn in self.connections.items() if key not in self.pinned and conn.last_used < cutoff]
+		for key in idle:
+			logger.info(f"Closing idle pooled connection {key}")
+			self.discard(key)
+		self.stats['evicted'] += len(idle)
+		return len(idle)
+	
+	def _sweep(self):
+		self._sweep_timer = None
+		self.evict_idle()
+		if self.connections:
+			self._sweep_timer = asyncio.get_running_loop().call_later(self.idle_timeout / 2, self._sweep)
+	
+	def get_stats(self) -> Dict[str, Any]:
+		now = time.monotonic()
+		return dict(self.stats, open={key: {
+			'peer': f"{conn.host}:{conn.port}",
+			'uses': conn.uses,
+			'idle': round(now - conn.last_used, 1),
+			'age': round(now - conn.created, 1),
+			'pinned': key in self.pinned,
+			'connect_ms': conn.connect_ms
+		} for key, conn in self.connections.items()})
+	
 	async def close_all(self):
 		async with self.lock:
+			if self._sweep_timer:
+				self._sweep_timer.cancel()
+				self._sweep_timer = None
 			for key, conn in self.connections.items():
-				writer = conn['writer']
+				writer = conn.writer
 				if not writer.is_closing():
 					writer.close()
-					await writer.wait_closed()
+					try:
+						await writer.wait_closed()
+					except Exception:
+						pass
 			self.connections.clear()
 
-
 if __name__ == "__main__":
 	logging.basicConfig(
 		level=logging.DEBUG,
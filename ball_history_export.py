@@ -0,0 +1,221 @@
+"""
+Columnar export of every ball stored in database/bowling.db.
+
+Each column is a flat little-endian binary file with one fixed-width entry
+per ball, described by manifest.json, so analytics code can open it with
+``numpy.memmap`` (see open_columns) without parsing any JSON. Runs append
+only the games added since the previous export unless --full is given.
+Balls are written out every FLUSH_GAMES games and the manifest once at
+the end, so memory stays flat however long the history is; a run that
+dies part way leaves a tail the next run cuts off. Balls whose values
+do not fit their column are logged and left out.
+"""
+
+import argparse
+import json
+import logging
+import os
+import struct
+from datetime import datetime
+from typing import Dict, Iterable, List, Any, Optional
+from game_reader import DB_FILE, iter_games
+
+logger = logging.getLogger(__name__)
+
+EXPORT_DIR = 'database/ball_history'
+MANIFEST_FILE = 'manifest.json'
+FORMAT_VERSION = 1
+
+FLUSH_GAMES = 100  # Games buffered in memory between writes to the column files
+
+# name -> (struct code, numpy dtype)
+COLUMNS = {
+	'pin_mask': ('B', '<u1'),   # bit i set if pin_config[i] was knocked down
+	'value': ('B', '<u1'),
+	'frame': ('B', '<u1'),	  # 0-9
+	'ball': ('B', '<u1'),	   # 0-2 within the frame
+	'bowler_id': ('H', '<u2'),  # index into manifest 'bowlers'
+	'game_id': ('I', '<u4'),	# index of the record in the game database
+	'timestamp': ('I', '<u4'),  # game save time, seconds since epoch
+}
+COLUMN_STRUCTS = {name: struct.Struct('<' + code) for name, (code, _) in COLUMNS.items()}
+
+def pin_mask(pin_config: List[int]) -> int:
+	"""Pack a pin configuration list into one byte"""
+	mask = 0
+	for i, pin in enumerate(pin_config or []):
+		if pin:
+			mask |= 1 << i
+	return mask
+
+def _ball_value(ball: Dict[str, Any]) -> Any:
+	"""Pinfall of a ball - 'value' in standard records, 'ball_value' in enhanced ones"""
+	return ball['value'] if 'value' in ball else ball.get('ball_value')
+
+def _game_timestamp(game_record: Dict[str, Any]) -> int:
+	try:
+		saved = datetime.strptime(f"{game_record.get('date')} {game_record.get('time')}", "%Y-%m-%d %H:%M:%S")
+		return int(saved.timestamp())
+	except (TypeError, ValueError):
+		return 0
+
+class BallHistoryExporter:
+	def __init__(self, export_dir: str = EXPORT_DIR):
+		self.export_dir = export_dir
+		self.manifest_path = os.path.join(export_dir, MANIFEST_FILE)
+		self.manifest = self._load_manifest()
+
+	def _new_manifest(self) -> Dict[str, Any]:
+		return {
+			'version': FORMAT_VERSION,
+			'rows': 0,
+			'games_exported': 0,
+			'bowlers': [],
+			'columns': {name: {'dtype': dtype, 'file': f"{name}.bin"} for name, (_, dtype) in COLUMNS.items()}
+		}
+
+	def _load_manifest(self) -> Dict[str, Any]:
+		if not os.path.exists(self.manifest_path):
+			return self._new_manifest()
+		with open(self.manifest_path, 'r') as f:
+			manifest = json.load(f)
+		if manifest.get('version') != FORMAT_VERSION:
+			logger.warning(f"Export format {manifest.get('version')} is stale, starting a full export")
+			return self._new_manifest()
+		return manifest
+
+	def _column_path(self, name: str) -> str:
+		return os.path.join(self.export_dir, self.manifest['columns'][name]['file'])
+
+	def reset(self):
+		"""Drop the existing export so the next run rewrites everything"""
+		self.manifest = self._new_manifest()
+		for name in COLUMNS:
+			path = self._column_path(name)
+			if os.path.exists(path):
+				os.remove(path)
+
+	def export_db(self, db_file: str = DB_FILE) -> int:
+		"""Stream the game database into the export, restarting if it was replaced by a shorter one"""
+		fields = ['date', 'time', 'bowlers.name', 'bowlers.frames.frame_number', 'bowlers.frames.balls.pin_config',
+				  'bowlers.frames.balls.value', 'bowlers.frames.balls.ball_value', 'bowlers.frames.balls.ball_number']
+		rows = self.export(iter_games(db_file, fields=fields))
+		if rows is None:
+			logger.warning("Game database is shorter than the export, starting a full export")
+			self.reset()
+			rows = self.export(iter_games(db_file, fields=fields))
+		return rows
+
+	def _columns_intact(self) -> bool:
+		"""True if every column file holds at least the rows the manifest records"""
+		for name, column in COLUMN_STRUCTS.items():
+			path = self._column_path(name)
+			size = os.path.getsize(path) if os.path.exists(path) else 0
+			if size < self.manifest['rows'] * column.size:
+				return False
+		return True
+
+	def _flush(self, buffers: Dict[str, bytearray]):
+		for name, buffer in buffers.items():
+			with open(self._column_path(name), 'ab') as f:
+				f.write(buffer)
+			buffer.clear()
+
+	def export(self, game_records: Iterable[Dict[str, Any]]) -> Optional[int]:
+		"""
+		Append balls from games not yet exported and return the number of rows added.
+		Returns None without writing if there are fewer games than already exported.
+		"""
+		os.makedirs(self.export_dir, exist_ok=True)
+		if not self._columns_intact():
+			logger.warning("Column files are shorter than the manifest, starting a full export")
+			self.reset()
+		start = self.manifest['games_exported']
+		bowler_ids = {name: i for i, name in enumerate(self.manifest['bowlers'])}
+
+		# Drop any tail written by an export that died before updating the manifest
+		for name, column in COLUMN_STRUCTS.items():
+			with open(self._column_path(name), 'ab') as f:
+				f.truncate(self.manifest['rows'] * column.size)
+
+		buffers = {name: bytearray() for name in COLUMNS}
+		rows = skipped = 0
+		total_games = 0
+		for game_id, game_record in enumerate(game_records):
+			total_games = game_id + 1
+			if game_id < start:
+				continue
+			timestamp = _game_timestamp(game_record)
+			for bowler_record in game_record.get('bowlers', []):
+				name = bowler_record.get('name', '')
+				if name not in bowler_ids:
+					bowler_ids[name] = len(self.manifest['bowlers'])
+					self.manifest['bowlers'].append(name)
+				bowler_id = bowler_ids[name]
+
+				for frame_pos, frame in enumerate(bowler_record.get('frames', [])):
+					for ball_pos, ball in enumerate(frame.get('balls', [])):
+						try:
+							# Enhanced records number frames and balls and leave empty frames out
+							row = {
+								'pin_mask': pin_mask(ball.get('pin_config')),
+								'value': _ball_value(ball),
+								'frame': frame.get('frame_number', frame_pos + 1) - 1,
+								'ball': ball.get('ball_number', ball_pos + 1) - 1,
+								'bowler_id': bowler_id,
+								'game_id': game_id,
+								'timestamp': timestamp
+							}
+							packed = [(column, COLUMN_STRUCTS[column].pack(value)) for column, value in row.items()]
+						except (TypeError, struct.error) as e:
+							skipped += 1
+							logger.warning(f"Game {game_id}, {name} frame {frame_pos + 1} ball {ball_pos + 1} not exported: {e}")
+							continue
+						for column, data in packed:
+							buffers[column] += data
+						rows += 1
+
+			if (total_games - start) % FLUSH_GAMES == 0:
+				self._flush(buffers)
+
+		if total_games < start:
+			return None
+
+		self._flush(buffers)
+		self.manifest['rows'] += rows
+		self.manifest['games_exported'] = total_games
+		tmp_path = self.manifest_path + '.tmp'
+		with open(tmp_path, 'w') as f:
+			json.dump(self.manifest, f, indent=2)
+		os.replace(tmp_path, self.manifest_path)
+
+		logger.info(f"Exported {rows} balls from {total_games - start} games ({self.manifest['rows']} total, {skipped} skipped)")
+		return rows
+
+def open_columns(export_dir: str = EXPORT_DIR) -> Dict[str, Any]:
+	"""Memory-map every exported column as a read-only numpy array"""
+	import numpy as np  # Optional: only needed by analytics consumers
+
+	with open(os.path.join(export_dir, MANIFEST_FILE), 'r') as f:
+		manifest = json.load(f)
+	rows = manifest['rows']
+	arrays = {}
+	for name, column in manifest['columns'].items():
+		path = os.path.join(export_dir, column['file'])
+		arrays[name] = np.memmap(path, dtype=column['dtype'], mode='r', shape=(rows,)) if rows else np.empty(0, dtype=column['dtype'])
+	return arrays
+
+
+if __name__ == "__main__":
+	logging.basicConfig(level=logging.INFO)
+
+	parser = argparse.ArgumentParser(description="Export ball history to memory-mappable columns")
+	parser.add_argument('--db', default=DB_FILE, help="Game database file")
+	parser.add_argument('--out', default=EXPORT_DIR, help="Export directory")
+	parser.add_argument('--full', action='store_true', help="Rewrite the export instead of appending new games")
+	args = parser.parse_args()
+
+	exporter = BallHistoryExporter(args.out)
+	if args.full:
+		exporter.reset()
+	exporter.export_db(args.db)
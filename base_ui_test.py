@@ -23,7 +23,9 @@ from adafruit_ads1x15.analog_in import AnalogIn as AIN
 import subprocess
 import sys
 from event_dispatcher import dispatcher
-from Lane_Client_2 import AsyncLaneClient as AsyncClient
+from lane_dispatcher import get_lane_dispatcher
+from ui_bridge import UIBridge, ui_listener, notify
+from Lane_Client import AsyncLaneClient as AsyncClient
 
 control = [0,0,0,0,0]
 
@@ -201,10 +203,11 @@ class SystemControlWindow:
 		self.window.destroy()
 
 class BaseUI(tk.Tk):
-	def __init__(self, lane_id):
-		# Ensure only one root window exists
+	def __init__(self, lane_id, host=None):
+		"""host: another BaseUI's client to run this lane on (one process driving a lane pair)"""
+		# Ensure only one root window exists, unless this lane is hosted next to another
 		existing_root = tk._default_root
-		if existing_root is not None and existing_root != self:
+		if host is None and existing_root is not None and existing_root != self:
 			logger.warning("Another Tkinter root window exists - destroying it")
 			existing_root.destroy()
 		
@@ -218,6 +221,9 @@ class BaseUI(tk.Tk):
 		self._initialized = True
 		
 		self.lane_id = lane_id
+		self.host = host
+		# A hosted lane hears only its own events; the process's own lane uses the shared dispatcher
+		self.dispatcher = get_lane_dispatcher(lane_id) if host else dispatcher
 		self.title(f"Lane {self.lane_id}")
 		self.geometry('1500x750')
 		self.after(250, self.wm_attributes, '-fullscreen', 'true')
@@ -226,6 +232,10 @@ class BaseUI(tk.Tk):
 		# Create the machine instance once
 		self.machine = MachineFunctions()
 		
+		# Lane events that touch widgets are run on this thread by the bridge
+		self.ui = UIBridge(self, lane_id=str(self.lane_id))
+		self.ui.start()
+		
 		# Initialize event listeners
 		self.setup_event_listeners()
 	
@@ -298,12 +308,19 @@ class BaseUI(tk.Tk):
 		self.top_bar.grid_columnconfigure(3, weight=0)
 		
 	def setup_client(self):
+		# Ensure clean shutdown
+		self.protocol("WM_DELETE_WINDOW", self.cleanup)
+		
+		if self.host:
+			# Runs on the host's loop and, once the server multiplexes, its connection
+			logger.info(f"Hosting lane {self.lane_id} on the client of lane {self.host.lane_id}")
+			self.client = self.host.host_lane(self.lane_id, self.dispatcher)
+			return
+		
 		# Always create a fresh client
 		logger.info("Creating fresh client connection")
 		self.client = AsyncClient()
 		
-		# Ensure clean shutdown
-		self.protocol("WM_DELETE_WINDOW", self.cleanup)
 		
 		# Start client in a dedicated thread
 		self.client_thread = Thread(target=self.run_client, daemon=True)
@@ -313,34 +330,12 @@ class BaseUI(tk.Tk):
 		"""Send a message to another lane via the client."""
 		try:
 			if hasattr(self, 'client') and self.client:
-				# Create the message in the expected format
-				message = {
-					'type': 'lane_command',
-					'lane_id': target_lane,
-					'data': data
-				}
-				
-				# Send via client - need to handle asyncio properly
-				import asyncio
-				
-				# Create a task to send the message
-				def send_async():
-					loop = asyncio.new_event_loop()
-					asyncio.set_event_loop(loop)
-					try:
-						loop.run_until_complete(self.client.send_message(message))
-						logger.info(f"Successfully sent {message_type} to lane {target_lane}")
-					except Exception as e:
-						logger.error(f"Error sending message to lane {target_lane}: {e}")
-					finally:
-						loop.close()
-				
-				# Run in a separate thread to avoid blocking
-				from threading import Thread
-				send_thread = Thread(target=send_async, daemon=True)
-				send_thread.start()
-				
-				return True
+				# The client uses the direct link to a paired lane when it is up, otherwise the server
+				if self.client.post_to_lane(target_lane, message_type, data):
+					logger.info(f"Queued {message_type} for lane {target_lane}")
+					return True
+				logger.error(f"Client not running, could not send {message_type} to lane {target_lane}")
+				return False
 			else:
 				logger.error("No client available to send message")
 				return False
@@ -365,29 +360,34 @@ class BaseUI(tk.Tk):
 		"""Register event listeners with proper error handling"""
 		logger.info("Setting up event listeners...")
 		
-		logger.info("Registered listener for 'quick_game'")
-		handlers = {
+		# Handlers that touch widgets run on the Tk thread
+		ui_handlers = {
 			'quick_game': self.start_quick_game,
 			'league_game': self.start_league_game,
-			'skip_pressed': self.activate_ball_detector,
 			'set_game_display': self.set_game_display,
-			'pin_set': self.handle_pin_set,
-			'test_message': self.handle_test_message,
 			'scroll_message': self.set_scroll_message,
-			'force_full_reset': self.handle_force_full_reset,
 			'bowler_move': self.handle_bowler_move,
 			'frame_update': self.handle_frame_update,
 			'game_complete': self.handle_game_complete,
-			'request_machine_status': self.handle_request_machine_status,
-			'schedule_reset': self.handle_schedule_reset,
-			'schedule_pin_restore': self.handle_schedule_pin_restore,
 			'end_game_request': self.handle_end_game_request,
 			'practice_game': self.handle_start_practice_game
 		}
+		handlers = {event: ui_listener(handler, self.ui) for event, handler in ui_handlers.items()}
+		
+		# Machine control blocks on pin cycles, so it stays off the Tk thread
+		handlers.update({
+			'skip_pressed': self.activate_ball_detector,
+			'pin_set': self.handle_pin_set,
+			'test_message': self.handle_test_message,
+			'force_full_reset': self.handle_force_full_reset,
+			'request_machine_status': self.handle_request_machine_status,
+			'schedule_reset': self.handle_schedule_reset,
+			'schedule_pin_restore': self.handle_schedule_pin_restore
+		})
 		
 		for event, handler in handlers.items():
 			try:
-				dispatcher.register_listener(event, handler)
+				self.dispatcher.register_listener(event, handler)
 				logger.info(f"Registered event handler for {event}")
 			except Exception as e:
 				logger.error(f"Failed to register handler for {event}: {e}")
@@ -487,11 +487,9 @@ class BaseUI(tk.Tk):
 		"""Handle test messages sent from the UI"""
 		try:
 			await self.client.process_message(data)
-			self.after(0)
 		except Exception as e:
 			error_msg = f"Test failed: {str(e)}"
 			logger.error(error_msg)
-			self.after(0)
 	
 	def handle_schedule_pin_restore(self, data=None):
 		"""Handle scheduled pin restore requests"""
@@ -507,12 +505,12 @@ class BaseUI(tk.Tk):
 		loop = asyncio.new_event_loop()
 		asyncio.set_event_loop(loop)
 		try:
-			loop.run_until_complete(dispatcher.dispatch_event('test_message', test_data))
-			self.after(0, lambda: self.set_scroll_message("Test successful"))
+			loop.run_until_complete(self.dispatcher.dispatch_event('test_message', test_data))
+			self.ui.post(self.set_scroll_message, "Test successful")
 		except Exception as e:
 			error_msg = f"Test failed: {str(e)}"
 			logger.error(error_msg)
-			self.after(0, lambda: self.set_scroll_message(error_msg))
+			self.ui.post(self.set_scroll_message, error_msg)
 		finally:
 			loop.close()
 
@@ -551,15 +549,14 @@ class BaseUI(tk.Tk):
 	def update_lane_status(self, status):
 		"""Update the lane status on the server"""
 		try:
-			if hasattr(self, 'client'):
+			if hasattr(self, 'client') and self.client:
 				message = {
 					'type': 'status_update',
 					'lane_id': self.lane_id,
 					'status': status
 				}
-				# Queue the message to be sent
-				if hasattr(self.client, 'send_message'):
-					asyncio.create_task(self.client.send_message(message))
+				# Queue the message to be sent on the client loop
+				self.client.post_message(message)
 				logger.info(f"Lane {self.lane_id} status updated to {status}")
 		except Exception as e:
 			logger.error(f"Error updating lane status: {e}")
@@ -584,7 +581,7 @@ class BaseUI(tk.Tk):
 		else:
 			logger.warning(f"Scroll text widget not available for message: {message[:50]}...")
 			
-	async def start_quick_game(self, data):
+	def start_quick_game(self, data):
 		"""Handle the quick_game event to initialize a Quick Game."""
 		logger.info(f"Starting Quick Game with data: {data}")
 		logger.info(f"Received quick_game command with data: {data}")
@@ -728,7 +725,7 @@ class BaseUI(tk.Tk):
 			logger.error("Cannot initialize ball detector: No active game")
 			return False
 
-	async def start_league_game(self, data):
+	def start_league_game(self, data):
 		"""Handle the league_game event to initialize a League Game."""
 		logger.info(f"Starting League Game with data: {data}")
 		try:
@@ -824,6 +821,10 @@ class BaseUI(tk.Tk):
 				# The LeagueGame __init__ should have already set this up
 				logger.info("Machine symbol popup callback should be set by league game")
 	
+			# Open the direct link to the paired lane before any team traffic
+			if paired_lane and hasattr(self, 'client') and self.client:
+				self.client.pair_with_lane(paired_lane)
+			
 			# Start the League Game
 			self.league_game.start()
 			logger.info(f"League Game started with bowlers: {[b.get('name', b) for b in bowlers]}")
@@ -852,9 +853,8 @@ class BaseUI(tk.Tk):
 			'control_change': machine.control_change.copy()
 		}
 		
-		# Send status back through dispatcher
-		if 'machine_status_response' in dispatcher.listeners:
-			dispatcher.listeners['machine_status_response'][0](status_data)
+		# Send status back through dispatcher; the game's listener runs on the Tk thread
+		notify('machine_status_response', status_data, self.dispatcher)
 
 	def handle_bowler_move(self, data):
 		"""Handle a bowler moving between lanes during league play"""
@@ -1299,7 +1299,9 @@ class BaseUI(tk.Tk):
 		 
 	def cleanup(self):
 		"""Properly clean up resources"""
-		if hasattr(self, 'client'):
+		if hasattr(self, 'ui'):
+			self.ui.stop()
+		if hasattr(self, 'client') and self.client:
 			self.client.stop()
 		if hasattr(self, 'client_thread'):
 			self.client_thread.join(timeout=1)
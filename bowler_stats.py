@@ -0,0 +1,295 @@
+"""
+Per-bowler statistics aggregates maintained from saved game records.
+
+Aggregates are updated incrementally each time a game is written to
+database/bowling.db, so league screens can look up a bowler's average,
+strike/spare rates and pin-leave frequencies without re-reading history.
+Each game appends the updated aggregates of its bowlers to a journal next
+to the stats file instead of rewriting it; loading replays the journal
+over the stats file and folds it back in once it grows past
+COMPACT_AFTER lines. The shared store loads on a background thread so a
+game screen never waits on the disk - use when_loaded() for anything
+that needs the history. Run ``python bowler_stats.py --rebuild`` to
+regenerate them from scratch.
+"""
+
+import argparse
+import json
+import logging
+import os
+from dataclasses import dataclass, field, asdict
+from threading import Event, Lock, Thread
+from typing import Callable, Dict, Optional, Iterable
+from game_reader import DB_FILE, iter_games
+
+logger = logging.getLogger(__name__)
+
+STATS_FILE = 'database/bowler_stats.json'
+COMPACT_AFTER = 500  # Journal lines folded back into the stats file on load
+HEAD_PIN_INDEX = 2  # cFive in [lTwo, lThree, cFive, rThree, rTwo]
+FULL_RACK = 15
+
+@dataclass
+class BowlerStats:
+	name: str
+	games: int = 0
+	pinfall: int = 0
+	high_game: int = 0
+	frames: int = 0			   # Frames with at least one ball thrown
+	strikes: int = 0
+	spares: int = 0
+	spare_chances: int = 0	   # Non-strike frames with a second ball
+	head_pins: int = 0		   # First balls that took out the head pin
+	pattern_counts: Dict[str, int] = field(default_factory=dict)  # First-ball symbols from settings.patterns
+	leave_counts: Dict[str, int] = field(default_factory=dict)	# Pins left standing after first ball, e.g. '10001'
+
+	@property
+	def average(self) -> int:
+		return self.pinfall // self.games if self.games else 0
+
+	@property
+	def strike_rate(self) -> float:
+		return self.strikes / self.frames if self.frames else 0.0
+
+	@property
+	def spare_rate(self) -> float:
+		return self.spares / self.spare_chances if self.spare_chances else 0.0
+
+	@property
+	def head_pin_rate(self) -> float:
+		return self.head_pins / self.frames if self.frames else 0.0
+
+	def leave_frequency(self, leave: str) -> float:
+		"""Fraction of non-strike first balls that left the given pin string standing"""
+		non_strikes = self.frames - self.strikes
+		return self.leave_counts.get(leave, 0) / non_strikes if non_strikes > 0 else 0.0
+
+	def add_game(self, bowler_record: Dict, pattern_symbols: Optional[set] = None):
+		"""Fold one bowler entry from a saved game record into the aggregates"""
+		score = bowler_record.get('total_score', 0) or 0
+		self.games += 1
+		self.pinfall += score
+		self.high_game = max(self.high_game, score)
+
+		for frame in bowler_record.get('frames', []):
+			balls = frame.get('balls') or []
+			if not balls:
+				continue
+
+			self.frames += 1
+			first = balls[0]
+			pin_config = first.get('pin_config') or [0, 0, 0, 0, 0]
+
+			if len(pin_config) > HEAD_PIN_INDEX and pin_config[HEAD_PIN_INDEX]:
+				self.head_pins += 1
+
+			symbol = first.get('symbol')
+			if symbol and (symbol in pattern_symbols if pattern_symbols is not None else not symbol.isdigit()):
+				self.pattern_counts[symbol] = self.pattern_counts.get(symbol, 0) + 1
+
+			if frame.get('is_strike') or first.get('value') == FULL_RACK:
+				self.strikes += 1
+				continue
+
+			leave = ''.join('0' if pin else '1' for pin in pin_config)
+			self.leave_counts[leave] = self.leave_counts.get(leave, 0) + 1
+
+			if len(balls) >= 2:
+				self.spare_chances += 1
+				if frame.get('is_spare'):
+					self.spares += 1
+
+	def to_dict(self) -> Dict:
+		return asdict(self)
+
+	@classmethod
+	def from_dict(cls, data: Dict) -> 'BowlerStats':
+		known = {k: v for k, v in data.items() if k in cls.__dataclass_fields__}
+		return cls(**known)
+
+class BowlerStatsStore:
+	"""Materialized per-bowler aggregates keyed by bowler name"""
+	def __init__(self, stats_file: str = STATS_FILE, patterns: Optional[Dict[str, str]] = None, background: bool = False):
+		self.stats_file = stats_file
+		self.journal_file = stats_file + '.log'
+		self.pattern_symbols = set(patterns.values()) if patterns else None
+		self.bowlers: Dict[str, BowlerStats] = {}
+		self.lock = Lock()
+		self.loaded = Event()
+		self._on_loaded = []
+		if background:
+			Thread(target=self.load, name='bowler-stats-load', daemon=True).start()
+		else:
+			self.load()
+
+	def load(self):
+		"""Load persisted aggregates and replay the journal, starting empty if none exist"""
+		bowlers = {}
+		journal_lines = 0
+		try:
+			if os.path.exists(self.stats_file):
+				with open(self.stats_file, 'r') as f:
+					data = json.load(f)
+				bowlers = {name: BowlerStats.from_dict(entry) for name, entry in data.get('bowlers', {}).items()}
+			if os.path.exists(self.journal_file):
+				with open(self.journal_file, 'r') as f:
+					for line in f:
+						journal_lines += 1
+						try:
+							entry = json.loads(line)
+						except ValueError:
+							continue  # Torn last line from a crash mid-append
+						for name, stats in entry.items():
+							bowlers[name] = BowlerStats.from_dict(stats)
+			logger.info(f"Loaded stats for {len(bowlers)} bowlers from {self.stats_file} ({journal_lines} journal lines)")
+		except Exception as e:
+			logger.error(f"Error loading bowler stats: {e}")
+			bowlers = {}
+			journal_lines = 0  # Never compact over files we could not read
+
+		with self.lock:
+			self.bowlers = bowlers
+			if journal_lines >= COMPACT_AFTER:
+				self.save()
+			callbacks, self._on_loaded = self._on_loaded, []
+			self.loaded.set()
+		for callback in callbacks:
+			try:
+				callback()
+			except Exception as e:
+				logger.error(f"Error in bowler stats callback: {e}")
+
+	def when_loaded(self, callback: Callable[[], None]):
+		"""Run callback once aggregates are loaded - now if they are, otherwise on the loading thread"""
+		with self.lock:
+			if not self.loaded.is_set():
+				self._on_loaded.append(callback)
+				return
+		callback()
+
+	def save(self):
+		"""Write all aggregates atomically next to the game database and clear the journal"""
+		try:
+			directory = os.path.dirname(self.stats_file)
+			if directory:
+				os.makedirs(directory, exist_ok=True)
+
+			tmp_file = self.stats_file + '.tmp'
+			with open(tmp_file, 'w') as f:
+				json.dump({'bowlers': {name: s.to_dict() for name, s in self.bowlers.items()}}, f)
+			os.replace(tmp_file, self.stats_file)
+			# Journal entries are whole aggregates, so a crash before this just replays them again
+			if os.path.exists(self.journal_file):
+				os.remove(self.journal_file)
+		except Exception as e:
+			logger.error(f"Error saving bowler stats: {e}")
+
+	def _append(self, entries: Dict[str, Dict]):
+		"""Journal the given bowlers' aggregates as one line"""
+		try:
+			directory = os.path.dirname(self.journal_file)
+			if directory:
+				os.makedirs(directory, exist_ok=True)
+			with open(self.journal_file, 'a') as f:
+				f.write(json.dumps(entries) + '\n')
+		except Exception as e:
+			logger.error(f"Error journaling bowler stats: {e}")
+
+	def record_game(self, game_record: Dict, save: bool = True,
+					then: Optional[Callable[[Dict[str, Dict]], None]] = None):
+		"""
+		Update aggregates for every bowler in a newly saved game record, then
+		call then() with their updated aggregates keyed by name. Never waits
+		on the load: folding into a half-loaded store would lose the history,
+		so a game saved before it is in is folded on the loading thread.
+		"""
+		def fold():
+			try:
+				updated = self._record(game_record, save)
+			except Exception as e:
+				logger.error(f"Error recording game in bowler stats: {e}")
+				updated = {}
+			if then:
+				then(updated)
+		self.when_loaded(fold)
+
+	def _record(self, game_record: Dict, save: bool) -> Dict[str, Dict]:
+		with self.lock:
+			updated = {}
+			for bowler_record in game_record.get('bowlers', []):
+				name = bowler_record.get('name')
+				if not name:
+					continue
+				stats = self.bowlers.get(name)
+				if stats is None:
+					stats = self.bowlers[name] = BowlerStats(name=name)
+				stats.add_game(bowler_record, self.pattern_symbols)
+				updated[name] = stats.to_dict()
+			if save and updated:
+				self._append(updated)
+			return updated
+
+	def get(self, name: str) -> Optional[BowlerStats]:
+		return self.bowlers.get(name)
+
+	def average(self, name: str, default: int = 0) -> int:
+		"""Local average for a bowler, or default if they have no games on record (or none loaded yet)"""
+		stats = self.bowlers.get(name)
+		return stats.average if stats and stats.games else default
+
+	def rebuild(self, game_records: Iterable[Dict]):
+		"""Discard current aggregates and recompute them from game history"""
+		self.loaded.wait()
+		with self.lock:
+			self.bowlers = {}
+		count = 0
+		for game_record in game_records:
+			self._record(game_record, save=False)
+			count += 1
+		with self.lock:
+			self.save()
+		logger.info(f"Rebuilt stats for {len(self.bowlers)} bowlers from {count} games")
+		return count
+
+_store = None
+_store_lock = Lock()
+
+def get_stats_store(patterns: Optional[Dict[str, str]] = None) -> BowlerStatsStore:
+	"""Shared store used by the games for incremental updates, loaded in the background"""
+	global _store
+	with _store_lock:
+		if _store is None:
+			_store = BowlerStatsStore(patterns=patterns, background=True)
+		elif patterns and _store.pattern_symbols is None:
+			_store.pattern_symbols = set(patterns.values())
+	return _store
+
+
+if __name__ == "__main__":
+	logging.basicConfig(level=logging.INFO)
+
+	parser = argparse.ArgumentParser(description="Bowler statistics aggregates")
+	parser.add_argument('--rebuild', action='store_true', help="Recompute all aggregates from stored history")
+	parser.add_argument('--db', default=DB_FILE, help="Game database file")
+	parser.add_argument('--stats', default=STATS_FILE, help="Aggregates file")
+	parser.add_argument('--settings', default='settings.json', help="Settings file providing symbol patterns")
+	parser.add_argument('bowler', nargs='?', help="Show stats for one bowler")
+	args = parser.parse_args()
+
+	patterns = None
+	if os.path.exists(args.settings):
+		with open(args.settings) as f:
+			patterns = json.load(f).get('patterns')
+
+	store = BowlerStatsStore(stats_file=args.stats, patterns=patterns)
+	if args.rebuild:
+		store.rebuild(iter_games(args.db, fields=['bowlers.name', 'bowlers.total_score', 'bowlers.frames']))
+
+	names = [args.bowler] if args.bowler else sorted(store.bowlers)
+	for name in names:
+		stats = store.get(name)
+		if not stats:
+			print(f"{name}: no games on record")
+			continue
+		print(f"{name}: games={stats.games} avg={stats.average} high={stats.high_game} "
+			  f"strike={stats.strike_rate:.1%} spare={stats.spare_rate:.1%} head_pin={stats.head_pin_rate:.1%}")
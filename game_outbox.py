@@ -0,0 +1,177 @@
+"""
+Durable outbox for records that must reach the server.
+
+Completed games and score corrections are appended to a JSON-lines file
+under database/ and stay there until the server acknowledges them, so a
+lane that loses its server connection mid-league never holds results
+only in memory. AsyncLaneClient drains the outbox in batches once registered.
+Records the server explicitly rejects, or leaves unaccepted for
+max_attempts answered batches in a row, are moved to a dead-letter file
+so one bad record cannot hold back every later game.
+"""
+
+import json
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, Any, List, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_FILE = 'database/outbox.jsonl'
+ACKED_FILE = 'database/outbox.acked'
+DEAD_FILE = 'database/outbox.dead'
+
+class GameOutbox:
+	def __init__(self, outbox_file: str = OUTBOX_FILE, acked_file: str = ACKED_FILE, compact_threshold: int = 200,
+				 dead_file: str = DEAD_FILE, max_attempts: int = 5):
+		self.outbox_file = outbox_file
+		self.acked_file = acked_file
+		self.dead_file = dead_file
+		self.compact_threshold = compact_threshold
+		self.max_attempts = max_attempts
+		self.pending: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+		self.attempts: Dict[str, int] = {}  # Record ID -> answered batches that did not accept it
+		self.acked_since_compact = 0
+		self.lock = Lock()
+		self.load()
+
+	def load(self):
+		"""Rebuild the pending set from the outbox and ack files"""
+		self.corrupt_lines = 0
+		acked = set()
+		for entry in self._read_lines(self.acked_file):
+			acked.add(entry)
+		for entry in self._read_lines(self.outbox_file):
+			if isinstance(entry, dict) and entry.get('id') and entry['id'] not in acked:
+				self.pending[entry['id']] = entry
+		self.acked_since_compact = len(acked)
+		if self.corrupt_lines:
+			# Rewrite so the next append does not land on the end of a torn line
+			self._compact()
+		if self.pending:
+			logger.info(f"Outbox has {len(self.pending)} unsent records")
+
+	def _read_lines(self, path: str) -> Iterable[Any]:
+		if not os.path.exists(path):
+			return
+		with open(path, 'r') as f:
+			for line in f:
+				line = line.strip()
+				if not line:
+					continue
+				try:
+					yield json.loads(line)
+				except json.JSONDecodeError:
+					# Torn write from a power cut - the record was never acknowledged either
+					self.corrupt_lines += 1
+					logger.warning(f"Skipping corrupt outbox line in {path}")
+
+	def _append_lines(self, path: str, objs: List[Any]):
+		directory = os.path.dirname(path)
+		if directory:
+			os.makedirs(directory, exist_ok=True)
+		with open(path, 'a') as f:
+			f.write(''.join(json.dumps(obj, separators=(',', ':')) + '\n' for obj in objs))
+			f.flush()
+			os.fsync(f.fileno())
+
+	def append(self, kind: str, payload: Dict[str, Any], lane_id: Optional[str] = None) -> str:
+		"""Durably queue a record for upload and return its dedup ID"""
+		entry = {
+			'id': uuid.uuid4().hex,
+			'kind': kind,
+			'lane_id': lane_id,
+			'created': time.time(),
+			'payload': payload
+		}
+		with self.lock:
+			self._append_lines(self.outbox_file, [entry])
+			self.pending[entry['id']] = entry
+		logger.info(f"Queued {kind} record {entry['id']} for upload ({len(self.pending)} pending)")
+		return entry['id']
+
+	def has_pending(self) -> bool:
+		return bool(self.pending)
+
+	def peek_batch(self, max_records: int = 20) -> List[Dict[str, Any]]:
+		"""Oldest unacknowledged records, without removing them"""
+		with self.lock:
+			batch = []
+			for entry in self.pending.values():
+				batch.append(entry)
+				if len(batch) >= max_records:
+					break
+			return batch
+
+	def ack(self, ids: Iterable[str]) -> int:
+		"""Mark records as delivered; unknown or repeated IDs are ignored"""
+		with self.lock:
+			acked = [record_id for record_id in ids if self.pending.pop(record_id, None) is not None]
+			self._remove(acked)
+		return len(acked)
+
+	def reject(self, ids: Iterable[str], reason: str) -> int:
+		"""Move records to the dead-letter file so later records are not held behind them"""
+		with self.lock:
+			dead = [self.pending.pop(record_id) for record_id in ids if record_id in self.pending]
+			if not dead:
+				return 0
+			now = time.time()
+			self._append_lines(self.dead_file, [dict(entry, rejected=reason, rejected_at=now) for entry in dead])
+			self._remove([entry['id'] for entry in dead])
+		logger.warning(f"Moved {len(dead)} outbox records to {self.dead_file}: {reason}")
+		return len(dead)
+
+	def not_accepted(self, ids: Iterable[str]) -> List[str]:
+		"""Count a batch answered without these records; returns those now out of attempts"""
+		with self.lock:
+			exhausted = []
+			for record_id in ids:
+				if record_id in self.pending:
+					self.attempts[record_id] = self.attempts.get(record_id, 0) + 1
+					if self.attempts[record_id] >= self.max_attempts:
+						exhausted.append(record_id)
+			return exhausted
+
+	def _remove(self, ids: List[str]):
+		"""Log records that left the pending set (caller holds the lock)"""
+		if not ids:
+			return
+		for record_id in ids:
+			self.attempts.pop(record_id, None)
+		self.acked_since_compact += len(ids)
+		if not self.pending or self.acked_since_compact >= self.compact_threshold:
+			self._compact()
+		else:
+			self._append_lines(self.acked_file, ids)
+
+	def _compact(self):
+		"""Rewrite the outbox with only pending records and clear the ack log"""
+		try:
+			tmp_file = self.outbox_file + '.tmp'
+			with open(tmp_file, 'w') as f:
+				for entry in self.pending.values():
+					f.write(json.dumps(entry, separators=(',', ':')) + '\n')
+				f.flush()
+				os.fsync(f.fileno())
+			os.replace(tmp_file, self.outbox_file)
+			if os.path.exists(self.acked_file):
+				os.remove(self.acked_file)
+			self.acked_since_compact = 0
+		except Exception as e:
+			logger.error(f"Error compacting outbox: {e}")
+
+_outbox = None
+_outbox_lock = Lock()
+
+def get_outbox() -> GameOutbox:
+	"""Shared outbox used by the games (producer) and the lane client (uploader)"""
+	global _outbox
+	with _outbox_lock:
+		if _outbox is None:
+			_outbox = GameOutbox()
+	return _outbox
@@ -0,0 +1,123 @@
+"""
+Streaming access to the game history in database/bowling.db.
+
+The database is a single JSON array that grows by one record per game.
+iter_games() walks it incrementally with a small read buffer and yields
+one record at a time, applying filters and field projection as it goes,
+so tools that scan the whole history run in constant memory.
+"""
+
+import json
+import os
+from typing import Any, Dict, Iterator, List, Optional
+
+DB_FILE = 'database/bowling.db'
+CHUNK_SIZE = 64 * 1024
+WHITESPACE = ' \t\r\n'
+
+def _iter_array(f, chunk_size: int) -> Iterator[Dict[str, Any]]:
+	"""Decode the elements of a top-level JSON array one by one"""
+	decoder = json.JSONDecoder()
+	buffer = ''
+	pos = 0
+	started = False
+	eof = False
+
+	while True:
+		# Skip separators between elements
+		while pos < len(buffer) and buffer[pos] in WHITESPACE + ',':
+			if buffer[pos] == ',' and not started:
+				raise ValueError("Game database is not a JSON array")
+			pos += 1
+
+		if pos < len(buffer):
+			if not started:
+				if buffer[pos] != '[':
+					raise ValueError("Game database is not a JSON array")
+				started = True
+				pos += 1
+				continue
+			if buffer[pos] == ']':
+				return
+			try:
+				record, end = decoder.raw_decode(buffer, pos)
+			except json.JSONDecodeError:
+				if eof:
+					raise
+				# Record continues past the buffer - read more below
+			else:
+				yield record
+				pos = end
+				continue
+
+		if eof:
+			if started:
+				raise ValueError("Game database ended before closing ']'")
+			return
+
+		chunk = f.read(chunk_size)
+		if not chunk:
+			eof = True
+		buffer = buffer[pos:] + chunk
+		pos = 0
+
+def field_tree(fields: List[str]) -> Dict[str, Any]:
+	"""Turn dotted field paths into a nested selection tree"""
+	tree: Dict[str, Any] = {}
+	for field_path in fields:
+		node = tree
+		for part in field_path.split('.'):
+			node = node.setdefault(part, {})
+	return tree
+
+def project(value: Any, tree: Dict[str, Any]) -> Any:
+	"""Keep only the selected fields; lists are projected element-wise"""
+	if not tree:
+		return value
+	if isinstance(value, list):
+		return [project(item, tree) for item in value]
+	if isinstance(value, dict):
+		return {key: project(value[key], sub) for key, sub in tree.items() if key in value}
+	return value
+
+def _matches(record: Dict[str, Any], start_date: Optional[str], end_date: Optional[str], bowler: Optional[str],
+			 game_type: Optional[str], min_score: Optional[int]) -> bool:
+	date = record.get('date', '')
+	if start_date and date < start_date:
+		return False
+	if end_date and date > end_date:
+		return False
+	if game_type and record.get('game_type') != game_type:
+		return False
+
+	bowlers = record.get('bowlers', [])
+	if bowler:
+		bowlers = [b for b in bowlers if b.get('name') == bowler]
+		if not bowlers:
+			return False
+	if min_score is not None and not any((b.get('total_score') or 0) >= min_score for b in bowlers):
+		return False
+	return True
+
+def iter_games(db_file: str = DB_FILE, start_date: Optional[str] = None, end_date: Optional[str] = None,
+			   bowler: Optional[str] = None, game_type: Optional[str] = None, min_score: Optional[int] = None,
+			   fields: Optional[List[str]] = None, chunk_size: int = CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+	"""
+	Yield stored game records one at a time.
+
+	Dates are inclusive 'YYYY-MM-DD' strings. min_score applies to the
+	named bowler when bowler is given, otherwise to any bowler in the game.
+	fields projects each record down to dotted paths such as
+	['date', 'bowlers.name', 'bowlers.total_score'].
+	"""
+	if not os.path.exists(db_file):
+		return
+
+	tree = field_tree(fields) if fields else None
+	with open(db_file, 'r') as f:
+		for record in _iter_array(f, chunk_size):
+			if not isinstance(record, dict):
+				continue
+			if not _matches(record, start_date, end_date, bowler, game_type, min_score):
+				continue
+			yield project(record, tree) if tree else record
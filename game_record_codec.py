@@ -0,0 +1,321 @@
+"""
+Compact binary encoding for saved game records.
+
+A record as written by QuickGame._save_current_game_data repeats the same
+keys for every ball and copies bonus balls into each strike/spare frame.
+This codec packs it into a versioned struct header, a small symbol table
+and one pin-mask byte per ball, with bonus balls stored as offsets into the
+bowler's ball sequence. decode_game() rebuilds the identical JSON record.
+
+Only that record shape is supported. Records from _save_enhanced_game_data
+(frame_number/ball_number keys, frames without balls left out) and any
+other field the format does not know about raise ValueError from
+encode_game(); callers keep those as JSON. The codec backs the archive
+helpers and CLI below - bowling.db and the upload path stay JSON.
+"""
+
+import argparse
+import json
+import logging
+import struct
+from datetime import datetime
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'FGR'
+VERSION = 2
+VERSIONS = {1, 2}  # Version 1 always wrote fouls and prize
+DEFAULT_PIN_VALUES = [2, 3, 5, 3, 2]
+
+# magic, version, flags, game_number, year, month, day, hour, minute, second, game_type
+HEADER = struct.Struct('<3sBBHHBBBBBB')
+BOWLER = struct.Struct('<HBBB')	# total_score, fouls, flags, frame_count
+FRAME = struct.Struct('<BHBB')	 # flags, total, base_score, bonus_score
+LENGTH = struct.Struct('<I')	   # record length prefix in archive files
+
+HEADER_HAS_EXTRAS = 0x01
+BOWLER_PRIZE = 0x01
+BOWLER_HAS_FOULS = 0x02
+BOWLER_HAS_PRIZE = 0x04
+FRAME_STRIKE = 0x04
+FRAME_SPARE = 0x08
+FRAME_HAS_SCORES = 0x40
+BALL_EXPLICIT_VALUE = 0x80
+
+GAME_TYPES = ['', 'quick_game', 'league_game', 'practice']
+RECORD_KEYS = {'game_number', 'game_type', 'date', 'time', 'bowlers'}
+BOWLER_KEYS = {'name', 'frames', 'total_score', 'fouls', 'prize'}
+FRAME_KEYS = {'balls', 'total', 'is_strike', 'is_spare'}
+SCORE_KEYS = {'bonus_balls', 'base_score', 'bonus_score'}
+BALL_KEYS = {'pin_config', 'symbol', 'value'}
+BONUS_KEYS = BALL_KEYS | {'frame', 'ball'}
+FRAME_SCORE_KEYS = FRAME_KEYS | SCORE_KEYS
+
+def _pack_str(buf: bytearray, text: str):
+	data = text.encode('utf-8')
+	if len(data) > 255:
+		raise ValueError(f"String too long for compact record: {text[:20]}...")
+	buf.append(len(data))
+	buf += data
+
+def _unpack_str(data: bytes, pos: int) -> Tuple[str, int]:
+	length = data[pos]
+	return data[pos + 1:pos + 1 + length].decode('utf-8'), pos + 1 + length
+
+# (pin, pin, pin, pin, pin) -> (mask byte, value with default pin values) for all 32 racks
+PIN_MASKS = {
+	tuple((mask >> i) & 1 for i in range(5)): (mask, sum(((mask >> i) & 1) * v for i, v in enumerate(DEFAULT_PIN_VALUES)))
+	for mask in range(32)
+}
+PIN_CONFIGS = {mask: (pins, value) for pins, (mask, value) in PIN_MASKS.items()}
+
+def _bonus_offsets(frame_idx: int, bonus_balls: List[Dict[str, Any]], flat: List[Tuple[int, Dict[str, Any]]],
+				   first_offset: List[int]) -> List[int]:
+	"""Map copied bonus balls back to positions in the bowler's ball sequence"""
+	offsets = []
+	next_frames = [i for i in range(frame_idx + 1, len(first_offset)) if first_offset[i] is not None]
+	search = first_offset[next_frames[0]] if next_frames else len(flat)
+	for ordinal, bonus in enumerate(bonus_balls, 1):
+		if bonus.keys() != BONUS_KEYS or bonus['ball'] != ordinal:
+			raise ValueError(f"Unsupported bonus ball entry {bonus}")
+		while search < len(flat):
+			ball_frame, ball = flat[search]
+			search += 1
+			if ball_frame == bonus['frame'] - 1 and all(ball[k] == bonus[k] for k in BALL_KEYS):
+				offsets.append(search - 1)
+				break
+		else:
+			raise ValueError(f"Bonus ball {bonus} does not match a thrown ball")
+	return offsets
+
+def encode_game(record: Dict[str, Any]) -> bytes:
+	"""Pack a saved game record into the compact binary format; ValueError if it cannot be represented"""
+	try:
+		return _encode_game(record)
+	except (KeyError, TypeError, AttributeError, IndexError, struct.error) as e:
+		raise ValueError(f"Record cannot be packed: {e!r}") from e
+
+def _encode_game(record: Dict[str, Any]) -> bytes:
+	extras = {k: v for k, v in record.items() if k not in RECORD_KEYS}
+	game_type = record.get('game_type', '')
+	if game_type not in GAME_TYPES:
+		extras['game_type'] = game_type
+		game_type = ''
+	saved = datetime.strptime(f"{record['date']} {record['time']}", "%Y-%m-%d %H:%M:%S")
+
+	symbols: Dict[str, int] = {}
+	body = bytearray()
+	bowlers = record.get('bowlers', [])
+	body.append(len(bowlers))
+
+	for bowler in bowlers:
+		if not bowler.keys() <= BOWLER_KEYS:
+			raise ValueError(f"Unsupported bowler fields {bowler.keys() - BOWLER_KEYS}")
+		frames = bowler['frames']
+		_pack_str(body, bowler['name'])
+		bowler_flags = 0
+		if 'fouls' in bowler:
+			bowler_flags |= BOWLER_HAS_FOULS
+		if 'prize' in bowler:
+			if not isinstance(bowler['prize'], bool):
+				raise ValueError(f"Unsupported prize value {bowler['prize']!r}")
+			bowler_flags |= BOWLER_HAS_PRIZE | (BOWLER_PRIZE if bowler['prize'] else 0)
+		body += BOWLER.pack(bowler['total_score'], bowler.get('fouls', 0), bowler_flags, len(frames))
+
+		flat: List[Tuple[int, Dict[str, Any]]] = []
+		first_offset: List[Any] = []
+		for frame_idx, frame in enumerate(frames):
+			first_offset.append(len(flat) if frame['balls'] else None)
+			flat.extend((frame_idx, ball) for ball in frame['balls'])
+		if len(flat) > 255:
+			raise ValueError("Too many balls for compact record")
+
+		for frame_idx, frame in enumerate(frames):
+			keys = frame.keys()
+			has_scores = keys == FRAME_SCORE_KEYS
+			if not has_scores and keys != FRAME_KEYS:
+				raise ValueError(f"Unsupported frame fields {set(keys)}")
+			balls = frame['balls']
+			bonus = _bonus_offsets(frame_idx, frame['bonus_balls'], flat, first_offset) if has_scores else []
+			if len(balls) > 3 or len(bonus) > 2:
+				raise ValueError("Frame has too many balls for compact record")
+
+			flags = len(balls) | (len(bonus) << 4)
+			flags |= FRAME_STRIKE if frame['is_strike'] else 0
+			flags |= FRAME_SPARE if frame['is_spare'] else 0
+			flags |= FRAME_HAS_SCORES if has_scores else 0
+			body += FRAME.pack(flags, frame['total'], frame.get('base_score', 0), frame.get('bonus_score', 0))
+
+			for ball in balls:
+				if ball.keys() != BALL_KEYS:
+					raise ValueError(f"Unsupported ball fields {set(ball)}")
+				packed = PIN_MASKS.get(tuple(ball['pin_config']))
+				if packed is None:
+					raise ValueError(f"Unsupported pin_config {ball['pin_config']}")
+				mask, value = packed
+				if ball['value'] == value:
+					body.append(mask)
+				else:
+					body.append(mask | BALL_EXPLICIT_VALUE)
+					body.append(ball['value'])
+				symbol = ball['symbol']
+				index = symbols.get(symbol)
+				if index is None:
+					index = symbols[symbol] = len(symbols)
+				body.append(index)
+			body += bytes(bonus)
+
+	if len(symbols) > 255:
+		raise ValueError("Too many symbols for compact record")
+
+	out = bytearray(HEADER.pack(
+		MAGIC, VERSION, HEADER_HAS_EXTRAS if extras else 0, record.get('game_number', 0),
+		saved.year, saved.month, saved.day, saved.hour, saved.minute, saved.second,
+		GAME_TYPES.index(game_type)
+	))
+	out.append(len(symbols))
+	for symbol in symbols:
+		_pack_str(out, symbol)
+	if extras:
+		extras_data = json.dumps(extras, separators=(',', ':')).encode('utf-8')
+		out += struct.pack('<H', len(extras_data)) + extras_data
+	return bytes(out + body)
+
+def decode_game(data: bytes) -> Dict[str, Any]:
+	"""Rebuild the JSON game record from its compact binary form"""
+	(magic, version, flags, game_number, year, month, day, hour, minute, second,
+	 game_type) = HEADER.unpack_from(data, 0)
+	if magic != MAGIC:
+		raise ValueError("Not a compact game record")
+	if version not in VERSIONS:
+		raise ValueError(f"Unsupported compact record version {version}")
+	pos = HEADER.size
+
+	symbols = []
+	symbol_count = data[pos]
+	pos += 1
+	for _ in range(symbol_count):
+		symbol, pos = _unpack_str(data, pos)
+		symbols.append(symbol)
+
+	record: Dict[str, Any] = {'game_number': game_number}
+	if GAME_TYPES[game_type]:
+		record['game_type'] = GAME_TYPES[game_type]
+	record['date'] = f"{year:04d}-{month:02d}-{day:02d}"
+	record['time'] = f"{hour:02d}:{minute:02d}:{second:02d}"
+	if flags & HEADER_HAS_EXTRAS:
+		(length,) = struct.unpack_from('<H', data, pos)
+		record.update(json.loads(data[pos + 2:pos + 2 + length].decode('utf-8')))
+		pos += 2 + length
+
+	bowlers = []
+	bowler_count = data[pos]
+	pos += 1
+	for _ in range(bowler_count):
+		name, pos = _unpack_str(data, pos)
+		total_score, fouls, bowler_flags, frame_count = BOWLER.unpack_from(data, pos)
+		pos += BOWLER.size
+
+		frames = []
+		flat: List[Tuple[int, Dict[str, Any]]] = []
+		pending_bonus: List[Tuple[Dict[str, Any], List[int]]] = []
+		for frame_idx in range(frame_count):
+			frame_flags, total, base_score, bonus_score = FRAME.unpack_from(data, pos)
+			pos += FRAME.size
+
+			balls = []
+			for _ in range(frame_flags & 0x03):
+				mask = data[pos]
+				pos += 1
+				pin_config, value = PIN_CONFIGS[mask & 0x1F]
+				pin_config = list(pin_config)
+				if mask & BALL_EXPLICIT_VALUE:
+					value = data[pos]
+					pos += 1
+				ball = {'pin_config': pin_config, 'symbol': symbols[data[pos]], 'value': value}
+				pos += 1
+				balls.append(ball)
+				flat.append((frame_idx, ball))
+
+			bonus_count = (frame_flags >> 4) & 0x03
+			offsets = list(data[pos:pos + bonus_count])
+			pos += bonus_count
+
+			frame: Dict[str, Any] = {'balls': balls}
+			if frame_flags & FRAME_HAS_SCORES:
+				frame['bonus_balls'] = []
+				frame['base_score'] = base_score
+				frame['bonus_score'] = bonus_score
+				pending_bonus.append((frame, offsets))
+			frame['total'] = total
+			frame['is_strike'] = bool(frame_flags & FRAME_STRIKE)
+			frame['is_spare'] = bool(frame_flags & FRAME_SPARE)
+			frames.append(frame)
+
+		# Bonus balls point forward, so resolve them once every ball is known
+		for frame, offsets in pending_bonus:
+			for ordinal, offset in enumerate(offsets, 1):
+				ball_frame, ball = flat[offset]
+				frame['bonus_balls'].append({'frame': ball_frame + 1, 'ball': ordinal, **{k: (list(v) if k == 'pin_config' else v) for k, v in ball.items()}})
+
+		if version == 1:
+			bowler_flags |= BOWLER_HAS_FOULS | BOWLER_HAS_PRIZE
+		bowler_record = {'name': name, 'frames': frames, 'total_score': total_score}
+		if bowler_flags & BOWLER_HAS_FOULS:
+			bowler_record['fouls'] = fouls
+		if bowler_flags & BOWLER_HAS_PRIZE:
+			bowler_record['prize'] = bool(bowler_flags & BOWLER_PRIZE)
+		bowlers.append(bowler_record)
+	record['bowlers'] = bowlers
+	return record
+
+def to_json(data: bytes, **kwargs) -> str:
+	"""JSON text for a compact record, for logs, tools and the server"""
+	return json.dumps(decode_game(data), **kwargs)
+
+def write_records(f: BinaryIO, records: Iterable[Dict[str, Any]]) -> Tuple[int, int]:
+	"""Append length-prefixed compact records to an archive; returns (written, skipped)"""
+	written = skipped = 0
+	for record in records:
+		try:
+			data = encode_game(record)
+		except ValueError as e:
+			logger.warning(f"Game {record.get('game_number')} on {record.get('date')} kept out of archive: {e}")
+			skipped += 1
+			continue
+		f.write(LENGTH.pack(len(data)) + data)
+		written += 1
+	return written, skipped
+
+def read_records(f: BinaryIO) -> Iterator[Dict[str, Any]]:
+	"""Yield decoded records from a compact archive one at a time"""
+	while True:
+		prefix = f.read(LENGTH.size)
+		if len(prefix) < LENGTH.size:
+			return
+		(length,) = LENGTH.unpack(prefix)
+		data = f.read(length)
+		if len(data) < length:
+			logger.warning("Compact archive ends with a truncated record")
+			return
+		yield decode_game(data)
+
+
+if __name__ == "__main__":
+	logging.basicConfig(level=logging.INFO)
+
+	parser = argparse.ArgumentParser(description="Convert game records between JSON and the compact binary format")
+	parser.add_argument('source', help="JSON game database (to binary) or compact archive (with --to-json)")
+	parser.add_argument('dest', help="Output file")
+	parser.add_argument('--to-json', action='store_true', help="Decode a compact archive back to a JSON database")
+	args = parser.parse_args()
+
+	if args.to_json:
+		with open(args.source, 'rb') as src, open(args.dest, 'w') as dst:
+			json.dump(list(read_records(src)), dst, indent=2)
+	else:
+		from game_reader import iter_games
+		with open(args.dest, 'wb') as dst:
+			written, skipped = write_records(dst, iter_games(args.source))
+		logger.info(f"Wrote {written} compact records ({skipped} kept as JSON only)")
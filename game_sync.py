@@ -0,0 +1,224 @@
+"""
+Incremental game-state sync from the lane to the server.
+
+The running game calls publish() whenever it refreshes its display; a new
+game object or game number starts a new session. The sync compares the
+game with what it last sent (ball counts, frame totals and the current
+bowler, so a call costs a few list comparisons) and posts only the
+differences as a sequence-numbered 'game_delta' message. Every
+change carries absolute positions and values, so applying one twice is
+harmless and a delta that overlaps a snapshot can simply be re-applied.
+The server asks for a full snapshot with 'game_sync_request' (or the
+older 'game_data_request') whenever it sees a gap in the sequence.
+
+publish() and the other game-side calls run on the Tk thread, the only
+thread that touches game objects. Each one that sends a delta also copies
+the full game state, so snapshot() - called from the client's event loop
+- serves that copy and never reads the game itself.
+"""
+
+import logging
+import uuid
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+def _ball_dict(ball) -> Dict[str, Any]:
+	return {'value': ball.value, 'symbol': ball.symbol, 'pin_config': list(ball.pin_config)}
+
+def _frame_dict(frame) -> Dict[str, Any]:
+	return {
+		'balls': [_ball_dict(ball) for ball in frame.balls],
+		'total': frame.total,
+		'is_strike': frame.is_strike,
+		'is_spare': frame.is_spare
+	}
+
+def bowler_snapshot(bowler) -> Dict[str, Any]:
+	"""Full state of one bowler in the game_data_response format"""
+	return {
+		'name': bowler.name,
+		'frames': [_frame_dict(frame) for frame in bowler.frames],
+		'total_score': bowler.total_score,
+		'current_frame': bowler.current_frame
+	}
+
+class GameStateSync:
+	def __init__(self):
+		self.lock = Lock()
+		self.send: Optional[Callable[[Dict[str, Any]], bool]] = None
+		self.lane_id: Optional[str] = None
+		self.game = None
+		self.game_id: Optional[str] = None
+		self.seq = 0
+		self._balls: List[List[int]] = []   # Per bowler, ball count per frame as last sent
+		self._totals: List[List[int]] = []  # Per bowler, frame totals as last sent
+		self._scores: List[int] = []
+		self._bowler_names: List[str] = []
+		self._current_bowler = None
+		self._game_number = None
+		self._state: Optional[Dict[str, Any]] = None  # Game state as of the last delta, copied on the Tk thread
+		self.finished = False
+		self.stats = {'deltas': 0, 'changes': 0, 'snapshots': 0, 'send_failures': 0}
+
+	def attach(self, send: Callable[[Dict[str, Any]], bool], lane_id: str):
+		"""Set the thread-safe sender used for deltas (AsyncLaneClient.post_message)"""
+		self.send = send
+		self.lane_id = lane_id
+
+	def _remember(self, game):
+		"""Record the game state as sent, and copy it for snapshots; caller holds the lock"""
+		self._state = {
+			'type': getattr(game, 'game_type', None),
+			'current_game': getattr(game, 'current_game_number', 1),
+			'total_games': getattr(game.settings, 'total_games', 1),
+			'current_bowler': game.current_bowler_index,
+			'bowlers': [bowler_snapshot(bowler) for bowler in game.bowlers]
+		}
+		if hasattr(game, 'paired_lane'):
+			self._state['paired_lane'] = game.paired_lane
+		self._balls = [[len(frame.balls) for frame in bowler.frames] for bowler in game.bowlers]
+		self._totals = [[frame.total for frame in bowler.frames] for bowler in game.bowlers]
+		self._scores = [bowler.total_score for bowler in game.bowlers]
+		self._bowler_names = [bowler.name for bowler in game.bowlers]
+		self._current_bowler = game.current_bowler_index
+
+	def _post(self, changes: List[Dict[str, Any]]):
+		"""Send one delta; caller holds the lock"""
+		self.seq += 1
+		self.stats['deltas'] += 1
+		self.stats['changes'] += len(changes)
+		if not self.send:
+			return
+		message = {
+			'type': 'game_delta',
+			'lane_id': self.lane_id,
+			'game_id': self.game_id,
+			'seq': self.seq,
+			'changes': changes
+		}
+		if not self.send(message):
+			# The server will see the sequence gap and ask for a snapshot
+			self.stats['send_failures'] += 1
+
+	def _begin(self, game) -> List[Dict[str, Any]]:
+		"""Open a new session; everything already bowled is sent as ordinary changes"""
+		self.game = game
+		self.game_id = uuid.uuid4().hex[:12]
+		self.seq = 0
+		self.finished = False
+		self._game_number = getattr(game, 'current_game_number', 1)
+		self._balls = [[0] * len(bowler.frames) for bowler in game.bowlers]
+		self._totals = [[0] * len(bowler.frames) for bowler in game.bowlers]
+		self._scores = [0] * len(game.bowlers)
+		self._bowler_names = [bowler.name for bowler in game.bowlers]
+		self._current_bowler = None
+		return [{
+			'kind': 'game_started',
+			'game_type': getattr(game, 'game_type', None),
+			'game_number': self._game_number,
+			'bowlers': self._bowler_names
+		}]
+
+	def _changes(self, game) -> List[Dict[str, Any]]:
+		"""Changes since the last delta; caller holds the lock"""
+		if game is not self.game or getattr(game, 'current_game_number', 1) != self._game_number:
+			changes = self._begin(game)
+		elif self.finished:
+			return []
+		else:
+			changes = []
+
+		if [bowler.name for bowler in game.bowlers] != self._bowler_names:
+			# Bowlers added, removed or moved - resend the lineup with all frames
+			changes.append({'kind': 'lineup', 'bowlers': [bowler_snapshot(b) for b in game.bowlers],
+							'bowler': game.current_bowler_index})
+			return changes
+
+		for index, bowler in enumerate(game.bowlers):
+			sent_balls = self._balls[index]
+			sent_totals = self._totals[index]
+			changed_totals = {}
+			for frame_idx, frame in enumerate(bowler.frames):
+				count = len(frame.balls)
+				if count < sent_balls[frame_idx]:
+					# Balls were taken back - resend this bowler's frames
+					changes.append({'kind': 'correction', 'bowler': index, 'frames': [_frame_dict(f) for f in bowler.frames],
+									'total_score': bowler.total_score})
+					changed_totals = None
+					break
+				for ball_idx in range(sent_balls[frame_idx], count):
+					ball = frame.balls[ball_idx]
+					changes.append({'kind': 'ball', 'bowler': index, 'frame': frame_idx, 'ball': ball_idx,
+									'value': ball.value, 'symbol': ball.symbol, 'pin_config': list(ball.pin_config)})
+				if frame.total != sent_totals[frame_idx]:
+					changed_totals[frame_idx] = frame.total
+			if changed_totals is not None and (changed_totals or bowler.total_score != self._scores[index]):
+				changes.append({'kind': 'totals', 'bowler': index, 'frames': changed_totals,
+								'total_score': bowler.total_score})
+
+		if game.current_bowler_index != self._current_bowler:
+			changes.append({'kind': 'bowler', 'bowler': game.current_bowler_index})
+		return changes
+
+	def publish(self, game):
+		"""Send whatever changed since the last publish, if anything"""
+		with self.lock:
+			changes = self._changes(game)
+			if changes:
+				self._remember(game)
+				self._post(changes)
+
+	def correction_applied(self, game):
+		"""Send every bowler's frames after a manual score correction"""
+		with self.lock:
+			changes = [change for change in self._changes(game) if change['kind'] in ('game_started', 'lineup')]
+			if not any(change['kind'] == 'lineup' for change in changes):
+				changes.extend(
+					{'kind': 'correction', 'bowler': index, 'frames': [_frame_dict(f) for f in bowler.frames],
+					 'total_score': bowler.total_score}
+					for index, bowler in enumerate(game.bowlers)
+				)
+			changes.append({'kind': 'bowler', 'bowler': game.current_bowler_index})
+			self._remember(game)
+			self._post(changes)
+
+	def end_game(self, game):
+		"""Send the final changes and close the session"""
+		with self.lock:
+			if game is self.game and self.finished:
+				return
+			changes = self._changes(game)
+			changes.append({'kind': 'game_ended', 'scores': [bowler.total_score for bowler in game.bowlers]})
+			self._remember(game)
+			self._post(changes)
+			self.finished = True
+
+	def snapshot(self) -> Dict[str, Any]:
+		"""Full state of the current game, stamped with the sequence number it includes; safe off the Tk thread"""
+		with self.lock:
+			data = {'game_id': self.game_id, 'seq': self.seq}
+			if self._state is None:
+				return data
+			data.update(self._state)
+			self.stats['snapshots'] += 1
+			return data
+
+_syncs: Dict[Optional[str], GameStateSync] = {}
+_sync_lock = Lock()
+
+def get_game_sync(lane_id: Optional[str] = None) -> GameStateSync:
+	"""
+	Shared sync used by the running game (publisher) and the lane client
+	(sender), one per lane: both sides pass the lane id, so lanes hosted in
+	one process (AsyncLaneClient.host_lane) each keep their own game and
+	sequence. Ids are compared as strings.
+	"""
+	if lane_id is not None:
+		lane_id = str(lane_id)
+	with _sync_lock:
+		sync = _syncs.get(lane_id)
+		if sync is None:
+			sync = _syncs[lane_id] = GameStateSync()
+	return sync
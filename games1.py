@@ -17,8 +17,12 @@ from logging.handlers import RotatingFileHandler
 import os
 from pathlib import Path
 from event_dispatcher import dispatcher
+from ui_bridge import notify, ui_listener
 from symbol_popup import SymbolPopup
 from test_ball_simulator import TestBallSimulator
+from bowler_stats import get_stats_store
+from game_outbox import get_outbox
+from game_sync import get_game_sync
 
 def setup_logging(log_file_path='log.txt', max_log_size=10*1024*1024, backup_count=5):
 	# Create formatter for regular log messages
@@ -1618,6 +1622,8 @@ class PracticeGame(BaseGame):
 		return self.game_started
 
 class QuickGame(BaseGame):
+	game_type = "quick_game"  # Stored with each game record
+	
 	def __init__(self, bowlers: List[str], settings: GameSettings, parent=None):
 		super().__init__()
 		self.settings = settings
@@ -1637,6 +1643,9 @@ class QuickGame(BaseGame):
 		]
 		
 		self.parent = parent
+		self.lane_id = getattr(parent, 'lane_id', lane_settings["Lane"])  # Keys this lane's game sync
+		self.dispatcher = getattr(parent, 'dispatcher', dispatcher)  # The lane's own when hosted with another lane
+		get_stats_store(self.settings.patterns)  # Starts loading local stats in the background before a game is saved
 		# Use the parent's game_window instead of creating a new frame
 		if parent and hasattr(parent, 'game_window'):
 			self.frame = parent.game_window
@@ -1686,9 +1695,10 @@ class QuickGame(BaseGame):
 			logger.info(f"Game time limit set to {self.total_game_time_minutes} minutes ({self.settings.total_time} × 30min)")
 		
 		# Register a listener for machine status responses
-		dispatcher.register_listener('machine_status_response', self._handle_machine_status)
-		dispatcher.register_listener('request_machine_status', self._request_machine_status)
-		dispatcher.register_listener('add_time_request', self.handle_add_time_request)
+		ui = getattr(parent, 'ui', None)  # The hosting BaseUI's bridge to its Tk thread
+		self.dispatcher.register_listener('machine_status_response', ui_listener(self._handle_machine_status, ui))
+		self.dispatcher.register_listener('request_machine_status', ui_listener(self._request_machine_status, ui))
+		self.dispatcher.register_listener('add_time_request', ui_listener(self.handle_add_time_request, ui))
 		
 		self.pin_up_image = tk.PhotoImage(file="./5pin_up.png") # TODO: add back file="/home/centrebowl/Desktop/Bowling/
 		self.pin_down_image = tk.PhotoImage(file="./5pin_down.png") # TODO: add back file="/home/centrebowl/Desktop/Bowling/
@@ -1749,7 +1759,7 @@ class QuickGame(BaseGame):
 			self.time_warning_shown = True
 			warning_msg = f"Your game will be coming to an end in {int(remaining_minutes)} minutes.\n\nSee front desk to extend your time."
 			if hasattr(self.parent, 'set_scroll_message'):
-				dispatcher.listeners['scroll_message'][0]({warning_msg})
+				notify('scroll_message', warning_msg, self.dispatcher)
 			logger.info("10-minute warning displayed")
 		
 		# Check if time is up
@@ -2055,7 +2065,7 @@ class QuickGame(BaseGame):
 			return
 		
 		# Reset pins
-		if 'reset_pins' in dispatcher.listeners and dispatcher.listeners['reset_pins']:
+		if 'reset_pins' in self.dispatcher.listeners and self.dispatcher.listeners['reset_pins']:
 			logger.info("Resetting pins for next bowler")
 			self.reset_pins()
 		
@@ -2077,7 +2087,7 @@ class QuickGame(BaseGame):
 			self.parent.set_game_display("TIME EXPIRED")
 		
 		if hasattr(self.parent, 'set_scroll_message'):
-			dispatcher.listeners['scroll_message'][0]({"Game time has expired. Thank you for bowling!"})
+			notify('scroll_message', "Game time has expired. Thank you for bowling!", self.dispatcher)
 		
 		# Call the normal end game process
 		self._end_game()
@@ -2337,8 +2347,7 @@ class QuickGame(BaseGame):
 			else:
 				# Restore pins to calculated state
 				logger.info(f"REVERT: Restoring pins to state: {pins_should_be}")
-				if 'pin_set' in dispatcher.listeners and dispatcher.listeners['pin_set']:
-					dispatcher.listeners['pin_set'][0](pins_should_be)
+				notify('pin_set', pins_should_be, self.dispatcher)
 		
 		# Update UI
 		self.update_ui()
@@ -3067,12 +3076,25 @@ class QuickGame(BaseGame):
 		else:
 			# Move to next available bowler
 			self._move_to_next_bowler()
+	
+	def _send_bowler_data_async(self, bowler_data):
+		"""Hand a moving bowler to the paired lane (direct link when up, otherwise via the server)."""
+		try:
+			if hasattr(self.parent, 'send_to_lane'):
+				message = dict(bowler_data, type="bowler_move")
+				if not self.parent.send_to_lane(self.paired_lane, 'bowler_move', message):
+					logger.error(f"Failed to send {bowler_data['name']} to lane {self.paired_lane}")
+			else:
+				logger.error("No send_to_lane method available")
+		except Exception as e:
+			logger.error(f"Error sending bowler data: {e}")
+	
 	def _end_game(self):
 		"""End the game for all bowlers."""
 		logger.info("Game Over")
 		
 		# Reset pins
-		if 'reset_pins' in dispatcher.listeners and dispatcher.listeners['reset_pins']:
+		if 'reset_pins' in self.dispatcher.listeners and self.dispatcher.listeners['reset_pins']:
 			self.reset_pins()
 			
 		# Update display
@@ -3081,6 +3103,7 @@ class QuickGame(BaseGame):
 		
 		# Save the current game data
 		self._save_current_game_data()
+		get_game_sync(self.lane_id).end_game(self)
 		
 		# Update the UI to show "GAME OVER"
 		self.update_ui()
@@ -3123,6 +3146,7 @@ class QuickGame(BaseGame):
 		"""Save the current game data with timestamp including detailed ball information and bonuses."""
 		game_record = {
 			"game_number": self.current_game_number,
+			"game_type": self.game_type,
 			"date": datetime.now().strftime("%Y-%m-%d"),
 			"time": datetime.now().strftime("%H:%M:%S"),
 			"bowlers": [
@@ -3181,6 +3205,22 @@ class QuickGame(BaseGame):
 			logger.info(f"Game {self.current_game_number} data saved to database")
 		except Exception as e:
 			logger.error(f"Error saving game data: {str(e)}")
+			return
+
+		# Queue the game (with updated stats) for upload - the lane client drains the outbox
+		lane_id = str(self.lane_id)
+		def queue_upload(stats):
+			try:
+				get_outbox().append("game", {"record": game_record, "stats": stats}, lane_id=lane_id)
+			except Exception as e:
+				logger.error(f"Error queuing game data for upload: {str(e)}")
+
+		# Keep local bowler aggregates current; until the history has loaded this runs on the loading thread
+		try:
+			get_stats_store(self.settings.patterns).record_game(game_record, then=queue_upload)
+		except Exception as e:
+			logger.error(f"Error updating bowler stats: {str(e)}")
+			queue_upload({})
 
 	def _update_next_game_countdown(self):
 		"""Update the next game countdown and auto-start if reaches 0."""
@@ -3248,9 +3288,8 @@ class QuickGame(BaseGame):
 		logger.info("Clearing game completely and resetting for next game")
 		self.timer_running = False
 		
-		# Save all game data one final time
-		# TODO: Restore this in network
-		#self.send_game_data_to_server()
+		# Completed games were queued in the outbox as they were saved;
+		# the lane client uploads them whenever it is registered
 		
 		# Clear all game data
 		self.clear_game_data()
@@ -3311,9 +3350,7 @@ class QuickGame(BaseGame):
 		if hasattr(self.parent, 'set_info_label'):
 			self.parent.set_info_label("Games Remaining: 0")
 		if hasattr(self.parent, 'set_scroll_message'):
-			from event_dispatcher import dispatcher
-			if 'scroll_message' in dispatcher.listeners:
-				dispatcher.listeners['scroll_message'][0]("Game cleared. Ready for new game registration.")
+			notify('scroll_message', "Game cleared. Ready for new game registration.", self.dispatcher)
 		
 		# Update lane status
 		if hasattr(self.parent, 'update_lane_status'):
@@ -3449,9 +3486,7 @@ class QuickGame(BaseGame):
 			
 			# Show confirmation
 			if hasattr(self.parent, 'set_scroll_message'):
-				from event_dispatcher import dispatcher
-				if 'scroll_message' in dispatcher.listeners:
-					dispatcher.listeners['scroll_message'][0]("Emergency reset completed")
+				notify('scroll_message', "Emergency reset completed", self.dispatcher)
 			
 		except Exception as e:
 			logger.error(f"Emergency reset failed: {e}")
@@ -4814,9 +4849,7 @@ class QuickGame(BaseGame):
 				logger.info("PIN_RESTORE: Command sent via parent.handle_pin_set")
 			else:
 				# Fallback: use dispatcher
-				from event_dispatcher import dispatcher
-				if 'pin_set' in dispatcher.listeners:
-					dispatcher.listeners['pin_set'][0](machine_control)
+				if notify('pin_set', machine_control, self.dispatcher):
 					logger.info("PIN_RESTORE: Command sent via dispatcher")
 				else:
 					logger.error("PIN_RESTORE: No pin_set handler available")
@@ -5006,9 +5039,7 @@ class QuickGame(BaseGame):
 				self.parent.handle_pin_set(machine_control)
 			else:
 				# Fallback: use dispatcher
-				from event_dispatcher import dispatcher
-				if 'pin_set' in dispatcher.listeners:
-					dispatcher.listeners['pin_set'][0](machine_control)
+				notify('pin_set', machine_control, self.dispatcher)
 			
 			# Show confirmation
 			confirmation_popup = tk.Toplevel(self.frame)
@@ -5327,8 +5358,7 @@ class QuickGame(BaseGame):
 		
 	def _request_machine_status(self, data=None):
 		"""Request current machine status through dispatcher."""
-		if 'request_machine_status' in dispatcher.listeners:
-			dispatcher.listeners['request_machine_status'][0]({})
+		notify('request_machine_status', {}, self.dispatcher)
 	
 	def revert_last_ball(self):
 		"""ENHANCED: Revert the last ball with proper multi-frame turn handling"""
@@ -5755,8 +5785,7 @@ class QuickGame(BaseGame):
 		self.current_pin_state = [0, 0, 0, 0, 0]  # All pins up (UI representation)
 		
 		# Request machine status and initialize UI after a short delay
-		if 'request_machine_status' in dispatcher.listeners and dispatcher.listeners['request_machine_status']:
-			dispatcher.listeners['request_machine_status'][0]({})
+		if notify('request_machine_status', {}, self.dispatcher):
 			# Schedule UI initialization after status request
 			self.pin_set_window.after(200, self._initialize_pin_set_ui)
 		else:
@@ -5966,8 +5995,7 @@ class QuickGame(BaseGame):
 		
 		try:
 			# Send pin control data to machine
-			if 'pin_set' in dispatcher.listeners and dispatcher.listeners['pin_set']:
-				dispatcher.listeners['pin_set'][0](pin_control_data)
+			if notify('pin_set', pin_control_data, self.dispatcher):
 				logger.info("PIN_SET: Successfully sent knock down command to machine")
 				
 				# Schedule a follow-up reset to bring all pins back up after machine cycle
@@ -6031,11 +6059,7 @@ class QuickGame(BaseGame):
 			logger.info(f"PIN_SET: Pin control states to apply: {pin_control_data}")
 			
 			# Use proper event dispatcher to send pin_set event
-			from event_dispatcher import dispatcher
-			
-			if 'pin_set' in dispatcher.listeners and dispatcher.listeners['pin_set']:
-				# Send the control data through dispatcher
-				dispatcher.listeners['pin_set'][0](pin_control_data)
+			if notify('pin_set', pin_control_data, self.dispatcher):
 				logger.info("PIN_SET: Command sent via dispatcher successfully")
 				
 				# Show success message and close window
@@ -6165,9 +6189,7 @@ class QuickGame(BaseGame):
 			pin_data = self.machine_status.get('control', {})
 			
 			# Schedule pin restore
-			if 'schedule_pin_restore' in dispatcher.listeners:
-				dispatcher.listeners['schedule_pin_restore'][0](pin_data)
-			else:
+			if not notify('schedule_pin_restore', pin_data, self.dispatcher):
 				logger.error("No schedule_pin_restore handler available")
 				
 	def _save_enhanced_game_data(self):
@@ -6176,6 +6198,7 @@ class QuickGame(BaseGame):
 			"game_number": self.current_game_number,
 			"date": datetime.now().strftime("%Y-%m-%d"),
 			"time": datetime.now().strftime("%H:%M:%S"),
+			"game_type": self.game_type,
 			"display_mode": getattr(self.settings, 'display_mode', 'standard'),
 			"bowlers": []
 		}
@@ -6539,7 +6562,7 @@ class QuickGame(BaseGame):
 		self.ui_manager.enable_buttons(True)
 		
 		# Reset pins
-		if 'reset_pins' in dispatcher.listeners and dispatcher.listeners['reset_pins']:
+		if 'reset_pins' in self.dispatcher.listeners and self.dispatcher.listeners['reset_pins']:
 			self.reset_pins()
 		
 		# Update display
@@ -6578,12 +6601,13 @@ class QuickGame(BaseGame):
 		
 		# Show confirmation message if possible
 		if hasattr(self.parent, 'set_scroll_message'):
-			dispatcher.listeners['scroll_message'][0]({f"Added {additional_minutes} minutes to your game time!"})
+			notify('scroll_message', f"Added {additional_minutes} minutes to your game time!", self.dispatcher)
 		
 		return True
 
 	def register_time_management_events(self):
-		dispatcher.register_listener('add_time_request', self.handle_add_time_request)
+		ui = getattr(self.parent, 'ui', None)
+		self.dispatcher.register_listener('add_time_request', ui_listener(self.handle_add_time_request, ui))
 		logger.info("Registered add_time_request event listener for time management")
 	
 	def handle_add_time_request(self, data):
@@ -7051,6 +7075,10 @@ class QuickGame(BaseGame):
 			# Recalculate ALL scores for ALL bowlers
 			self._recalculate_all_bowler_scores()
 			
+			# Queue the corrected scores for the server
+			self._queue_score_correction()
+			get_game_sync(self.lane_id).correction_applied(self)
+			
 			# Force complete UI rebuild
 			logger.info("Forcing complete UI rebuild")
 			self._rebuild_ui_completely()
@@ -7068,6 +7096,38 @@ class QuickGame(BaseGame):
 			error_msg = f"Failed to save score corrections:\n{str(e)}\n\nPlease try again or contact support."
 			tk.messagebox.showerror("Save Error", error_msg)
 	
+	def _queue_score_correction(self):
+		"""Queue corrected bowler scores for the current game in the outbox."""
+		try:
+			correction = {
+				"game_number": self.current_game_number,
+				"date": datetime.now().strftime("%Y-%m-%d"),
+				"time": datetime.now().strftime("%H:%M:%S"),
+				"bowlers": [
+					{
+						"name": bowler.name,
+						"frames": [
+							{
+								"balls": [
+									{
+										"pin_config": ball.pin_config,
+										"symbol": ball.symbol,
+										"value": ball.value
+									} for ball in frame.balls
+								],
+								"total": frame.total,
+								"is_strike": frame.is_strike,
+								"is_spare": frame.is_spare
+							} for frame in bowler.frames
+						],
+						"total_score": bowler.total_score
+					} for bowler in self.bowlers
+				]
+			}
+			get_outbox().append("correction", correction, lane_id=str(self.lane_id))
+		except Exception as e:
+			logger.error(f"Error queuing score correction: {str(e)}")
+	
 	def _analyze_comprehensive_correction_context(self):
 		"""ENHANCED: Comprehensive correction context analysis with pin state tracking."""
 		try:
@@ -8147,8 +8207,7 @@ class QuickGame(BaseGame):
 			else:
 				# Restore pins to calculated state
 				logger.info(f"REVERT: Restoring pins to state: {pins_should_be}")
-				if 'pin_set' in dispatcher.listeners and dispatcher.listeners['pin_set']:
-					dispatcher.listeners['pin_set'][0](pins_should_be)
+				notify('pin_set', pins_should_be, self.dispatcher)
 		
 		# Update UI
 		self.update_ui()
@@ -8341,6 +8400,9 @@ class QuickGame(BaseGame):
 			logger.info("UI_UPDATE_SKIP: Game not started, skipping update")
 			return
 		
+		# Publish score changes before the debounce so none are held back
+		get_game_sync(self.lane_id).publish(self)
+		
 		# PERFORMANCE: Debounce rapid updates
 		if hasattr(self, '_last_ui_update') and time.time() - self._last_ui_update < 0.1:
 			logger.info("UI_UPDATE_DEBOUNCE: Skipping update due to debouncing")
@@ -8381,6 +8443,7 @@ class QuickGame(BaseGame):
 
 
 class LeagueGame(QuickGame):
+	game_type = "league_game"
 
 	def __init__(self, bowlers: List[Dict], settings: GameSettings, paired_lane=None, parent=None):
 		# Extract bowler names for parent constructor
@@ -8389,6 +8452,7 @@ class LeagueGame(QuickGame):
 		
 		# Override the bowlers list with league-specific data
 		self.bowlers = []
+		local_average_bowlers = []
 		for b in bowlers:
 			frames = [Frame(balls=[], total=0) for _ in range(10)]
 			bowler = Bowler(
@@ -8400,7 +8464,12 @@ class LeagueGame(QuickGame):
 			)
 			
 			# Add league-specific attributes
-			bowler.average = b.get("average", getattr(settings, 'default_avg', 150))  # Use default_avg from settings
+			# Server-supplied average wins, then local stats history, then default_avg from settings
+			if "average" in b:
+				bowler.average = b["average"]
+			else:
+				bowler.average = getattr(settings, 'default_avg', 150)
+				local_average_bowlers.append(bowler)
 			bowler.poa = 0  # Pins Over Average - calculated dynamically
 			
 			# Handle absent bowlers with default scores
@@ -8420,7 +8489,7 @@ class LeagueGame(QuickGame):
 		
 		# League-specific settings
 		self.paired_lane = paired_lane
-		self.lane_id = lane_settings["Lane"]
+		self.lane_id = getattr(parent, 'lane_id', lane_settings["Lane"])
 		self.max_bowlers_on_screen = 8
 		self.current_game_number = 1
 		
@@ -8457,16 +8526,31 @@ class LeagueGame(QuickGame):
 			on_pin_restore=self.pin_restore
 		)
 		
+		# Local history loads off the Tk thread; swap in those averages once it is in
+		if local_average_bowlers:
+			ui = getattr(self.parent, 'ui', None)
+			apply = lambda: self._apply_local_averages(local_average_bowlers)
+			get_stats_store(settings.patterns).when_loaded(lambda: ui.call(apply) if ui else apply())
+		
 		logger.info(f"LeagueGame initialized: Lane {self.lane_id}, paired with {paired_lane}, "
 				f"{len(bowlers)} bowlers, total_display='{self.total_display_mode}'")
+	
+	def _apply_local_averages(self, bowlers: List[Bowler]):
+		"""Replace default averages with local stats history once it has loaded"""
+		store = get_stats_store(self.settings.patterns)
+		for bowler in bowlers:
+			bowler.average = store.average(bowler.name, bowler.average)
+		if self.game_started:
+			self.update_ui()
 		
 	def _register_league_events(self):
 		"""Register league-specific event listeners"""
-		dispatcher.register_listener('bowler_move', self.handle_bowler_move)
-		dispatcher.register_listener('team_move', self.handle_team_move)
-		dispatcher.register_listener('frame_update', self.handle_frame_update)
-		dispatcher.register_listener('game_complete', self.handle_game_complete)
-		dispatcher.register_listener('pair_ready', self.handle_pair_ready)
+		ui = getattr(self.parent, 'ui', None)
+		self.dispatcher.register_listener('bowler_move', ui_listener(self.handle_bowler_move, ui))
+		self.dispatcher.register_listener('team_move', ui_listener(self.handle_team_move, ui))
+		self.dispatcher.register_listener('frame_update', ui_listener(self.handle_frame_update, ui))
+		self.dispatcher.register_listener('game_complete', ui_listener(self.handle_game_complete, ui))
+		self.dispatcher.register_listener('pair_ready', ui_listener(self.handle_pair_ready, ui))
 		logger.info("League event listeners registered")
 	
 	def start(self):
@@ -9974,6 +10058,7 @@ class LeagueGame(QuickGame):
 			return
 		
 		ready_data = {
+			"type": "pair_ready",
 			"lane_id": self.lane_id,
 			"paired_lane": self.paired_lane
 		}
@@ -10010,6 +10095,8 @@ class LeagueGame(QuickGame):
 		if not self.game_started:
 			return
 		
+		get_game_sync(self.lane_id).publish(self)
+		
 		# PERFORMANCE: Check if UI rebuild is actually needed
 		current_bowler_count = len(self.bowlers)
 		ui_rebuild_needed = (
@@ -10715,15 +10802,17 @@ class HangmanBowling(BaseGame):
 		self.timer_container = None  # Container for practice timer
 		self.practice_timer_label = None
 		self.current_game_number = 1  # Track which game we're on
-		self.lane_id = lane_settings["Lane"]  # Get lane ID from settings
+		self.lane_id = getattr(parent, 'lane_id', lane_settings["Lane"])  # The hosting UI's lane, else settings
+		self.dispatcher = getattr(parent, 'dispatcher', dispatcher)
 		self.wait_for_pair = settings.get("wait_for_pair", False)  # Whether to wait for paired lane
 		self.pair_ready = False  # Whether the paired lane is ready
 		
 		# Register additional event listeners for league play
-		dispatcher.register_listener('bowler_move', self.handle_bowler_move)
-		dispatcher.register_listener('frame_update', self.handle_frame_update)
-		dispatcher.register_listener('game_complete', self.handle_game_complete)
-		dispatcher.register_listener('pair_ready', self.handle_pair_ready)
+		ui = getattr(parent, 'ui', None)
+		self.dispatcher.register_listener('bowler_move', ui_listener(self.handle_bowler_move, ui))
+		self.dispatcher.register_listener('frame_update', ui_listener(self.handle_frame_update, ui))
+		self.dispatcher.register_listener('game_complete', ui_listener(self.handle_game_complete, ui))
+		self.dispatcher.register_listener('pair_ready', ui_listener(self.handle_pair_ready, ui))
 		
 		logger.info(f"LeagueGame initialized with {len(bowlers)} bowlers on lane {self.lane_id}, paired with lane {paired_lane}")
 
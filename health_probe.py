@@ -0,0 +1,158 @@
+"""
+Non-blocking link health for the lane client.
+
+HealthProber measures TCP reachability and connect time with asyncio
+connections, and keeps ping/pong round-trip statistics fed by the
+client. Probe results are cached per address (successes for ttl seconds,
+failures for the shorter negative_ttl so a returning server is noticed
+quickly), and concurrent probes of one address share a single connect.
+The local address is found with a connected UDP endpoint, which sends
+nothing, and is cached the same way.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class ProbeResult:
+	host: str
+	port: int
+	reachable: bool
+	connect_ms: Optional[float] = None
+	error: Optional[str] = None
+	checked_at: float = 0.0  # time.monotonic()
+
+	def age(self) -> float:
+		return time.monotonic() - self.checked_at
+
+class HealthProber:
+	def __init__(self, ttl: float = 30.0, negative_ttl: float = 5.0, timeout: float = 2.0, max_entries: int = 256):
+		self.ttl = ttl
+		self.negative_ttl = negative_ttl
+		self.timeout = timeout
+		self.max_entries = max_entries
+		self.results: Dict[Tuple[str, int], ProbeResult] = {}
+		self._inflight: Dict[Tuple[str, int], asyncio.Future] = {}
+		self._local_ip: Optional[str] = None
+		self._local_ip_at = 0.0
+		self.rtt_ms: Optional[float] = None  # Last ping round trip
+		self.rtt_avg_ms: Optional[float] = None  # Smoothed (EWMA)
+		self.rtt_jitter_ms = 0.0
+		self.pings = 0
+		self.pings_lost = 0
+
+	def cached(self, host: str, port: int, max_age: Optional[float] = None) -> Optional[ProbeResult]:
+		"""Last result for an address if it is still fresh"""
+		result = self.results.get((host, port))
+		if result is None:
+			return None
+		if max_age is None:
+			max_age = self.ttl if result.reachable else self.negative_ttl
+		return result if result.age() <= max_age else None
+
+	def record(self, host: str, port: int, reachable: bool, connect_ms: Optional[float] = None,
+			   error: Optional[str] = None) -> ProbeResult:
+		"""Store a result, including ones measured by real connections outside probe_tcp"""
+		result = ProbeResult(host, port, reachable, round(connect_ms, 2) if connect_ms is not None else None,
+							 error, time.monotonic())
+		self.results[(host, port)] = result
+		if len(self.results) > self.max_entries:
+			for key in [key for key, old in self.results.items() if old.age() > self.ttl]:
+				del self.results[key]
+		return result
+
+	async def probe_tcp(self, host: str, port: int, timeout: Optional[float] = None,
+						max_age: Optional[float] = None) -> ProbeResult:
+		"""Reachability and connect time of host:port, from cache when fresh enough"""
+		result = self.cached(host, port, max_age)
+		if result:
+			return result
+		key = (host, port)
+		future = self._inflight.get(key)
+		if future:
+			return await asyncio.shield(future)
+
+		future = asyncio.get_running_loop().create_future()
+		self._inflight[key] = future
+		try:
+			result = await self._connect(host, port, timeout or self.timeout)
+			future.set_result(result)
+			return result
+		except asyncio.CancelledError:
+			future.cancel()
+			raise
+		except Exception as e:
+			future.set_exception(e)
+			future.exception()  # Waiters re-raise it; don't log it as unretrieved
+			raise
+		finally:
+			del self._inflight[key]
+
+	async def _connect(self, host: str, port: int, timeout: float) -> ProbeResult:
+		start = time.perf_counter()
+		try:
+			_, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout=timeout)
+		except asyncio.TimeoutError:
+			return self.record(host, port, False, error=f"no answer in {timeout}s")
+		except OSError as e:
+			return self.record(host, port, False, error=e.strerror or str(e))
+		connect_ms = (time.perf_counter() - start) * 1000
+		writer.close()
+		try:
+			await writer.wait_closed()
+		except Exception:
+			pass
+		return self.record(host, port, True, connect_ms)
+
+	async def local_ip(self, target: Tuple[str, int] = ('8.8.8.8', 80)) -> str:
+		"""Address of the interface that routes to target; no packet is sent"""
+		if self._local_ip and time.monotonic() - self._local_ip_at <= self.ttl:
+			return self._local_ip
+		try:
+			transport, _ = await asyncio.get_running_loop().create_datagram_endpoint(
+				asyncio.DatagramProtocol, remote_addr=target)
+			try:
+				self._local_ip = transport.get_extra_info('sockname')[0]
+			finally:
+				transport.close()
+		except OSError as e:
+			logger.debug(f"Could not determine local IP: {e}")
+			return self._local_ip or '127.0.0.1'
+		self._local_ip_at = time.monotonic()
+		return self._local_ip
+
+	def cached_local_ip(self) -> Optional[str]:
+		return self._local_ip
+
+	def record_rtt(self, rtt_ms: Optional[float]):
+		"""Add a ping round trip, or None for a ping that was never answered"""
+		self.pings += 1
+		if rtt_ms is None:
+			self.pings_lost += 1
+			return
+		if self.rtt_avg_ms is None:
+			self.rtt_avg_ms = rtt_ms
+		else:
+			self.rtt_jitter_ms += (abs(rtt_ms - self.rtt_avg_ms) - self.rtt_jitter_ms) / 8
+			self.rtt_avg_ms += (rtt_ms - self.rtt_avg_ms) / 8
+		self.rtt_ms = rtt_ms
+
+	def link_quality(self, host: str, port: int) -> Dict[str, Any]:
+		"""Latest probe of the server plus ping statistics"""
+		result = self.results.get((host, port))
+		quality = asdict(result) if result else {'host': host, 'port': port, 'reachable': None}
+		quality.pop('checked_at', None)
+		quality['age'] = round(result.age(), 1) if result else None
+		quality.update({
+			'rtt_ms': round(self.rtt_ms, 2) if self.rtt_ms is not None else None,
+			'rtt_avg_ms': round(self.rtt_avg_ms, 2) if self.rtt_avg_ms is not None else None,
+			'rtt_jitter_ms': round(self.rtt_jitter_ms, 2),
+			'pings': self.pings,
+			'pings_lost': self.pings_lost
+		})
+		return quality
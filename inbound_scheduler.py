@@ -0,0 +1,175 @@
+"""
+Priority scheduler for messages received from the server.
+
+Messages are sorted into classes by type (the inner type for a wrapped
+lane_command): link liveness (ping, pong, heartbeat responses) and the
+server's resync requests first, then everything that touches game or
+machine state, then informational updates that change no state. The
+processor always takes from the highest non-empty class, so a pong is
+never timed out behind a backlog. Stateful messages share one FIFO
+class: handlers rely on the order the server sent them in (pairing or a
+pin_set must not overtake the game start before it), so only stateless
+traffic is ever reordered.
+
+Queuing never waits - the listener keeps reading whatever is backed up.
+Each class has a depth limit and an overflow policy: liveness and
+informational messages drop the oldest, while a full game class counts
+an overflow and drops every game message until it has drained to half
+its limit, then calls on_overflow once so the client can resync its game
+state with the server, covering all it missed. Resync requests are never
+dropped; a new one replaces a queued copy of the same type,
+since the answer reflects the state at the time it is served. A display
+update replaces, and an identical scroll message is folded into, a copy
+of the same type only when that copy is the last one queued in its
+class, so coalescing never moves a message past another.
+"""
+
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Callable, Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+CONTROL = 0
+GAME = 1
+INFO = 2
+CLASS_NAMES = {CONTROL: 'control', GAME: 'game', INFO: 'info'}
+
+RESYNC_TYPES = {'game_data_request', 'game_sync_request'}  # Answered from current state, never dropped
+CONTROL_TYPES = {'ping', 'pong', 'heartbeat_response'} | RESYNC_TYPES  # Touch no game state
+INFO_TYPES = {
+	'scroll_message', 'test_message', 'heartbeat', 'lane_status'
+}
+MERGE_TYPES = {'set_game_display'}  # Back-to-back copies: only the newest matters
+DEDUP_TYPES = {'scroll_message'}	# Identical back-to-back copies are dropped
+
+# class -> (max depth, overflow policy)
+DEFAULT_LIMITS = {
+	CONTROL: (200, 'drop_oldest'),
+	GAME: (100, 'resync'),
+	INFO: (50, 'drop_oldest')
+}
+
+def message_kind(message: Dict[str, Any]) -> Optional[str]:
+	"""Type used for scheduling - the inner command for a lane_command"""
+	message_type = message.get('type')
+	if message_type == 'lane_command':
+		message_data = message.get('data')
+		if isinstance(message_data, dict) and message_data.get('type'):
+			return message_data['type']
+	return message_type
+
+class InboundScheduler:
+	def __init__(self, limits: Optional[Dict[int, tuple]] = None, control_types: Set[str] = CONTROL_TYPES,
+				 info_types: Set[str] = INFO_TYPES, on_overflow: Optional[Callable[[str], None]] = None):
+		self.limits = {**DEFAULT_LIMITS, **(limits or {})}
+		self.control_types = control_types
+		self.info_types = info_types
+		self.on_overflow = on_overflow  # Called with the class name when a 'resync' class has drained after dropping
+		self.queues = {cls: deque() for cls in sorted(self.limits)}  # Iterated in priority order
+		self._not_empty = asyncio.Event()
+		self._overflowing = set()  # 'resync' classes dropping messages until they drain to half their limit
+		self._size = 0
+		self.stats = {
+			CLASS_NAMES[cls]: {'enqueued': 0, 'processed': 0, 'dropped': 0, 'merged': 0, 'max_depth': 0, 'overflows': 0}
+			for cls in self.limits
+		}
+
+	def classify(self, kind: Optional[str]) -> int:
+		if kind in self.control_types:
+			return CONTROL
+		if kind in self.info_types:
+			return INFO
+		return GAME
+
+	def qsize(self) -> int:
+		return self._size
+
+	def empty(self) -> bool:
+		return self._size == 0
+
+	def _coalescable(self, kind: str, cls: int, message: Dict[str, Any]) -> Optional[int]:
+		"""Index of the queued copy this message can be folded into, or None"""
+		queue = self.queues[cls]
+		if kind in RESYNC_TYPES:
+			return next((i for i, entry in enumerate(queue) if entry[0] == kind), None)
+		if not queue or queue[-1][0] != kind:
+			return None
+		if kind in MERGE_TYPES or (kind in DEDUP_TYPES and queue[-1][1] == message):
+			return len(queue) - 1
+		return None
+
+	async def put(self, message: Dict[str, Any]):
+		"""Queue a message; never waits, a full class applies its overflow policy"""
+		self.put_nowait(message)
+
+	def put_nowait(self, message: Dict[str, Any]) -> bool:
+		"""Queue a message; False if the overflow policy dropped it"""
+		kind = message_kind(message)
+		cls = self.classify(kind)
+		stats = self.stats[CLASS_NAMES[cls]]
+		queue = self.queues[cls]
+		index = self._coalescable(kind, cls, message)
+		if index is not None:
+			queue[index][1] = message
+			stats['merged'] += 1
+			return True
+
+		max_depth, policy = self.limits[cls]
+		if policy == 'resync' and cls in self._overflowing and kind not in RESYNC_TYPES:
+			stats['dropped'] += 1
+			return False
+		if len(queue) >= max_depth and kind not in RESYNC_TYPES:
+			stats['dropped'] += 1
+			if policy == 'resync':
+				self._overflowing.add(cls)
+				stats['overflows'] += 1
+				logger.warning(f"{CLASS_NAMES[cls]} queue full, dropping {kind} and later messages until it drains")
+				return False
+			if policy == 'drop_newest':
+				logger.warning(f"{CLASS_NAMES[cls]} queue full, dropped {kind} message")
+				return False
+			dropped = next((entry for entry in queue if entry[0] not in RESYNC_TYPES), None)
+			if dropped is not None:
+				queue.remove(dropped)
+				self._size -= 1
+				logger.warning(f"{CLASS_NAMES[cls]} queue full, dropped oldest {dropped[0]} message")
+
+		queue.append([kind, message])
+		self._size += 1
+		stats['enqueued'] += 1
+		if len(queue) > stats['max_depth']:
+			stats['max_depth'] = len(queue)
+		self._not_empty.set()
+		return True
+
+	def _resync(self, cls: int):
+		"""A dropping episode is over; ask for a resync covering everything it dropped"""
+		self._overflowing.discard(cls)
+		if self.on_overflow:
+			try:
+				self.on_overflow(CLASS_NAMES[cls])
+			except Exception as e:
+				logger.error(f"Error in inbound overflow callback: {e}")
+
+	async def get(self) -> Dict[str, Any]:
+		"""Next message from the highest-priority non-empty class"""
+		while not self._size:
+			self._not_empty.clear()
+			await self._not_empty.wait()
+		for cls, queue in self.queues.items():
+			if queue:
+				entry = queue.popleft()
+				self._size -= 1
+				self.stats[CLASS_NAMES[cls]]['processed'] += 1
+				if cls in self._overflowing and len(queue) <= self.limits[cls][0] // 2:
+					self._resync(cls)
+				return entry[1]
+
+	def task_done(self):
+		"""Kept for asyncio.Queue compatibility"""
+
+	def get_stats(self) -> Dict[str, Dict[str, int]]:
+		"""Per-class counters with current depth"""
+		return {CLASS_NAMES[cls]: dict(self.stats[CLASS_NAMES[cls]], depth=len(queue)) for cls, queue in self.queues.items()}
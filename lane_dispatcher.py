@@ -0,0 +1,43 @@
+"""
+Event dispatch for lanes hosted alongside another lane in one process.
+
+event_dispatcher.dispatcher is a single object per process, so two lanes
+on one client (AsyncLaneClient.host_lane) would each hear the other's
+game events through it. A hosted lane gets a LaneDispatcher from
+get_lane_dispatcher() instead: same register_listener / dispatch_event /
+listeners interface, one per lane id. The client, its BaseUI, the games
+and ui_bridge.notify all take the lane's dispatcher from the client, and
+the process's own lane keeps the shared one, so a single-lane install
+behaves as before.
+"""
+
+import inspect
+from threading import Lock
+from typing import Any, Callable, Dict, List
+
+class LaneDispatcher:
+	def __init__(self, lane_id: str):
+		self.lane_id = lane_id
+		self.listeners: Dict[str, List[Callable]] = {}
+
+	def register_listener(self, event: str, handler: Callable):
+		self.listeners.setdefault(event, []).append(handler)
+
+	async def dispatch_event(self, event: str, data: Any = None):
+		"""Call each listener for event in registration order, awaiting async ones"""
+		for handler in list(self.listeners.get(event, ())):
+			result = handler(data)
+			if inspect.isawaitable(result):
+				await result
+
+_dispatchers: Dict[str, LaneDispatcher] = {}
+_dispatcher_lock = Lock()
+
+def get_lane_dispatcher(lane_id: str) -> LaneDispatcher:
+	"""Dispatcher of a hosted lane; ids are compared as strings"""
+	lane_id = str(lane_id)
+	with _dispatcher_lock:
+		lane_dispatcher = _dispatchers.get(lane_id)
+		if lane_dispatcher is None:
+			lane_dispatcher = _dispatchers[lane_id] = LaneDispatcher(lane_id)
+	return lane_dispatcher
@@ -0,0 +1,375 @@
+"""
+Load test for AsyncLaneClient: a fleet of simulated lanes in one process
+against a local stand-in server.
+
+StandInServer speaks the lane protocol (registration, heartbeat,
+lane_command relays such as team_move, quick_game pushes) with the same
+framing as the real server. Each simulated lane is a real AsyncLaneClient
+that heartbeats and sends team moves to its pair lane through the server
+at a configurable rate; every message carries its send time, so the run
+reports throughput and latency percentiles for each hop. An optional
+server restart mid-run shows how the fleet behaves in a reconnect storm:
+how long until every lane is registered again and how many connections
+it took. Run it from a lane directory (the client reads settings.json on
+import); simulated lanes keep their outbox and server cache in a scratch
+directory. Each simulated lane has its own outbox and game sync, as it
+would on its own lane PC, so uploads and deltas are not shared between
+lanes running in the one process.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import tempfile
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from Lane_Client import AsyncLaneClient
+from game_outbox import GameOutbox
+from game_sync import get_game_sync
+from message_framing import FrameEncoder, FrameReader, COMPRESSION_CODECS
+from wire_codec import WIRE_CODECS
+
+logger = logging.getLogger(__name__)
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+	"""Nearest-rank p50/p90/p99 and max of a list of millisecond samples"""
+	if not samples:
+		return {'count': 0, 'p50': 0.0, 'p90': 0.0, 'p99': 0.0, 'max': 0.0}
+	ordered = sorted(samples)
+	def rank(p):
+		return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))], 2)
+	return {'count': len(ordered), 'p50': rank(0.50), 'p90': rank(0.90), 'p99': rank(0.99), 'max': round(ordered[-1], 2)}
+
+def _elapsed_ms(sent_at) -> Optional[float]:
+	if not isinstance(sent_at, (int, float)):
+		return None
+	return (time.perf_counter() - sent_at) * 1000
+
+class StandInServer:
+	"""Minimal lane server: registers lanes, answers heartbeats and relays lane_commands"""
+
+	def __init__(self, host: str = '127.0.0.1', port: int = 0, compression: bool = True, binary: bool = True):
+		self.host = host
+		self.port = port
+		self.compression = compression
+		self.binary = binary
+		self.server = None
+		self.lanes: Dict[str, tuple] = {}  # lane_id -> (writer, encoder)
+		self.connections: Dict[asyncio.StreamWriter, asyncio.Task] = {}  # Every open connection, registered or not
+		self.registered_at: Dict[str, float] = {}
+		self.latencies: List[float] = []  # lane -> server, ms
+		self.by_type = Counter()
+		self.stats = {'connections': 0, 'registrations': 0, 'messages': 0, 'relayed': 0, 'relay_misses': 0}
+
+	async def start(self):
+		self.server = await asyncio.start_server(self._handle, self.host, self.port)
+		self.port = self.server.sockets[0].getsockname()[1]
+		logger.info(f"Stand-in server listening on {self.host}:{self.port}")
+
+	async def stop(self):
+		"""Close the listener and drop every lane, as a server restart would"""
+		if self.server:
+			self.server.close()
+			await self.server.wait_closed()
+			self.server = None
+		handlers = list(self.connections.values())
+		for writer in list(self.connections):
+			writer.close()
+		await asyncio.gather(*handlers, return_exceptions=True)
+		self.lanes.clear()
+
+	def send(self, lane_id: str, message: Dict[str, Any]) -> bool:
+		lane = self.lanes.get(lane_id)
+		if not lane:
+			return False
+		writer, encoder = lane
+		if writer.is_closing():
+			return False
+		writer.write(encoder.encode(message))
+		return True
+
+	async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+		self.stats['connections'] += 1
+		self.connections[writer] = asyncio.current_task()
+		frames = FrameReader(reader)
+		encoder = FrameEncoder()
+		lane_id = None
+		try:
+			while True:
+				message = await frames.read_message()
+				if message is None:
+					break
+				message_type = message.get('type')
+				self.stats['messages'] += 1
+				self.by_type[message_type] += 1
+
+				if message_type == 'registration':
+					lane_id = str(message.get('lane_id'))
+					response = {'status': 'success'}
+					if self.compression and encoder.negotiate(message.get('compression')):
+						response['compression'] = COMPRESSION_CODECS
+					if self.binary and encoder.negotiate_codec(message.get('codecs')):
+						response['codecs'] = WIRE_CODECS
+					writer.write(json.dumps(response).encode('utf-8') + b'\n')
+					self.lanes[lane_id] = (writer, encoder)
+					self.registered_at[lane_id] = time.monotonic()
+					self.stats['registrations'] += 1
+				elif message_type == 'heartbeat':
+					writer.write(encoder.encode({'type': 'heartbeat_response', 'timestamp': message.get('timestamp')}))
+				elif message_type == 'lane_command':
+					data = message.get('data')
+					latency = _elapsed_ms(data.get('sent_at') if isinstance(data, dict) else None)
+					if latency is not None:
+						self.latencies.append(latency)
+					if self.send(str(message.get('lane_id')), message):
+						self.stats['relayed'] += 1
+					else:
+						self.stats['relay_misses'] += 1
+		except (ConnectionError, asyncio.IncompleteReadError):
+			pass
+		except Exception as e:
+			logger.error(f"Stand-in server connection error: {e}")
+		finally:
+			frames.close()
+			if lane_id and self.lanes.get(lane_id, (None,))[0] is writer:
+				del self.lanes[lane_id]
+			self.connections.pop(writer, None)
+			writer.close()
+
+class SimulatedLane:
+	"""Drives one AsyncLaneClient: heartbeats plus team moves to its pair lane"""
+
+	def __init__(self, client: AsyncLaneClient, partner: str, rate: float, heartbeat_interval: float,
+				 latencies: Dict[str, List[float]]):
+		self.client = client
+		self.partner = partner
+		self.rate = rate
+		self.heartbeat_interval = heartbeat_interval
+		self.latencies = latencies
+		self.sent = Counter()
+		self.received = Counter()
+		self._heartbeat_sent = None
+		self._install_probes()
+
+	def _install_probes(self):
+		"""Record receive latency, then hand the message to the client's own handler"""
+		client = self.client
+		router = client.router
+
+		async def on_team_move(message):
+			self._record('lane_to_lane', 'team_move', message.get('data', {}).get('sent_at'))
+			return await client._on_lane_command(message)
+
+		async def on_quick_game(message):
+			self._record('server_to_lane', 'quick_game', message.get('data', {}).get('sent_at'))
+			return await client.handle_quick_game(message)
+
+		async def on_heartbeat_response(message):
+			if self._heartbeat_sent is not None:
+				# Only our own heartbeats are timed; the client's heartbeat_loop sends others
+				self.latencies['heartbeat_rtt'].append((time.perf_counter() - self._heartbeat_sent) * 1000)
+				self._heartbeat_sent = None
+				self.received['heartbeat_response'] += 1
+			return await client._on_heartbeat_response(message)
+
+		router.register('lane_command', on_team_move, inner_type='team_move')
+		router.register('quick_game', on_quick_game)
+		router.register('heartbeat_response', on_heartbeat_response)
+
+	def _record(self, hop: str, message_type: str, sent_at):
+		self.received[message_type] += 1
+		latency = _elapsed_ms(sent_at)
+		if latency is not None:
+			self.latencies[hop].append(latency)
+
+	def _team_move(self) -> Dict[str, Any]:
+		frames = [{'balls': [{'value': 5, 'symbol': 'H', 'pin_config': [0, 1, 1, 1, 0]}], 'total': 5 * (i + 1)} for i in range(10)]
+		return {
+			'type': 'team_move',
+			'sent_at': time.perf_counter(),
+			'from_lane': self.client.lane_id,
+			'bowlers': [{'name': f"Lane {self.client.lane_id} bowler {n}", 'frames': frames} for n in range(4)]
+		}
+
+	async def run(self):
+		tasks = [asyncio.create_task(self._moves()), asyncio.create_task(self._heartbeats())]
+		try:
+			await asyncio.gather(*tasks)
+		finally:
+			for task in tasks:
+				task.cancel()
+
+	async def _moves(self):
+		while True:
+			await asyncio.sleep(random.expovariate(self.rate))
+			if self.client.registered.is_set():
+				self.client.post_to_lane(self.partner, 'team_move', self._team_move())
+				self.sent['team_move'] += 1
+
+	async def _heartbeats(self):
+		# Stagger the fleet like lanes that were powered on at different times
+		await asyncio.sleep(random.uniform(0, self.heartbeat_interval))
+		while True:
+			if self.client.registered.is_set() and self.client.writer and not self.client.writer.is_closing():
+				self._heartbeat_sent = time.perf_counter()
+				try:
+					await self.client.send_heartbeat()
+					self.sent['heartbeat'] += 1
+				except Exception:
+					self._heartbeat_sent = None
+			await asyncio.sleep(self.heartbeat_interval)
+
+async def _wait_registered(server: StandInServer, lane_ids: List[str], since: float, timeout: float) -> Optional[float]:
+	"""Seconds from 'since' until every lane has registered after it, or None on timeout"""
+	deadline = time.monotonic() + timeout
+	while time.monotonic() < deadline:
+		if all(server.registered_at.get(lane_id, 0) >= since and lane_id in server.lanes for lane_id in lane_ids):
+			return round(max(server.registered_at[lane_id] for lane_id in lane_ids) - since, 3)
+		await asyncio.sleep(0.05)
+	return None
+
+def _lane_client(lane_id: str, host: str, port: int) -> AsyncLaneClient:
+	"""Client with the lane's own outbox and game sync instead of the process-wide ones"""
+	client = AsyncLaneClient(lane_id=lane_id, host=host, port=port)
+	directory = os.path.join('database', f'lane_{lane_id}')
+	client.outbox = GameOutbox(os.path.join(directory, 'outbox.jsonl'), os.path.join(directory, 'outbox.acked'),
+							   dead_file=os.path.join(directory, 'outbox.dead'))
+	client.game_sync = get_game_sync(lane_id)
+	return client
+
+async def run_load_test(lanes: int = 40, duration: float = 30.0, rate: float = 2.0, heartbeat_interval: float = 5.0,
+						restart_at: Optional[float] = None, outage: float = 1.0, compression: bool = True,
+						binary: bool = True, settle_timeout: float = 60.0) -> Dict[str, Any]:
+	"""Run the fleet against a stand-in server and return the report"""
+	server = StandInServer(compression=compression, binary=binary)
+	await server.start()
+	lane_ids = [str(n + 1) for n in range(lanes)]
+	latencies = {'lane_to_server': server.latencies, 'lane_to_lane': [], 'server_to_lane': [], 'heartbeat_rtt': []}
+	report: Dict[str, Any] = {'lanes': lanes, 'duration': duration, 'rate_per_lane': rate}
+
+	clients = [_lane_client(lane_id, server.host, server.port) for lane_id in lane_ids]
+	sims = []
+	for index, client in enumerate(clients):
+		partner = lane_ids[index ^ 1] if (index ^ 1) < lanes else lane_ids[index]
+		sims.append(SimulatedLane(client, partner, rate, heartbeat_interval, latencies))
+
+	started = time.monotonic()
+	runners = [asyncio.create_task(client.run_client(), name=f"lane_{client.lane_id}") for client in clients]
+	report['registration_seconds'] = await _wait_registered(server, lane_ids, started, settle_timeout)
+
+	# Every lane gets a game pushed at it, as the desk would at opening time
+	for lane_id in lane_ids:
+		server.send(lane_id, {'type': 'quick_game', 'data': {'sent_at': time.perf_counter(), 'bowlers': ['Load Test']}})
+
+	traffic = [asyncio.create_task(sim.run()) for sim in sims]
+	traffic_started = time.monotonic()
+	storm = None
+	try:
+		if restart_at is not None and restart_at < duration:
+			await asyncio.sleep(restart_at)
+			connections = server.stats['connections']
+			registrations = server.stats['registrations']
+			down_at = time.monotonic()
+			await server.stop()
+			await asyncio.sleep(outage)
+			await server.start()
+			recovered = await _wait_registered(server, lane_ids, down_at, settle_timeout)
+			storm = {
+				'outage': outage,
+				'recovered_seconds': recovered,
+				'connections': server.stats['connections'] - connections,
+				'registrations': server.stats['registrations'] - registrations,
+				'missing_lanes': [lane_id for lane_id in lane_ids if lane_id not in server.lanes]
+			}
+		await asyncio.sleep(max(0.0, duration - (time.monotonic() - traffic_started)))
+	finally:
+		for task in traffic:
+			task.cancel()
+		await asyncio.gather(*traffic, return_exceptions=True)
+
+	await asyncio.sleep(1.0)  # Let in-flight relays arrive
+	elapsed = time.monotonic() - traffic_started
+	for client in clients:
+		client.stop()
+	await asyncio.gather(*runners, return_exceptions=True)
+	for client in clients:
+		if client.writer and not client.writer.is_closing():
+			client.writer.close()
+	await server.stop()
+
+	sent = sum((sim.sent for sim in sims), Counter())
+	received = sum((sim.received for sim in sims), Counter())
+	report.update({
+		'server_messages': server.stats['messages'],
+		'server_messages_per_second': round(server.stats['messages'] / elapsed, 1),
+		'by_type': dict(server.by_type),
+		'relayed': server.stats['relayed'],
+		'relay_misses': server.stats['relay_misses'],
+		'team_moves_sent': sent['team_move'],
+		'team_moves_delivered': received['team_move'],
+		'heartbeats_sent': sent['heartbeat'],
+		'heartbeat_responses': received['heartbeat_response'],
+		'quick_games_delivered': received['quick_game'],
+		'latency_ms': {hop: percentiles(samples) for hop, samples in latencies.items()},
+		'reconnect_storm': storm,
+		'bytes_saved': sum(client.frame_encoder.stats['bytes_saved'] for client in clients),
+		'binary_frames': sum(client.frame_encoder.stats['binary'] for client in clients),
+		'wire_bytes': sum(client.frame_encoder.stats['wire_bytes'] for client in clients)
+	})
+	return report
+
+def print_report(report: Dict[str, Any]):
+	print(f"Lanes: {report['lanes']}  duration: {report['duration']}s  team moves/lane/s: {report['rate_per_lane']}")
+	print(f"All lanes registered in: {report['registration_seconds']}s")
+	print(f"Server received {report['server_messages']} messages ({report['server_messages_per_second']}/s), "
+		  f"relayed {report['relayed']} ({report['relay_misses']} with no target connected)")
+	print(f"Team moves delivered: {report['team_moves_delivered']}/{report['team_moves_sent']}  "
+		  f"heartbeats answered: {report['heartbeat_responses']}/{report['heartbeats_sent']}  "
+		  f"quick games delivered: {report['quick_games_delivered']}/{report['lanes']}")
+	print(f"Lanes sent {report['wire_bytes']} bytes, {report['binary_frames']} binary frames, "
+		  f"compression saved {report['bytes_saved']} bytes")
+	print(f"{'latency (ms)':<16}{'count':>8}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}")
+	for hop, stats in report['latency_ms'].items():
+		print(f"{hop:<16}{stats['count']:>8}{stats['p50']:>10}{stats['p90']:>10}{stats['p99']:>10}{stats['max']:>10}")
+	storm = report['reconnect_storm']
+	if storm:
+		print(f"Reconnect storm: {storm['outage']}s outage, all lanes back in {storm['recovered_seconds']}s, "
+			  f"{storm['connections']} connections / {storm['registrations']} registrations, "
+			  f"missing: {storm['missing_lanes'] or 'none'}")
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Load test AsyncLaneClient against a local stand-in server")
+	parser.add_argument('--lanes', type=int, default=40, help="Number of simulated lanes")
+	parser.add_argument('--duration', type=float, default=30.0, help="Seconds of traffic")
+	parser.add_argument('--rate', type=float, default=2.0, help="Team moves per lane per second")
+	parser.add_argument('--heartbeat-interval', type=float, default=5.0, help="Seconds between heartbeats per lane")
+	parser.add_argument('--restart-at', type=float, help="Restart the server this many seconds in (reconnect storm)")
+	parser.add_argument('--outage', type=float, default=1.0, help="Seconds the server stays down on restart")
+	parser.add_argument('--no-compression', action='store_true', help="Do not offer frame compression")
+	parser.add_argument('--no-binary', action='store_true', help="Do not offer the binary wire codec")
+	parser.add_argument('--workdir', help="Directory for the simulated lanes' outbox and server cache")
+	parser.add_argument('--json', action='store_true', help="Print the report as JSON")
+	parser.add_argument('--verbose', action='store_true', help="Show client logging")
+	args = parser.parse_args()
+
+	logging.getLogger().setLevel(logging.INFO if args.verbose else logging.WARNING)
+	# Keep the simulated lanes away from this lane's database
+	if args.workdir:
+		os.makedirs(args.workdir, exist_ok=True)
+	os.chdir(args.workdir or tempfile.mkdtemp(prefix='lane_load_test_'))
+
+	result = asyncio.run(run_load_test(
+		lanes=args.lanes, duration=args.duration, rate=args.rate, heartbeat_interval=args.heartbeat_interval,
+		restart_at=args.restart_at, outage=args.outage, compression=not args.no_compression,
+		binary=not args.no_binary
+	))
+	if args.json:
+		print(json.dumps(result, indent=2))
+	else:
+		print_report(result)
@@ -0,0 +1,221 @@
+"""
+In-process metrics for the lane client.
+
+Each lane has a MetricsRegistry (get_metrics) holding counters, gauges
+and histograms, named like 'messages_sent' with optional labels such as
+type='heartbeat'. The client, its P2P link and its event dispatch record
+into it as they work; gauges can take a callback so queue depths are
+read when a snapshot is taken instead of being updated on every put and
+get. Metrics are updated on the client loop without locking - only
+creating a new metric takes the lock. A snapshot is plain JSON: it goes
+to the server with the lane's diagnostics, and the client writes all
+lanes' snapshots to METRICS_FILE, which `python lane_metrics.py` prints
+as a table.
+"""
+
+import argparse
+import bisect
+import json
+import os
+import time
+from contextlib import contextmanager
+from threading import Lock
+from typing import Any, Callable, Dict, Optional, Sequence
+
+METRICS_FILE = 'database/metrics.json'
+DEFAULT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)  # ms
+
+def metric_key(name: str, labels: Dict[str, Any]) -> str:
+	"""'name{label=value,...}' with labels sorted, or just the name"""
+	if not labels:
+		return name
+	return name + '{' + ','.join(f"{key}={value}" for key, value in sorted(labels.items())) + '}'
+
+class Counter:
+	__slots__ = ('value',)
+
+	def __init__(self):
+		self.value = 0
+
+	def inc(self, amount: int = 1):
+		self.value += amount
+
+	def snapshot(self) -> int:
+		return self.value
+
+class Gauge:
+	__slots__ = ('value', 'fn')
+
+	def __init__(self, fn: Optional[Callable[[], Any]] = None):
+		self.value = 0
+		self.fn = fn  # Read at snapshot time instead of value
+
+	def set(self, value):
+		self.value = value
+
+	def inc(self, amount=1):
+		self.value += amount
+
+	def dec(self, amount=1):
+		self.value -= amount
+
+	def snapshot(self):
+		if self.fn is None:
+			return self.value
+		try:
+			return self.fn()
+		except Exception:
+			return None
+
+class Histogram:
+	"""Counts per fixed bucket, with count/sum/max and bucket-resolution percentiles"""
+	__slots__ = ('bounds', 'counts', 'count', 'sum', 'max')
+
+	def __init__(self, bounds: Sequence[float] = DEFAULT_BUCKETS):
+		self.bounds = tuple(bounds)
+		self.counts = [0] * (len(self.bounds) + 1)  # The last bucket takes everything over the top bound
+		self.count = 0
+		self.sum = 0.0
+		self.max = 0.0
+
+	def observe(self, value: float):
+		self.counts[bisect.bisect_left(self.bounds, value)] += 1
+		self.count += 1
+		self.sum += value
+		if value > self.max:
+			self.max = value
+
+	def quantile(self, q: float) -> float:
+		"""Upper bound of the bucket holding the q-th value, capped at the max seen"""
+		if not self.count:
+			return 0.0
+		rank = q * self.count
+		seen = 0
+		for bound, count in zip(self.bounds, self.counts):
+			seen += count
+			if seen >= rank:
+				return min(bound, self.max)
+		return self.max
+
+	def snapshot(self) -> Dict[str, Any]:
+		buckets = {f"le_{bound}": count for bound, count in zip(self.bounds, self.counts) if count}
+		if self.counts[-1]:
+			buckets['inf'] = self.counts[-1]
+		return {
+			'count': self.count,
+			'avg': round(self.sum / self.count, 2) if self.count else 0.0,
+			'max': round(self.max, 2),
+			'p50': round(self.quantile(0.5), 2),
+			'p90': round(self.quantile(0.9), 2),
+			'p99': round(self.quantile(0.99), 2),
+			'buckets': buckets
+		}
+
+class MetricsRegistry:
+	def __init__(self, lane_id: Optional[str] = None):
+		self.lane_id = lane_id
+		self.started = time.time()
+		self._counters: Dict[str, Counter] = {}
+		self._gauges: Dict[str, Gauge] = {}
+		self._histograms: Dict[str, Histogram] = {}
+		self._lock = Lock()
+
+	def _get(self, metrics: Dict[str, Any], key: str, factory: Callable[[], Any]):
+		metric = metrics.get(key)
+		if metric is None:
+			with self._lock:
+				metric = metrics.get(key)
+				if metric is None:
+					metric = metrics[key] = factory()
+		return metric
+
+	def counter(self, name: str, **labels) -> Counter:
+		return self._get(self._counters, metric_key(name, labels), Counter)
+
+	def gauge(self, name: str, fn: Optional[Callable[[], Any]] = None, **labels) -> Gauge:
+		"""Gauge by name; passing fn (re)binds the callback it reports"""
+		gauge = self._get(self._gauges, metric_key(name, labels), Gauge)
+		if fn is not None:
+			gauge.fn = fn
+		return gauge
+
+	def histogram(self, name: str, bounds: Sequence[float] = DEFAULT_BUCKETS, **labels) -> Histogram:
+		return self._get(self._histograms, metric_key(name, labels), lambda: Histogram(bounds))
+
+	@contextmanager
+	def timer(self, name: str, **labels):
+		"""Observe the time spent in the block, in ms"""
+		start = time.perf_counter()
+		try:
+			yield
+		finally:
+			self.histogram(name, **labels).observe((time.perf_counter() - start) * 1000)
+
+	def snapshot(self) -> Dict[str, Any]:
+		"""JSON-ready copy of every metric"""
+		return {
+			'lane_id': self.lane_id,
+			'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+			'uptime': round(time.time() - self.started, 1),
+			'counters': {key: counter.snapshot() for key, counter in sorted(self._counters.items())},
+			'gauges': {key: gauge.snapshot() for key, gauge in sorted(self._gauges.items())},
+			'histograms': {key: histogram.snapshot() for key, histogram in sorted(self._histograms.items())}
+		}
+
+def format_table(snapshot: Dict[str, Any]) -> str:
+	"""Human-readable view of one registry snapshot"""
+	lines = [f"Lane {snapshot.get('lane_id')} at {snapshot.get('timestamp')} (up {snapshot.get('uptime')} s)"]
+	for section in ('counters', 'gauges'):
+		values = snapshot.get(section) or {}
+		if values:
+			lines.append(f"  {section}:")
+			width = max(len(key) for key in values)
+			lines += [f"    {key:<{width}}  {value}" for key, value in values.items()]
+	histograms = snapshot.get('histograms') or {}
+	if histograms:
+		lines.append("  histograms (ms):")
+		width = max(len(key) for key in histograms)
+		lines.append(f"    {'':<{width}}  {'count':>7} {'avg':>9} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9}")
+		for key, h in histograms.items():
+			lines.append(f"    {key:<{width}}  {h['count']:>7} {h['avg']:>9} {h['p50']:>9} {h['p90']:>9} {h['p99']:>9} {h['max']:>9}")
+	return '\n'.join(lines)
+
+_registries: Dict[Optional[str], MetricsRegistry] = {}
+_registry_lock = Lock()
+
+def get_metrics(lane_id: Optional[str] = None) -> MetricsRegistry:
+	"""Registry for a lane; lanes hosted in one process each have their own"""
+	with _registry_lock:
+		registry = _registries.get(lane_id)
+		if registry is None:
+			registry = _registries[lane_id] = MetricsRegistry(lane_id)
+	return registry
+
+def snapshot_all() -> Dict[str, Any]:
+	"""Snapshots of every lane's registry, keyed by lane id"""
+	with _registry_lock:
+		registries = list(_registries.values())
+	return {str(registry.lane_id): registry.snapshot() for registry in registries}
+
+def write_snapshots(snapshots: Dict[str, Any], path: str = METRICS_FILE):
+	"""Replace the metrics file with the given snapshots"""
+	directory = os.path.dirname(path)
+	if directory:
+		os.makedirs(directory, exist_ok=True)
+	tmp_file = path + '.tmp'
+	with open(tmp_file, 'w') as f:
+		json.dump(snapshots, f, indent=1)
+	os.replace(tmp_file, path)
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Show the metrics last written by the lane client")
+	parser.add_argument('file', nargs='?', default=METRICS_FILE, help="Metrics file")
+	parser.add_argument('--json', action='store_true', help="Print the raw snapshot")
+	args = parser.parse_args()
+
+	with open(args.file) as f:
+		snapshots = json.load(f)
+	if args.json:
+		print(json.dumps(snapshots, indent=2))
+	else:
+		print('\n\n'.join(format_table(snapshot) for snapshot in snapshots.values()))
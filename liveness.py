@@ -0,0 +1,86 @@
+"""
+Link liveness for the lane's server connection.
+
+Every message written or read counts as proof of life, so heartbeats
+are only sent once the link has been quiet in either direction for the
+current interval. The interval adapts to how the link behaves: each
+answered heartbeat stretches it (up to max_interval), a missed answer
+drops it to min_interval and the next heartbeat goes out at once. After
+max_missed heartbeats in a row go unanswered within ack_timeout the
+link is declared dead, which takes seconds instead of waiting out the
+read timeout.
+"""
+
+import time
+from typing import Any, Dict, Tuple
+
+_stamp = [0, '']
+
+def wall_timestamp() -> str:
+	"""Current local time as '%Y-%m-%d %H:%M:%S', formatted at most once per second"""
+	now = int(time.time())
+	if now != _stamp[0]:
+		_stamp[0] = now
+		_stamp[1] = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(now))
+	return _stamp[1]
+
+class LivenessTracker:
+	def __init__(self, min_interval: float = 5.0, max_interval: float = 30.0, ack_timeout: float = 5.0,
+				 max_missed: int = 3):
+		self.min_interval = min_interval
+		self.max_interval = max_interval  # Must stay well under the server's idle timeout
+		self.ack_timeout = ack_timeout
+		self.max_missed = max_missed
+		self.interval = max_interval / 2
+		self.last_sent = self.last_received = time.monotonic()
+		self.awaiting_since = None  # Time of the heartbeat still waiting for any reply
+		self.missed = 0
+		self.stats = {'heartbeats': 0, 'acked': 0, 'missed': 0, 'dead_links': 0}
+
+	def reset(self):
+		"""Fresh connection: nothing outstanding, the idle clock starts now"""
+		self.last_sent = self.last_received = time.monotonic()
+		self.awaiting_since = None
+		self.missed = 0
+
+	def sent(self):
+		self.last_sent = time.monotonic()
+
+	def received(self):
+		self.last_received = time.monotonic()
+		if self.awaiting_since is not None:
+			self.awaiting_since = None
+			self.missed = 0
+			self.stats['acked'] += 1
+			self.interval = min(self.interval * 1.5, self.max_interval)
+
+	def heartbeat_sent(self):
+		self.stats['heartbeats'] += 1
+		if self.awaiting_since is None:
+			self.awaiting_since = time.monotonic()
+
+	def poll(self) -> Tuple[str, float]:
+		"""What the heartbeat loop should do now: ('wait', seconds), ('heartbeat', 0) or ('dead', 0)"""
+		now = time.monotonic()
+		if self.awaiting_since is not None:
+			deadline = self.awaiting_since + self.ack_timeout
+			if now < deadline:
+				return 'wait', deadline - now
+			self.awaiting_since = None
+			self.missed += 1
+			self.stats['missed'] += 1
+			self.interval = self.min_interval
+			if self.missed >= self.max_missed:
+				self.stats['dead_links'] += 1
+				return 'dead', 0.0
+			return 'heartbeat', 0.0
+
+		due = min(self.last_sent, self.last_received) + self.interval
+		if now >= due:
+			return 'heartbeat', 0.0
+		return 'wait', due - now
+
+	def get_stats(self) -> Dict[str, Any]:
+		now = time.monotonic()
+		return dict(self.stats, interval=round(self.interval, 1), missed_in_row=self.missed,
+					idle_sent=round(now - self.last_sent, 1), idle_received=round(now - self.last_received, 1))
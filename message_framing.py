@@ -0,0 +1,241 @@
+"""
+Incremental reader for the newline-delimited JSON protocol used between
+lanes and the server.
+
+FrameReader pulls whatever bytes are available into one reusable buffer
+and splits complete frames out of it, so a long read loop costs one
+await per chunk rather than a task and a timeout per message. Frames may
+be far larger than the StreamReader line limit, up to max_message_size;
+anything bigger is logged, counted and skipped without losing sync with
+the stream. Idle peers are detected by a single watchdog timer that only
+fires once per idle_timeout window.
+
+Large frames can be zlib-compressed once the other side has said it
+understands them (COMPRESSION_CODECS in the registration or p2p_offer).
+A compressed frame is COMPRESSED_PREFIX followed by the base64 of the
+deflated JSON, so it stays a single newline-free line that never starts
+like a JSON object. Frames under the threshold - heartbeats, acks, most
+commands - are always sent as plain JSON. FrameReader accepts both forms
+regardless of negotiation.
+
+Frames can also be binary records from wire_codec once the other side
+lists 'binary' in its codecs. FrameEncoder.serialize() picks the binary
+form when one exists and JSON otherwise; FrameReader tells the forms
+apart by the first byte of each frame.
+"""
+
+import asyncio
+import base64
+import binascii
+import json
+import logging
+import time
+import zlib
+from typing import Any, Callable, Dict, Optional
+
+from wire_codec import BINARY_PREFIX, decode_message, encode_message, frame_size
+
+logger = logging.getLogger(__name__)
+
+MAX_MESSAGE_SIZE = 8 * 1024 * 1024
+READ_SIZE = 64 * 1024
+COMPRESSED_PREFIX = b'~'
+COMPRESSION_CODECS = ['zlib']
+COMPRESSION_THRESHOLD = 1024  # Frames smaller than this gain little and cost a deflate call
+COMPRESSION_LEVEL = 6
+
+class FrameEncoder:
+	"""Turns outbound JSON lines into wire frames, compressing large ones once negotiated"""
+
+	def __init__(self, threshold: int = COMPRESSION_THRESHOLD, level: int = COMPRESSION_LEVEL):
+		self.threshold = threshold
+		self.level = level
+		self.compress = False
+		self.binary = False
+		self.stats = {'frames': 0, 'compressed': 0, 'binary': 0, 'raw_bytes': 0, 'wire_bytes': 0, 'bytes_saved': 0}
+
+	def negotiate(self, codecs) -> bool:
+		"""Enable compression if the other side listed a codec we support"""
+		if isinstance(codecs, str):
+			codecs = [codecs]
+		self.compress = isinstance(codecs, (list, tuple)) and any(codec in COMPRESSION_CODECS for codec in codecs)
+		return self.compress
+
+	def negotiate_codec(self, codecs) -> bool:
+		"""Send binary frames if the other side listed the binary wire codec"""
+		if isinstance(codecs, str):
+			codecs = [codecs]
+		self.binary = isinstance(codecs, (list, tuple)) and 'binary' in codecs
+		return self.binary
+
+	def serialize(self, message: Dict[str, Any]) -> bytes:
+		"""Binary frame when negotiated and the message has one, otherwise a JSON line"""
+		if self.binary:
+			try:
+				return encode_message(message)
+			except ValueError:
+				pass
+		return json.dumps(message).encode('utf-8') + b'\n'
+
+	def encode(self, message: Dict[str, Any]) -> bytes:
+		return self.frame(self.serialize(message))
+
+	def frame(self, line: bytes) -> bytes:
+		"""Wire form of a serialized message (JSON line or binary frame)"""
+		stats = self.stats
+		if line[:1] == BINARY_PREFIX:
+			if self.binary:
+				stats['frames'] += 1
+				stats['binary'] += 1
+				stats['raw_bytes'] += len(line)
+				stats['wire_bytes'] += len(line)
+				return line
+			# Serialized before a reconnect to a side without the binary codec
+			line = json.dumps(decode_message(line)).encode('utf-8') + b'\n'
+		stats['frames'] += 1
+		stats['raw_bytes'] += len(line)
+		if self.compress and len(line) >= self.threshold:
+			packed = COMPRESSED_PREFIX + base64.b64encode(zlib.compress(line[:-1], self.level)) + b'\n'
+			if len(packed) < len(line):
+				stats['compressed'] += 1
+				stats['wire_bytes'] += len(packed)
+				stats['bytes_saved'] += len(line) - len(packed)
+				return packed
+		stats['wire_bytes'] += len(line)
+		return line
+
+class FrameReader:
+	def __init__(self, reader: asyncio.StreamReader, max_message_size: int = MAX_MESSAGE_SIZE,
+				 idle_timeout: Optional[float] = None, on_idle: Optional[Callable[[], None]] = None,
+				 read_size: int = READ_SIZE):
+		self.reader = reader
+		self.max_message_size = max_message_size
+		self.idle_timeout = idle_timeout
+		self.on_idle = on_idle
+		self.read_size = read_size
+		self.buffer = bytearray()
+		self._scan_from = 0		# Bytes already searched for a newline
+		self._discarding = False  # Skipping the rest of an oversized frame
+		self.idle_expired = False
+		self.last_activity = time.monotonic()
+		self._watchdog = None
+		self.stats = {'messages': 0, 'bytes': 0, 'max_message': 0, 'oversized': 0, 'decode_errors': 0,
+					  'compressed': 0, 'inflated_bytes': 0, 'binary': 0}
+
+	def _arm_watchdog(self, delay: float):
+		self._watchdog = asyncio.get_running_loop().call_later(delay, self._check_idle)
+
+	def _check_idle(self):
+		idle = time.monotonic() - self.last_activity
+		if idle < self.idle_timeout:
+			# Traffic arrived since the timer was set - check again when the new window ends
+			self._arm_watchdog(self.idle_timeout - idle)
+			return
+		self._watchdog = None
+		self.idle_expired = True
+		logger.warning(f"No data from peer for {idle:.0f} seconds")
+		if self.on_idle:
+			self.on_idle()
+
+	def close(self):
+		"""Stop the idle watchdog"""
+		if self._watchdog:
+			self._watchdog.cancel()
+			self._watchdog = None
+
+	def _next_frame(self) -> Optional[bytes]:
+		"""Split one complete frame off the buffer, or None if more data is needed"""
+		while True:
+			if not self._discarding and self.buffer[:1] == BINARY_PREFIX:
+				size = frame_size(self.buffer)
+				if not size or len(self.buffer) < size:
+					return None
+				frame = bytes(self.buffer[:size])
+				del self.buffer[:size]
+				self._scan_from = 0
+				return frame
+
+			newline = self.buffer.find(b'\n', self._scan_from)
+			if newline < 0:
+				if self._discarding:
+					self.buffer.clear()
+				elif len(self.buffer) > self.max_message_size:
+					self._drop_oversized(len(self.buffer))
+					self.buffer.clear()
+					self._discarding = True
+				self._scan_from = len(self.buffer)
+				return None
+
+			frame = bytes(self.buffer[:newline])
+			del self.buffer[:newline + 1]
+			self._scan_from = 0
+			if self._discarding:
+				self._discarding = False
+				continue
+			if len(frame) > self.max_message_size:
+				self._drop_oversized(len(frame))
+				continue
+			return frame
+
+	def _drop_oversized(self, size: int):
+		self.stats['oversized'] += 1
+		logger.error(f"Dropping message larger than {self.max_message_size} bytes (at least {size} bytes received)")
+
+	def _inflate(self, frame: bytes) -> Optional[bytes]:
+		"""JSON text of a compressed frame, refusing anything that inflates past max_message_size"""
+		inflater = zlib.decompressobj()
+		data = inflater.decompress(base64.b64decode(frame[len(COMPRESSED_PREFIX):], validate=True), self.max_message_size)
+		if inflater.unconsumed_tail:
+			self._drop_oversized(self.max_message_size)
+			return None
+		self.stats['compressed'] += 1
+		self.stats['inflated_bytes'] += len(data)
+		return data
+
+	async def read_message(self) -> Optional[Dict[str, Any]]:
+		"""Next decoded message, or None once the peer closes the connection"""
+		if self.idle_timeout and not self._watchdog and not self.idle_expired:
+			self._arm_watchdog(self.idle_timeout)
+
+		while True:
+			frame = self._next_frame()
+			if frame is None:
+				chunk = await self.reader.read(self.read_size)
+				if not chunk:
+					self.close()
+					return None
+				self.last_activity = time.monotonic()
+				self.buffer += chunk
+				continue
+
+			if frame[:1] == BINARY_PREFIX:
+				self.stats['messages'] += 1
+				self.stats['bytes'] += len(frame)
+				self.stats['binary'] += 1
+				try:
+					return decode_message(frame)
+				except ValueError as e:
+					self.stats['decode_errors'] += 1
+					logger.error(f"Corrupt binary frame: {e}")
+					continue
+
+			frame = frame.strip()
+			if not frame:
+				continue
+			self.stats['messages'] += 1
+			self.stats['bytes'] += len(frame)
+			if len(frame) > self.stats['max_message']:
+				self.stats['max_message'] = len(frame)
+			try:
+				if frame.startswith(COMPRESSED_PREFIX):
+					frame = self._inflate(frame)
+					if frame is None:
+						continue
+				return json.loads(frame)
+			except (binascii.Error, zlib.error) as e:
+				self.stats['decode_errors'] += 1
+				logger.error(f"Corrupt compressed frame: {e}")
+			except (UnicodeDecodeError, json.JSONDecodeError) as e:
+				self.stats['decode_errors'] += 1
+				logger.error(f"JSON decode error: {e}")
+				logger.debug(f"Problematic data: {frame[:200]!r}")
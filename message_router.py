@@ -0,0 +1,86 @@
+"""
+Routing table for messages received from the server.
+
+Handlers are registered per (type, inner_type) key, where inner_type is
+the 'type' field of a nested command (e.g. a lane_command wrapping a
+quick_game) and None matches any inner type. Lookup is a dictionary hit
+per message no matter how many routes exist, and each route keeps a
+call count and handler timing for diagnostics.
+"""
+
+import json
+import logging
+import time
+import traceback
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[Dict[str, Any]], Awaitable[Any]]
+RouteKey = Tuple[Optional[str], Optional[str]]
+
+class MessageRouter:
+	def __init__(self, default: Optional[Handler] = None):
+		self.routes: Dict[RouteKey, Handler] = {}
+		self.nested_types = set()  # Message types whose data carries an inner 'type'
+		self.default = default
+		self.stats: Dict[str, Dict[str, float]] = {}
+
+	def register(self, message_type: str, handler: Handler, inner_type: Optional[str] = None):
+		"""Route messages of message_type (and optionally a nested inner_type) to handler"""
+		self.routes[(message_type, inner_type)] = handler
+		if inner_type is not None:
+			self.nested_types.add(message_type)
+
+	def resolve(self, message: Dict[str, Any]) -> Tuple[str, Optional[Handler]]:
+		"""Stats key and handler for a message, falling back from exact to type to default route"""
+		message_type = message.get('type')
+		if message_type in self.nested_types:
+			message_data = message.get('data')
+			inner_type = message_data.get('type') if isinstance(message_data, dict) else None
+			handler = self.routes.get((message_type, inner_type)) if inner_type is not None else None
+			if handler:
+				return f"{message_type}/{inner_type}", handler
+		handler = self.routes.get((message_type, None))
+		if handler:
+			return message_type, handler
+		return f"{message_type}*", self.default
+
+	async def route(self, message: Dict[str, Any]) -> bool:
+		"""Run the handler for a message; False if it was unhandled or the handler failed"""
+		key, handler = self.resolve(message)
+		if logger.isEnabledFor(logging.DEBUG):
+			message_data = message.get('data')
+			if message_data:
+				logger.debug(f"Message data sample: {json.dumps(message_data, default=str)[:100]}...")
+
+		stats = self.stats.get(key)
+		if stats is None:
+			stats = self.stats[key] = {'count': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0}
+		stats['count'] += 1
+
+		if handler is None:
+			logger.warning(f"Unhandled message type: {message.get('type')}")
+			return False
+
+		start = time.perf_counter()
+		try:
+			result = await handler(message)
+		except Exception as e:
+			stats['errors'] += 1
+			logger.error(f"Error handling {key} message: {e}")
+			logger.error(f"Traceback: {traceback.format_exc()}")
+			return False
+		finally:
+			elapsed = (time.perf_counter() - start) * 1000
+			stats['total_ms'] += elapsed
+			if elapsed > stats['max_ms']:
+				stats['max_ms'] = elapsed
+		return result is not False
+
+	def get_stats(self) -> Dict[str, Dict[str, float]]:
+		"""Per-route counters with average handler time"""
+		return {
+			key: dict(stats, avg_ms=round(stats['total_ms'] / stats['count'], 3) if stats['count'] else 0.0)
+			for key, stats in self.stats.items()
+		}
@@ -0,0 +1,155 @@
+"""
+Resumable message stream between a lane and the server.
+
+Once the server confirms session support in its registration response,
+every outbound message except heartbeats and session control carries a
+msg_seq and stays in a bounded replay buffer until the server acks it
+(ack_seq on any server message, or a session_ack). Inbound messages are
+numbered the same way; duplicates are dropped and the lane acks what it
+has processed. After a reconnect the lane registers with its session_id
+and last_received_seq, the server replays what the lane missed, and the
+lane replays only what the server had not acked. Servers that do not
+send a 'session' block see the same messages as before.
+"""
+
+import json
+import logging
+import uuid
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+UNSEQUENCED = {'heartbeat', 'registration', 'session_ack', 'session_resend'}
+
+class SessionStream:
+	def __init__(self, max_messages: int = 1000, max_bytes: int = 1024 * 1024):
+		self.session_id = uuid.uuid4().hex
+		self.max_messages = max_messages
+		self.max_bytes = max_bytes
+		self.enabled = False
+		self.next_seq = 1
+		self.unacked = deque()  # (msg_seq, serialized payload)
+		self.unacked_bytes = 0
+		self.overflowed = False  # Dropped unacked messages - a resume would leave a hole
+		self.last_received = 0
+		self.acked_received = 0  # Highest inbound seq we have told the server about
+		self._requested_from = None  # Outstanding session_resend, so a gap is only reported once
+		self.stats = {'sequenced': 0, 'replayed': 0, 'duplicates': 0, 'gaps': 0, 'resumes': 0, 'fresh_sessions': 0}
+
+	def resume_info(self) -> Dict[str, Any]:
+		"""Fields added to the registration message; last_received_seq doubles as an ack"""
+		self.acked_received = self.last_received
+		return {'session_id': self.session_id, 'last_received_seq': self.last_received}
+
+	def encode(self, message: Dict[str, Any], serialize: Optional[Callable[[Dict[str, Any]], bytes]] = None) -> bytes:
+		"""Serialize an outbound message (JSON line unless serialize is given), sequencing and buffering it while the session is active"""
+		seq = None
+		if self.enabled:
+			message = dict(message)  # The caller may reuse or resend its dict
+			if message.get('type') not in UNSEQUENCED:
+				seq = message['msg_seq'] = self.next_seq
+			if self.last_received > self.acked_received:
+				message['ack_seq'] = self.last_received
+		data = serialize(message) if serialize else json.dumps(message).encode('utf-8') + b'\n'
+
+		if 'ack_seq' in message:
+			self.acked_received = max(self.acked_received, message['ack_seq'])
+		if seq is not None:
+			self.next_seq += 1
+			self.stats['sequenced'] += 1
+			self.unacked.append((seq, data))
+			self.unacked_bytes += len(data)
+			while len(self.unacked) > self.max_messages or self.unacked_bytes > self.max_bytes:
+				_, dropped = self.unacked.popleft()
+				self.unacked_bytes -= len(dropped)
+				self.overflowed = True
+		return data
+
+	def on_ack(self, ack_seq: int):
+		"""Release buffered messages the server has received"""
+		while self.unacked and self.unacked[0][0] <= ack_seq:
+			_, data = self.unacked.popleft()
+			self.unacked_bytes -= len(data)
+		if not self.unacked:
+			self.overflowed = False
+
+	def accept(self, message: Dict[str, Any]) -> Optional[bool]:
+		"""
+		Track an inbound message. True to process it, False for a duplicate,
+		None for a message past a gap - it is dropped and the caller sends
+		resend_request(), so it arrives again in order.
+		"""
+		ack_seq = message.get('ack_seq')
+		if ack_seq is not None:
+			self.on_ack(ack_seq)
+		seq = message.get('msg_seq')
+		if seq is None or not self.enabled:
+			return True
+		if seq <= self.last_received:
+			self.stats['duplicates'] += 1
+			return False
+		if seq > self.last_received + 1:
+			self.stats['gaps'] += 1
+			return None
+		self.last_received = seq
+		return True
+
+	def resend_request(self) -> Optional[Dict[str, Any]]:
+		"""session_resend for the first missing message, or None if already requested"""
+		from_seq = self.last_received + 1
+		if self._requested_from == from_seq:
+			return None
+		self._requested_from = from_seq
+		return {'type': 'session_resend', 'from_seq': from_seq}
+
+	def needs_ack(self) -> bool:
+		return self.enabled and self.last_received > self.acked_received
+
+	def ack_message(self) -> Dict[str, Any]:
+		return {'type': 'session_ack', 'ack_seq': self.last_received}
+
+	def on_registered(self, response: Dict[str, Any]) -> Optional[List[bytes]]:
+		"""
+		Apply the server's session block. Returns the payloads to replay when
+		the session was resumed without losing anything, or None when the
+		caller has to fall back to a full state resend.
+		"""
+		session = response.get('session')
+		if not isinstance(session, dict):
+			if self.enabled:
+				logger.info("Server did not confirm session support, message replay disabled")
+			self.enabled = False
+			self.unacked.clear()
+			self.unacked_bytes = 0
+			return None
+
+		was_enabled = self.enabled
+		self.enabled = True
+		self._requested_from = None
+		if not session.get('resumed'):
+			# The server has no record of us: number from scratch on both sides
+			if was_enabled:
+				logger.info("Server started a fresh session, replay buffer discarded")
+			self.stats['fresh_sessions'] += 1
+			self.unacked.clear()
+			self.unacked_bytes = 0
+			self.overflowed = False
+			self.next_seq = 1
+			self.last_received = 0
+			self.acked_received = 0
+			return None
+
+		ack_seq = session.get('ack_seq', 0)
+		hole = self.overflowed and (not self.unacked or self.unacked[0][0] > ack_seq + 1)
+		self.on_ack(ack_seq)
+		if hole:
+			logger.warning("Replay buffer overflowed during the outage, falling back to a full resync")
+			self.unacked.clear()
+			self.unacked_bytes = 0
+			self.overflowed = False
+			return None
+
+		self.stats['resumes'] += 1
+		self.stats['replayed'] += len(self.unacked)
+		return [data for _, data in self.unacked]
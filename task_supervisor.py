@@ -0,0 +1,145 @@
+"""
+Supervision for the lane client's long-running tasks.
+
+Each task is started through spawn() with a factory that creates its
+coroutine, and watched with a done-callback instead of polling the loop.
+A critical task that crashes, or returns while the client is still
+running, is restarted after an exponential backoff. At most max_restarts
+restarts are allowed within restart_window seconds; past that the task
+is marked failed and tried again once the window has passed, so a task
+that keeps crashing cannot spin the loop. The task table is keyed by
+name, so restarts replace their entry instead of growing a list.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class _Entry:
+	__slots__ = ('name', 'factory', 'critical', 'task', 'state', 'started', 'restarts', 'recent', 'last_error', 'timer')
+
+	def __init__(self, name: str, factory: Callable[[], Awaitable[Any]], critical: bool):
+		self.name = name
+		self.factory = factory
+		self.critical = critical
+		self.task: Optional[asyncio.Task] = None
+		self.state = 'pending'
+		self.started = 0.0
+		self.restarts = 0
+		self.recent = deque()  # monotonic times of restarts inside the budget window
+		self.last_error: Optional[str] = None
+		self.timer: Optional[asyncio.TimerHandle] = None
+
+class TaskSupervisor:
+	def __init__(self, max_restarts: int = 5, restart_window: float = 60.0, base_delay: float = 1.0,
+				 max_delay: float = 30.0, keep_running: Optional[Callable[[], bool]] = None):
+		self.keep_running = keep_running  # False once the owner is shutting down, so exits are expected
+		self.max_restarts = max_restarts
+		self.restart_window = restart_window
+		self.base_delay = base_delay
+		self.max_delay = max_delay
+		self.entries: Dict[str, _Entry] = {}
+		self.stopping = False
+
+	def _stopping(self) -> bool:
+		return self.stopping or (self.keep_running is not None and not self.keep_running())
+
+	def spawn(self, name: str, factory: Callable[[], Awaitable[Any]], critical: bool = False) -> asyncio.Task:
+		"""Start factory() as a task called name, replacing any finished task of that name"""
+		old = self.entries.get(name)
+		if old and old.task and not old.task.done():
+			raise RuntimeError(f"Task {name} is already running")
+		if old and old.timer:
+			old.timer.cancel()
+		entry = _Entry(name, factory, critical)
+		self.entries[name] = entry
+		self._start(entry)
+		return entry.task
+
+	def _start(self, entry: _Entry):
+		entry.timer = None
+		entry.task = asyncio.get_running_loop().create_task(entry.factory(), name=entry.name)
+		entry.state = 'running'
+		entry.started = time.monotonic()
+		entry.task.add_done_callback(self._on_done)
+
+	def _on_done(self, task: asyncio.Task):
+		entry = self.entries.get(task.get_name())
+		if entry is None or entry.task is not task:
+			return
+		if task.cancelled():
+			entry.state = 'cancelled'
+			return
+		error = task.exception()
+		if error is None and (self._stopping() or not entry.critical):
+			entry.state = 'done'
+			return
+
+		if error is not None:
+			entry.last_error = f"{type(error).__name__}: {error}"
+			logger.error(f"Task {entry.name} failed with: {entry.last_error}")
+		else:
+			entry.last_error = 'exited unexpectedly'
+			logger.warning(f"Task {entry.name} exited while the client is running")
+		if not entry.critical or self._stopping():
+			entry.state = 'failed'
+			return
+		self._schedule_restart(entry)
+
+	def _schedule_restart(self, entry: _Entry):
+		now = time.monotonic()
+		while entry.recent and now - entry.recent[0] > self.restart_window:
+			entry.recent.popleft()
+		if len(entry.recent) >= self.max_restarts:
+			# Budget spent - wait until the oldest restart leaves the window
+			delay = self.restart_window - (now - entry.recent[0])
+			entry.state = 'failed'
+			logger.error(f"Task {entry.name} restarted {len(entry.recent)} times in {self.restart_window:.0f}s, "
+						 f"next attempt in {delay:.0f}s")
+		else:
+			delay = min(self.base_delay * (2 ** len(entry.recent)), self.max_delay)
+			entry.state = 'restarting'
+			logger.info(f"Restarting task {entry.name} in {delay:.1f}s")
+		entry.timer = asyncio.get_running_loop().call_later(delay, self._restart, entry)
+
+	def _restart(self, entry: _Entry):
+		if self.entries.get(entry.name) is not entry:
+			return
+		if self._stopping():
+			entry.timer = None
+			entry.state = 'cancelled'
+			return
+		entry.recent.append(time.monotonic())
+		entry.restarts += 1
+		self._start(entry)
+
+	def tasks(self) -> List[asyncio.Task]:
+		return [entry.task for entry in self.entries.values() if entry.task]
+
+	def table(self) -> List[Dict[str, Any]]:
+		"""One row per supervised task: state, restarts, uptime and last error"""
+		now = time.monotonic()
+		return [{
+			'name': entry.name,
+			'state': entry.state,
+			'critical': entry.critical,
+			'restarts': entry.restarts,
+			'uptime': round(now - entry.started, 1) if entry.state == 'running' else 0.0,
+			'last_error': entry.last_error
+		} for entry in self.entries.values()]
+
+	async def stop(self):
+		"""Cancel every task and pending restart, and wait for the tasks to finish"""
+		self.stopping = True
+		for entry in self.entries.values():
+			if entry.timer:
+				entry.timer.cancel()
+				entry.timer = None
+				entry.state = 'cancelled'
+			if entry.task and not entry.task.done():
+				entry.task.cancel()
+		await asyncio.gather(*self.tasks(), return_exceptions=True)
@@ -0,0 +1,17 @@
+import json
+import os
+import sys
+
+import pytest
+
+# The lane modules live at the repository root rather than in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def lane_client(tmp_path, monkeypatch):
+	"""The Lane_Client module, run from a scratch directory holding its settings.json and database/"""
+	pytest.importorskip('event_dispatcher')  # Installed with the lane software, not part of this tree
+	monkeypatch.chdir(tmp_path)
+	(tmp_path / 'settings.json').write_text(json.dumps({'Lane': 1}))
+	import Lane_Client
+	return Lane_Client
@@ -0,0 +1,100 @@
+import json
+import os
+import struct
+
+import pytest
+
+import ball_history_export
+from ball_history_export import COLUMN_STRUCTS, BallHistoryExporter
+
+def game(name, balls, date='2026-10-19'):
+	"""Standard record: one frame per entry in balls, each a list of (pin_config, value)"""
+	frames = [{'balls': [{'pin_config': pins, 'symbol': str(value), 'value': value} for pins, value in frame]}
+			  for frame in balls]
+	return {'date': date, 'time': '12:00:00', 'bowlers': [{'name': name, 'frames': frames}]}
+
+STRIKE = ([1, 1, 1, 1, 1], 15)
+FIVE = ([1, 1, 0, 0, 0], 5)
+
+def read_columns(export_dir):
+	with open(os.path.join(export_dir, 'manifest.json')) as f:
+		manifest = json.load(f)
+	columns = {}
+	for name, column in COLUMN_STRUCTS.items():
+		with open(os.path.join(export_dir, f"{name}.bin"), 'rb') as f:
+			data = f.read()
+		assert len(data) == manifest['rows'] * column.size
+		columns[name] = [values[0] for values in column.iter_unpack(data)]
+	return manifest, columns
+
+def test_incremental_runs_append_only_new_games(tmp_path):
+	export_dir = str(tmp_path / 'export')
+	games = [game('Ann', [[STRIKE], [FIVE, FIVE]]), game('Bob', [[FIVE]])]
+	assert BallHistoryExporter(export_dir).export(games) == 4
+
+	games.append(game('Ann', [[STRIKE]]))
+	assert BallHistoryExporter(export_dir).export(games) == 1
+	manifest, columns = read_columns(export_dir)
+	assert (manifest['rows'], manifest['games_exported'], manifest['bowlers']) == (5, 3, ['Ann', 'Bob'])
+	assert columns['game_id'] == [0, 0, 0, 1, 2]
+	assert columns['bowler_id'] == [0, 0, 0, 1, 0]
+	assert columns['frame'] == [0, 1, 1, 0, 0]
+	assert columns['ball'] == [0, 0, 1, 0, 0]
+	assert columns['value'] == [15, 5, 5, 5, 15]
+	assert columns['pin_mask'] == [31, 3, 3, 3, 31]
+
+	assert BallHistoryExporter(export_dir).export(games) == 0
+	assert BallHistoryExporter(export_dir).export(games[:1]) is None
+
+def test_flushing_every_few_games_writes_the_same_columns(tmp_path, monkeypatch):
+	games = [game(f"B{n % 3}", [[STRIKE], [FIVE, FIVE]]) for n in range(7)]
+	BallHistoryExporter(str(tmp_path / 'whole')).export(games)
+	monkeypatch.setattr(ball_history_export, 'FLUSH_GAMES', 2)
+	BallHistoryExporter(str(tmp_path / 'flushed')).export(games)
+	assert read_columns(str(tmp_path / 'whole')) == read_columns(str(tmp_path / 'flushed'))
+
+def test_enhanced_records_use_frame_numbers_and_ball_value(tmp_path):
+	export_dir = str(tmp_path / 'export')
+	enhanced = {'date': '2026-10-19', 'time': '12:00:00', 'bowlers': [{'name': 'Ann', 'frames': [
+		{'frame_number': 3, 'balls': [{'ball_number': 1, 'pin_config': [1, 1, 0, 0, 0], 'ball_value': 5},
+									  {'ball_number': 2, 'pin_config': [0, 0, 1, 1, 1], 'ball_value': 10}]},
+		{'frame_number': 7, 'balls': [{'ball_number': 1, 'pin_config': [1, 1, 1, 1, 1], 'ball_value': 15}]},
+	]}]}
+	BallHistoryExporter(export_dir).export([enhanced])
+	_, columns = read_columns(export_dir)
+	assert columns['frame'] == [2, 2, 6]
+	assert columns['ball'] == [0, 1, 0]
+	assert columns['value'] == [5, 10, 15]
+
+@pytest.mark.parametrize('value', [-1, 256, None, 'X', 7.5])
+def test_balls_with_values_outside_the_column_are_left_out(tmp_path, value):
+	export_dir = str(tmp_path / 'export')
+	bad = game('Ann', [[FIVE, ([0, 0, 1, 0, 0], value)], [FIVE]])
+	assert BallHistoryExporter(export_dir).export([bad]) == 2
+	_, columns = read_columns(export_dir)
+	assert columns['value'] == [5, 5]
+	assert columns['frame'] == [0, 1]
+
+def test_tail_from_an_interrupted_run_is_dropped(tmp_path):
+	export_dir = str(tmp_path / 'export')
+	games = [game('Ann', [[STRIKE]])]
+	BallHistoryExporter(export_dir).export(games)
+	with open(os.path.join(export_dir, 'value.bin'), 'ab') as f:
+		f.write(b'\x09\x09\x09')  # Flushed by a run that died before its manifest
+	games.append(game('Ann', [[FIVE]]))
+	BallHistoryExporter(export_dir).export(games)
+	_, columns = read_columns(export_dir)
+	assert columns['value'] == [15, 5]
+
+def test_truncated_column_file_triggers_a_full_export(tmp_path):
+	export_dir = str(tmp_path / 'export')
+	games = [game('Ann', [[STRIKE], [FIVE, FIVE]]), game('Bob', [[FIVE]])]
+	BallHistoryExporter(export_dir).export(games)
+	with open(os.path.join(export_dir, 'game_id.bin'), 'r+b') as f:
+		f.truncate(struct.calcsize('<I'))
+
+	games.append(game('Ann', [[STRIKE]]))
+	assert BallHistoryExporter(export_dir).export(games) == 5
+	manifest, columns = read_columns(export_dir)
+	assert manifest['games_exported'] == 3
+	assert columns['game_id'] == [0, 0, 0, 1, 2]
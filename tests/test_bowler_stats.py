@@ -0,0 +1,85 @@
+import json
+
+import bowler_stats
+from bowler_stats import BowlerStatsStore
+
+def frame(*balls, is_strike=False, is_spare=False):
+	return {'balls': [{'pin_config': pins, 'symbol': symbol, 'value': value} for pins, symbol, value in balls],
+			'is_strike': is_strike, 'is_spare': is_spare}
+
+STRIKE = frame(([1, 1, 1, 1, 1], 'X', 15), is_strike=True)
+SPARE = frame(([1, 1, 1, 0, 0], 'A', 10), ([0, 0, 0, 1, 1], '/', 5), is_spare=True)
+OPEN = frame(([0, 0, 1, 1, 0], '8', 8), ([0, 0, 0, 0, 1], '2', 2))
+MISS = frame(([1, 1, 0, 0, 0], '5', 5))
+
+def game(name, score, *frames):
+	return {'bowlers': [{'name': name, 'total_score': score, 'frames': list(frames) + [frame()]}]}
+
+def store_at(tmp_path, **kwargs):
+	return BowlerStatsStore(stats_file=str(tmp_path / 'stats.json'), **kwargs)
+
+def test_games_are_aggregated_per_bowler(tmp_path):
+	store = store_at(tmp_path, patterns={'ace': 'A'})
+	store.record_game(game('Ann', 120, STRIKE, SPARE, OPEN))
+	store.record_game(game('Ann', 95, MISS))
+	store.record_game({'bowlers': [{'name': '', 'total_score': 10}]})
+
+	stats = store.get('Ann')
+	assert (stats.games, stats.pinfall, stats.high_game, store.average('Ann')) == (2, 215, 120, 107)
+	assert (stats.frames, stats.strikes, stats.spares, stats.spare_chances) == (4, 1, 1, 2)
+	assert stats.strike_rate == 0.25 and stats.spare_rate == 0.5
+	assert stats.head_pins == 3 and stats.pattern_counts == {'A': 1}
+	assert stats.leave_counts == {'00011': 1, '11001': 1, '00111': 1}
+	assert stats.leave_frequency('00011') == 1 / 3
+	assert store.average('Nobody', default=100) == 100 and list(store.bowlers) == ['Ann']
+
+def test_then_gets_the_updated_aggregates(tmp_path):
+	store = store_at(tmp_path)
+	results = []
+	store.record_game(game('Ann', 150, STRIKE), then=results.append)
+	assert list(results[0]) == ['Ann'] and results[0]['Ann']['high_game'] == 150
+
+def test_record_game_before_the_load_is_folded_once_it_is_in(tmp_path):
+	store = store_at(tmp_path)
+	store.record_game(game('Ann', 100, STRIKE))
+	store.loaded.clear()  # As while the background load is still reading
+	results = []
+	store.record_game(game('Ann', 140, OPEN), then=results.append)
+	assert results == [] and store.get('Ann').games == 1
+
+	store.load()  # Replays the journal, then folds the waiting game
+	assert results[0]['Ann']['games'] == 2
+	assert store_at(tmp_path).get('Ann').pinfall == 240
+
+def test_journal_is_replayed_over_the_stats_file(tmp_path):
+	store = store_at(tmp_path)
+	store.record_game(game('Ann', 100, STRIKE))
+	store.save()
+	store.record_game(game('Ann', 200, STRIKE))
+	store.record_game(game('Bob', 50, MISS))
+	with open(store.journal_file, 'a') as f:
+		f.write('{"Ann": {"name": "Ann", "ga')  # Torn by a crash mid-append
+
+	reloaded = store_at(tmp_path)
+	assert (reloaded.get('Ann').games, reloaded.get('Ann').high_game) == (2, 200)
+	assert reloaded.get('Bob').pinfall == 50
+	with open(reloaded.journal_file) as f:
+		assert len(f.readlines()) == 3  # Below COMPACT_AFTER the journal is left alone
+
+def test_long_journal_is_compacted_on_load(tmp_path, monkeypatch):
+	monkeypatch.setattr(bowler_stats, 'COMPACT_AFTER', 3)
+	store = store_at(tmp_path)
+	for score in (100, 110, 120):
+		store.record_game(game('Ann', score, STRIKE))
+
+	reloaded = store_at(tmp_path)
+	assert not (tmp_path / 'stats.json.log').exists()
+	with open(tmp_path / 'stats.json') as f:
+		assert json.load(f)['bowlers']['Ann']['pinfall'] == 330
+	assert store_at(tmp_path).get('Ann').games == reloaded.get('Ann').games == 3
+
+def test_rebuild_recomputes_from_history(tmp_path):
+	store = store_at(tmp_path)
+	store.record_game(game('Ann', 300, STRIKE))
+	assert store.rebuild([game('Bob', 90, OPEN), game('Bob', 110, SPARE)]) == 2
+	assert store.get('Ann') is None and store_at(tmp_path).get('Bob').average == 100
@@ -0,0 +1,140 @@
+import asyncio
+import socket
+import time
+
+import pytest
+
+class Peer:
+	"""Local server counting the connections it accepts"""
+	def __init__(self):
+		self.writers = []
+
+	async def start(self):
+		self.server = await asyncio.start_server(self.accept, '127.0.0.1', 0)
+		self.port = self.server.sockets[0].getsockname()[1]
+		return self
+
+	async def accept(self, reader, writer):
+		self.writers.append(writer)
+		await reader.read()
+
+	def close(self):
+		for writer in self.writers:
+			writer.close()
+		self.server.close()
+
+def closed_port():
+	with socket.socket() as sock:
+		sock.bind(('127.0.0.1', 0))
+		return sock.getsockname()[1]
+
+async def settle():
+	for _ in range(5):
+		await asyncio.sleep(0.01)
+
+def test_concurrent_acquires_share_one_connect(lane_client):
+	async def run():
+		peer = await Peer().start()
+		pool = lane_client.ConnectionManager()
+		try:
+			conns = await asyncio.gather(*(pool.acquire('server', '127.0.0.1', peer.port) for _ in range(5)))
+			again = await pool.acquire('server', '127.0.0.1', peer.port)
+			await settle()
+			return conns, again, dict(pool.stats), len(peer.writers)
+		finally:
+			await pool.close_all()
+			peer.close()
+	conns, again, stats, accepted = asyncio.run(run())
+	assert all(conn is conns[0] for conn in conns) and again is conns[0]
+	assert (stats['connects'], stats['shared_connects'], stats['reused'], accepted) == (1, 4, 1, 1)
+
+def test_fresh_acquire_replaces_the_open_connection(lane_client):
+	async def run():
+		peer = await Peer().start()
+		pool = lane_client.ConnectionManager()
+		try:
+			old = await pool.acquire('server', '127.0.0.1', peer.port)
+			new = await pool.acquire('server', '127.0.0.1', peer.port, fresh=True)
+			return old, new, pool.get('server')
+		finally:
+			await pool.close_all()
+			peer.close()
+	old, new, pooled = asyncio.run(run())
+	assert new is not old and pooled is new and old.writer.is_closing()
+
+def test_failed_connects_back_off_per_key(lane_client):
+	async def run():
+		pool = lane_client.ConnectionManager(base_retry=10.0, max_retry=25.0)
+		port = closed_port()
+		results = await asyncio.gather(*(pool.acquire('lane:2', '127.0.0.1', port) for _ in range(3)),
+									   return_exceptions=True)
+		assert all(isinstance(result, OSError) for result in results)
+		delays = [pool.retry_delay('lane:2')]
+		for _ in range(2):
+			with pytest.raises(OSError):
+				await pool.acquire('lane:2', '127.0.0.1', port)
+			delays.append(pool.retry_delay('lane:2'))
+		failures = pool.connection_timeouts['lane:2'][0]
+
+		peer = await Peer().start()
+		try:
+			await pool.acquire('lane:2', '127.0.0.1', peer.port)
+			return delays, failures, pool.retry_delay('lane:2'), pool.retry_delay('server'), dict(pool.stats)
+		finally:
+			await pool.close_all()
+			peer.close()
+	delays, failures, after_success, other_key, stats = asyncio.run(run())
+	assert failures == 3 and stats['failures'] == 3 and stats['shared_connects'] == 2
+	assert 9 < delays[0] <= 10 and 19 < delays[1] <= 20 and 24 < delays[2] <= 25
+	assert after_success == 0.0 and other_key == 0.0
+
+def test_dead_connection_is_dropped_and_replaced(lane_client):
+	async def run():
+		peer = await Peer().start()
+		pool = lane_client.ConnectionManager()
+		try:
+			first = await pool.acquire('server', '127.0.0.1', peer.port)
+			await settle()
+			peer.writers[0].close()  # The other side goes away
+			await settle()
+			assert pool.get('server', check=False) is first and pool.get('server') is None
+			second = await pool.acquire('server', '127.0.0.1', peer.port)
+			return first, second, dict(pool.stats)
+		finally:
+			await pool.close_all()
+			peer.close()
+	first, second, stats = asyncio.run(run())
+	assert second is not first and first.writer.is_closing()
+	assert (stats['connects'], stats['unhealthy'], stats['reused']) == (2, 1, 0)
+
+def test_idle_connections_are_evicted_unless_pinned(lane_client):
+	async def run():
+		peer = await Peer().start()
+		pool = lane_client.ConnectionManager(idle_timeout=60.0)
+		try:
+			server = await pool.acquire('server', '127.0.0.1', peer.port)
+			lane = await pool.acquire('lane:2', '127.0.0.1', peer.port)
+			busy = await pool.acquire('lane:3', '127.0.0.1', peer.port)
+			pool.pin('server')
+			server.last_used = lane.last_used = time.monotonic() - 61
+			pool.touch('lane:3', sent=10)
+			evicted = pool.evict_idle()
+			return evicted, sorted(pool.connections), lane.writer.is_closing(), pool.stats['evicted']
+		finally:
+			await pool.close_all()
+			peer.close()
+	assert asyncio.run(run()) == (1, ['lane:3', 'server'], True, 1)
+
+def test_sweep_timer_closes_idle_connections(lane_client):
+	async def run():
+		peer = await Peer().start()
+		pool = lane_client.ConnectionManager(idle_timeout=0.05)
+		try:
+			conn = await pool.acquire('lane:2', '127.0.0.1', peer.port)
+			await asyncio.sleep(0.2)
+			return conn, dict(pool.connections), pool._sweep_timer
+		finally:
+			await pool.close_all()
+			peer.close()
+	conn, connections, timer = asyncio.run(run())
+	assert connections == {} and conn.writer.is_closing() and timer is None
@@ -0,0 +1,123 @@
+import asyncio
+import json
+
+from game_outbox import GameOutbox
+
+def outbox_at(tmp_path, **kwargs):
+	return GameOutbox(outbox_file=str(tmp_path / 'outbox.jsonl'), acked_file=str(tmp_path / 'outbox.acked'),
+					  dead_file=str(tmp_path / 'outbox.dead'), **kwargs)
+
+def lines(path):
+	with open(path) as f:
+		return [json.loads(line) for line in f if line.strip()]
+
+def test_appended_records_survive_a_restart_until_acked(tmp_path):
+	outbox = outbox_at(tmp_path)
+	first = outbox.append('game', {'n': 1}, lane_id='1')
+	second = outbox.append('correction', {'n': 2})
+	assert [entry['id'] for entry in outbox.peek_batch()] == [first, second]
+	assert [entry['id'] for entry in outbox.peek_batch(1)] == [first]
+
+	assert outbox.ack([first, 'unknown', first]) == 1
+	reloaded = outbox_at(tmp_path)
+	assert list(reloaded.pending) == [second]
+	assert reloaded.pending[second]['kind'] == 'correction' and reloaded.pending[second]['payload'] == {'n': 2}
+
+def test_rejected_records_move_to_the_dead_letter_file(tmp_path):
+	outbox = outbox_at(tmp_path)
+	bad = outbox.append('game', {'n': 1})
+	good = outbox.append('game', {'n': 2})
+	assert outbox.reject([bad, 'unknown'], 'bad lane id') == 1
+	assert outbox.reject(['unknown'], 'bad lane id') == 0
+	dead = lines(tmp_path / 'outbox.dead')
+	assert [(entry['id'], entry['rejected']) for entry in dead] == [(bad, 'bad lane id')]
+	assert list(outbox_at(tmp_path).pending) == [good]
+
+def test_records_out_of_attempts_are_reported(tmp_path):
+	outbox = outbox_at(tmp_path, max_attempts=3)
+	stuck = outbox.append('game', {'n': 1})
+	later = outbox.append('game', {'n': 2})
+	assert outbox.not_accepted([stuck, later]) == []
+	assert outbox.not_accepted([stuck]) == []
+	assert outbox.not_accepted([stuck, 'unknown']) == [stuck]
+	outbox.ack([later])
+	assert later not in outbox.attempts and outbox.attempts[stuck] == 3
+
+def test_acks_are_logged_then_compacted(tmp_path):
+	outbox = outbox_at(tmp_path, compact_threshold=3)
+	ids = [outbox.append('game', {'n': n}) for n in range(5)]
+	outbox.ack(ids[:2])
+	assert lines(tmp_path / 'outbox.acked') == ids[:2]
+	assert len(lines(tmp_path / 'outbox.jsonl')) == 5
+
+	outbox.ack(ids[2:3])  # Third ack reaches the threshold
+	assert not (tmp_path / 'outbox.acked').exists()
+	assert [entry['id'] for entry in lines(tmp_path / 'outbox.jsonl')] == ids[3:]
+
+	outbox.ack(ids[3:])  # Nothing left pending
+	assert lines(tmp_path / 'outbox.jsonl') == [] and not outbox.has_pending()
+
+def test_torn_final_line_is_dropped_and_rewritten(tmp_path):
+	outbox = outbox_at(tmp_path)
+	kept = outbox.append('game', {'n': 1})
+	with open(tmp_path / 'outbox.jsonl', 'a') as f:
+		f.write('{"id":"torn","kind":"ga')  # Power cut mid-append
+
+	reloaded = outbox_at(tmp_path)
+	assert list(reloaded.pending) == [kept]
+	added = reloaded.append('game', {'n': 2})
+	assert [entry['id'] for entry in lines(tmp_path / 'outbox.jsonl')] == [kept, added]
+
+def client_with_outbox(lane_client, tmp_path):
+	client = lane_client.AsyncLaneClient(lane_id='1', host='127.0.0.1', port=1)
+	client.outbox = outbox_at(tmp_path)
+	return client
+
+def test_ack_resolves_the_waiting_batch(lane_client, tmp_path):
+	async def run():
+		client = client_with_outbox(lane_client, tmp_path)
+		future = asyncio.get_running_loop().create_future()
+		client._outbox_acks['b1'] = future
+		await client._on_game_records_ack({'type': 'game_records_ack', 'data': {'batch_id': 'b1', 'ids': ['x'], 'rejected': ['y']}})
+		return future.result()
+	assert asyncio.run(run()) == (['x'], ['y'])
+
+def test_late_ack_settles_the_outbox(lane_client, tmp_path):
+	async def run():
+		client = client_with_outbox(lane_client, tmp_path)
+		delivered = client.outbox.append('game', {'n': 1})
+		refused = client.outbox.append('game', {'n': 2})
+		waiting = client.outbox.append('game', {'n': 3})
+		await client.handle_game_records_ack({'batch_id': 'gone', 'ids': [delivered], 'rejected': [refused]})
+		return client, waiting
+	client, waiting = asyncio.run(run())
+	assert list(client.outbox.pending) == [waiting]
+	assert 'late ack for batch gone' in lines(tmp_path / 'outbox.dead')[0]['rejected']
+
+def test_uploader_sends_batches_and_settles_acks(lane_client, tmp_path):
+	sent = []
+
+	async def run():
+		client = client_with_outbox(lane_client, tmp_path)
+		client.outbox_poll_interval = 0.01
+		ids = [client.outbox.append('game', {'n': n}) for n in range(3)]
+
+		async def send_message(message):
+			sent.append(message)
+			records = [record['id'] for record in message['records']]
+			answer = {'batch_id': message['batch_id'], 'ids': records[:-1], 'rejected': records[-1:]}
+			asyncio.get_running_loop().call_soon(asyncio.ensure_future, client.handle_game_records_ack(answer))
+		client.send_message = send_message
+		client.registered.set()
+
+		task = asyncio.create_task(client.outbox_uploader())
+		while client.outbox.has_pending():
+			await asyncio.sleep(0.01)
+		client._shutdown.set()
+		await asyncio.wait_for(task, 1)
+		return ids
+
+	ids = asyncio.run(run())
+	assert len(sent) == 1 and sent[0]['type'] == 'game_records_batch'
+	assert [record['id'] for record in sent[0]['records']] == ids
+	assert [entry['id'] for entry in lines(tmp_path / 'outbox.dead')] == ids[-1:]
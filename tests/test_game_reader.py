@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+from game_reader import field_tree, iter_games, project
+
+GAMES = [
+	{'game_number': 1, 'game_type': 'quick_game', 'date': '2026-01-05',
+	 'bowlers': [{'name': 'Ann', 'total_score': 120}, {'name': 'Bob', 'total_score': 210}]},
+	{'game_number': 2, 'game_type': 'league_game', 'date': '2026-02-10',
+	 'bowlers': [{'name': 'Ann', 'total_score': 180}]},
+	{'game_number': 3, 'game_type': 'quick_game', 'date': '2026-03-15',
+	 'bowlers': [{'name': 'Bob', 'total_score': 90, 'note': 'x' * 300}]},
+]
+
+def write_db(tmp_path, text):
+	db_file = tmp_path / 'bowling.db'
+	db_file.write_text(text)
+	return str(db_file)
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 64 * 1024])
+def test_yields_every_record_whatever_the_chunk_size(tmp_path, chunk_size):
+	db_file = write_db(tmp_path, json.dumps(GAMES, indent=2))
+	assert list(iter_games(db_file, chunk_size=chunk_size)) == GAMES
+
+def test_missing_and_empty_databases_yield_nothing(tmp_path):
+	assert list(iter_games(str(tmp_path / 'missing.db'))) == []
+	assert list(iter_games(write_db(tmp_path, ' [ ] \n'))) == []
+	assert list(iter_games(write_db(tmp_path, ''))) == []
+
+def test_filters(tmp_path):
+	db_file = write_db(tmp_path, json.dumps(GAMES))
+	numbers = lambda **filters: [g['game_number'] for g in iter_games(db_file, chunk_size=5, **filters)]
+	assert numbers(start_date='2026-02-10') == [2, 3]
+	assert numbers(end_date='2026-02-10') == [1, 2]
+	assert numbers(game_type='quick_game') == [1, 3]
+	assert numbers(bowler='Ann') == [1, 2]
+	assert numbers(min_score=200) == [1]
+	assert numbers(bowler='Ann', min_score=200) == []
+
+def test_non_dict_elements_are_skipped(tmp_path):
+	db_file = write_db(tmp_path, json.dumps([1, GAMES[0], 'x', None]))
+	assert list(iter_games(db_file)) == [GAMES[0]]
+
+def test_projection():
+	tree = field_tree(['date', 'bowlers.name'])
+	assert tree == {'date': {}, 'bowlers': {'name': {}}}
+	assert project(GAMES[0], tree) == {'date': '2026-01-05', 'bowlers': [{'name': 'Ann'}, {'name': 'Bob'}]}
+
+def test_fields_applied_while_reading(tmp_path):
+	db_file = write_db(tmp_path, json.dumps(GAMES))
+	assert list(iter_games(db_file, bowler='Bob', fields=['game_number'])) == [{'game_number': 1}, {'game_number': 3}]
+
+@pytest.mark.parametrize('text', ['{"game_number": 1}', '[{"game_number": 1}', '[{"game_number": 1}, {"game_'])
+def test_malformed_database_raises(tmp_path, text):
+	with pytest.raises(ValueError):
+		list(iter_games(write_db(tmp_path, text), chunk_size=4))
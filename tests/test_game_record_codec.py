@@ -0,0 +1,123 @@
+import copy
+import io
+import json
+
+import pytest
+
+from game_record_codec import decode_game, encode_game, read_records, to_json, write_records
+
+def ball(pin_config, symbol, value):
+	return {'pin_config': pin_config, 'symbol': symbol, 'value': value}
+
+def bonus(frame, ordinal, thrown):
+	return {'frame': frame, 'ball': ordinal, **copy.deepcopy(thrown)}
+
+STRIKE = ball([1, 1, 1, 1, 1], 'X', 15)
+FIVE = ball([1, 1, 0, 0, 0], '5', 5)
+SPARE = ball([0, 0, 1, 1, 1], '/', 10)
+ODD_VALUE = ball([1, 0, 0, 0, 0], 'L', 7)  # Value differs from the default pin values
+
+def sample_record():
+	frames = [
+		{'balls': [STRIKE], 'bonus_balls': [bonus(2, 1, FIVE), bonus(2, 2, SPARE)], 'base_score': 15, 'bonus_score': 15,
+		 'total': 30, 'is_strike': True, 'is_spare': False},
+		{'balls': [FIVE, SPARE], 'bonus_balls': [bonus(3, 1, ODD_VALUE)], 'base_score': 15, 'bonus_score': 7,
+		 'total': 52, 'is_strike': False, 'is_spare': True},
+		{'balls': [ODD_VALUE], 'total': 59, 'is_strike': False, 'is_spare': False},
+	] + [{'balls': [], 'total': 0, 'is_strike': False, 'is_spare': False} for _ in range(7)]
+	return copy.deepcopy({
+		'game_number': 4,
+		'game_type': 'league_game',
+		'date': '2026-10-19',
+		'time': '19:05:33',
+		'bowlers': [
+			{'name': 'Ann', 'frames': frames, 'total_score': 59, 'fouls': 1, 'prize': True},
+			{'name': 'Zoë', 'frames': [], 'total_score': 0, 'fouls': 0, 'prize': False},
+		]
+	})
+
+def test_round_trip():
+	record = sample_record()
+	data = encode_game(record)
+	assert decode_game(data) == record
+	assert len(data) < len(json.dumps(record)) / 4
+
+def test_fouls_and_prize_are_decoded_only_when_the_record_had_them():
+	record = sample_record()
+	del record['bowlers'][0]['fouls']
+	del record['bowlers'][1]['prize']
+	assert decode_game(encode_game(record)) == record
+
+def test_version_1_records_always_carry_fouls_and_prize():
+	record = sample_record()
+	for bowler in record['bowlers']:
+		del bowler['fouls'], bowler['prize']
+	data = bytearray(encode_game(record))
+	data[3] = 1
+	decoded = decode_game(bytes(data))
+	assert [(b['fouls'], b['prize']) for b in decoded['bowlers']] == [(0, False), (0, False)]
+
+def test_unknown_game_type_and_extra_fields_round_trip():
+	record = sample_record()
+	record['game_type'] = 'cosmic'
+	record['league'] = {'id': 7}
+	assert decode_game(encode_game(record)) == record
+
+def test_decoded_pin_configs_are_independent_lists():
+	decoded = decode_game(encode_game(sample_record()))
+	frames = decoded['bowlers'][0]['frames']
+	frames[1]['balls'][0]['pin_config'][0] = 0  # The thrown ball frame 1 copies as a bonus
+	assert frames[0]['bonus_balls'][0]['pin_config'] == [1, 1, 0, 0, 0]
+
+@pytest.mark.parametrize('change', [
+	lambda r: r['bowlers'][0].update(handicap=10),
+	lambda r: r['bowlers'][0]['frames'][2].update(note='x'),
+	lambda r: r['bowlers'][0]['frames'][2]['balls'][0].update(speed=17),
+	lambda r: r['bowlers'][0]['frames'][2]['balls'][0].update(pin_config=[1, 1]),
+	lambda r: r['bowlers'][0]['frames'][0]['bonus_balls'][0].update(value=3),
+	lambda r: r['bowlers'][0].pop('total_score'),
+	lambda r: r['bowlers'][0].update(fouls=300),
+	lambda r: r['bowlers'][0].update(prize='yes'),
+	lambda r: r['bowlers'][0]['frames'][2]['balls'][0].update(value=None),
+	lambda r: r['bowlers'][0]['frames'][2]['balls'][0].update(pin_config=None),
+])
+def test_unsupported_records_raise(change):
+	record = sample_record()
+	change(record)
+	with pytest.raises(ValueError):
+		encode_game(record)
+
+def test_enhanced_records_are_left_to_json():
+	enhanced = sample_record()
+	for frame_number, frame in enumerate(enhanced['bowlers'][0]['frames'][:3], 1):
+		frame.pop('bonus_balls', None), frame.pop('base_score', None), frame.pop('bonus_score', None)
+		frame['frame_number'] = frame_number
+		for ball_number, thrown in enumerate(frame['balls'], 1):
+			thrown['ball_number'] = ball_number
+	enhanced['bowlers'][0]['frames'] = enhanced['bowlers'][0]['frames'][:3]  # Frames without balls are left out
+	with pytest.raises(ValueError):
+		encode_game(enhanced)
+	assert write_records(io.BytesIO(), [enhanced]) == (0, 1)
+
+def test_rejects_other_data():
+	data = encode_game(sample_record())
+	with pytest.raises(ValueError):
+		decode_game(b'XYZ' + data[3:])
+	with pytest.raises(ValueError):
+		decode_game(data[:3] + b'\x09' + data[4:])
+
+def test_to_json():
+	record = sample_record()
+	assert json.loads(to_json(encode_game(record))) == record
+
+def test_archive_skips_unsupported_records_and_stops_at_truncation():
+	good = sample_record()
+	bad = sample_record()
+	bad['bowlers'][0]['handicap'] = 10
+	f = io.BytesIO()
+	assert write_records(f, [good, bad, good]) == (2, 1)
+
+	f.seek(0)
+	assert list(read_records(f)) == [good, good]
+	truncated = io.BytesIO(f.getvalue()[:-5])
+	assert list(read_records(truncated)) == [good]
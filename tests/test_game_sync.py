@@ -0,0 +1,122 @@
+import asyncio
+from types import SimpleNamespace
+
+from game_sync import GameStateSync
+
+def ball(value, symbol, pin_config):
+	return SimpleNamespace(value=value, symbol=symbol, pin_config=pin_config)
+
+def frame():
+	return SimpleNamespace(balls=[], total=0, is_strike=False, is_spare=False)
+
+def bowler(name):
+	return SimpleNamespace(name=name, frames=[frame() for _ in range(10)], total_score=0, current_frame=0)
+
+def new_game(*names):
+	return SimpleNamespace(bowlers=[bowler(name) for name in names], current_bowler_index=0, current_game_number=1,
+						   game_type='quick_game', settings=SimpleNamespace(total_games=3))
+
+def attached():
+	sync = GameStateSync()
+	sent = []
+	sync.attach(lambda message: sent.append(message) or True, '1')
+	return sync, sent
+
+def kinds(message):
+	return [change['kind'] for change in message['changes']]
+
+def test_first_publish_starts_a_session_and_an_unchanged_game_sends_nothing():
+	sync, sent = attached()
+	game = new_game('Ann', 'Bob')
+	sync.publish(game)
+	sync.publish(game)
+	assert len(sent) == 1 and kinds(sent[0]) == ['game_started', 'bowler']
+	assert sent[0]['seq'] == 1 and sent[0]['changes'][0]['bowlers'] == ['Ann', 'Bob']
+
+def test_ball_totals_and_bowler_changes():
+	sync, sent = attached()
+	game = new_game('Ann', 'Bob')
+	sync.publish(game)
+	ann = game.bowlers[0]
+	pins = [1, 1, 0, 0, 0]
+	ann.frames[0].balls.append(ball(5, '5', pins))
+	ann.frames[0].total = ann.total_score = 5
+	sync.publish(game)
+	assert kinds(sent[-1]) == ['ball', 'totals']
+	change = sent[-1]['changes'][0]
+	assert (change['bowler'], change['frame'], change['ball'], change['value']) == (0, 0, 0, 5)
+	pins[0] = 0  # The game reuses its lists; what was sent must not change with them
+	assert change['pin_config'] == [1, 1, 0, 0, 0]
+	assert sent[-1]['changes'][1] == {'kind': 'totals', 'bowler': 0, 'frames': {0: 5}, 'total_score': 5}
+
+	game.current_bowler_index = 1
+	sync.publish(game)
+	assert sent[-1]['changes'] == [{'kind': 'bowler', 'bowler': 1}]
+	assert [message['seq'] for message in sent] == [1, 2, 3]
+
+def test_taken_back_ball_and_manual_correction_resend_frames():
+	sync, sent = attached()
+	game = new_game('Ann')
+	ann = game.bowlers[0]
+	ann.frames[0].balls += [ball(5, '5', [1, 1, 0, 0, 0]), ball(10, '/', [0, 0, 1, 1, 1])]
+	sync.publish(game)
+	ann.frames[0].balls.pop()
+	sync.publish(game)
+	assert kinds(sent[-1]) == ['correction']
+	assert len(sent[-1]['changes'][0]['frames'][0]['balls']) == 1
+
+	ann.frames[0].total = ann.total_score = 9
+	sync.correction_applied(game)
+	assert kinds(sent[-1]) == ['correction', 'bowler']
+	assert sent[-1]['changes'][0]['total_score'] == 9
+
+def test_lineup_change_and_end_of_game():
+	sync, sent = attached()
+	game = new_game('Ann')
+	sync.publish(game)
+	game.bowlers.append(bowler('Cy'))
+	sync.publish(game)
+	assert kinds(sent[-1]) == ['lineup']
+	sync.end_game(game)
+	sync.end_game(game)
+	assert kinds(sent[-1]) == ['game_ended'] and len(sent) == 3
+	sync.publish(game)
+	assert len(sent) == 3
+
+def test_snapshot_is_the_copy_taken_with_the_last_delta():
+	sync, _ = attached()
+	assert sync.snapshot() == {'game_id': None, 'seq': 0}
+	game = new_game('Ann')
+	game.bowlers[0].frames[0].balls.append(ball(15, 'X', [1, 1, 1, 1, 1]))
+	sync.publish(game)
+
+	# Later changes on the Tk side are not seen until the game publishes them
+	game.bowlers[0].frames[1].balls.append(ball(5, '5', [1, 1, 0, 0, 0]))
+	game.bowlers[0].frames[0].balls[0].pin_config[0] = 0
+	snapshot = sync.snapshot()
+	assert (snapshot['game_id'], snapshot['seq']) == (sync.game_id, 1)
+	frames = snapshot['bowlers'][0]['frames']
+	assert frames[0]['balls'] == [{'value': 15, 'symbol': 'X', 'pin_config': [1, 1, 1, 1, 1]}]
+	assert frames[1]['balls'] == []
+	assert (snapshot['type'], snapshot['total_games'], snapshot['current_bowler']) == ('quick_game', 3, 0)
+
+	sync.publish(game)
+	assert sync.snapshot()['seq'] == 2 and sync.snapshot()['bowlers'][0]['frames'][1]['balls']
+
+def test_resync_sends_the_stored_snapshot(lane_client):
+	async def run():
+		client = lane_client.AsyncLaneClient(lane_id='1', host='127.0.0.1', port=1)
+		client.game_sync = GameStateSync()
+		posted = []
+		client.post_message = posted.append
+		client._resync_game_state()  # No game yet, nothing to resync
+		game = new_game('Ann')
+		client.game_sync.publish(game)
+		game.bowlers[0].frames[0].balls.append(ball(5, '5', [1, 1, 0, 0, 0]))  # Not yet published
+		client._on_inbound_overflow('game')
+		return client, posted
+	client, posted = asyncio.run(run())
+	assert len(posted) == 1 and posted[0]['type'] == 'game_data_response'
+	data = posted[0]['data']
+	assert (data['lane_id'], data['seq'], data['game_id']) == ('1', 1, client.game_sync.game_id)
+	assert data['bowlers'][0]['frames'][0]['balls'] == []
@@ -0,0 +1,113 @@
+import asyncio
+
+from inbound_scheduler import CONTROL, GAME, INFO, InboundScheduler, message_kind
+
+def drain(scheduler):
+	async def run():
+		return [await scheduler.get() for _ in range(scheduler.qsize())]
+	return asyncio.run(run())
+
+def command(kind, **data):
+	return {'type': 'lane_command', 'data': {'type': kind, **data}}
+
+def test_message_kind_unwraps_lane_commands():
+	assert message_kind({'type': 'pong'}) == 'pong'
+	assert message_kind(command('start_game')) == 'start_game'
+	assert message_kind({'type': 'lane_command', 'data': 'x'}) == 'lane_command'
+
+def test_classes():
+	scheduler = InboundScheduler()
+	assert scheduler.classify('pong') == CONTROL
+	assert scheduler.classify('scroll_message') == INFO
+	assert scheduler.classify('set_game_display') == GAME
+	assert scheduler.classify('anything_new') == GAME
+
+def test_control_first_and_stateful_messages_keep_arrival_order():
+	scheduler = InboundScheduler()
+	messages = [command('start_game'), {'type': 'scroll_message', 'text': 'hi'}, command('pin_set'),
+				command('set_game_display', n=1), {'type': 'pong'}, command('pair_ready')]
+	for message in messages:
+		assert scheduler.put_nowait(message)
+	assert drain(scheduler) == [messages[4], messages[0], messages[2], messages[3], messages[5], messages[1]]
+
+def test_display_updates_merge_only_when_back_to_back():
+	scheduler = InboundScheduler()
+	for message in [command('set_game_display', n=1), command('set_game_display', n=2), command('pin_set'),
+					command('set_game_display', n=3)]:
+		scheduler.put_nowait(message)
+	assert [message_kind(m) + str(m['data'].get('n', '')) for m in drain(scheduler)] == [
+		'set_game_display2', 'pin_set', 'set_game_display3']
+	assert scheduler.get_stats()['game']['merged'] == 1
+
+def test_identical_scroll_messages_dedup_only_when_back_to_back():
+	scheduler = InboundScheduler()
+	hello, other = {'type': 'scroll_message', 'text': 'hello'}, {'type': 'scroll_message', 'text': 'bye'}
+	for message in [hello, dict(hello), other, dict(hello)]:
+		scheduler.put_nowait(message)
+	assert drain(scheduler) == [hello, other, hello]
+	assert scheduler.get_stats()['info']['merged'] == 1
+
+def test_info_overflow_drops_oldest():
+	scheduler = InboundScheduler(limits={INFO: (2, 'drop_oldest')})
+	for n in range(4):
+		scheduler.put_nowait({'type': 'test_message', 'n': n})
+	assert [m['n'] for m in drain(scheduler)] == [2, 3]
+	assert scheduler.get_stats()['info']['dropped'] == 2
+
+def test_drop_newest_policy():
+	scheduler = InboundScheduler(limits={INFO: (1, 'drop_newest')})
+	for n in range(3):
+		scheduler.put_nowait({'type': 'test_message', 'n': n})
+	assert [m['n'] for m in drain(scheduler)] == [0]
+
+def test_full_game_class_drops_until_half_drained_then_asks_for_a_resync():
+	overflows = []
+	scheduler = InboundScheduler(limits={GAME: (4, 'resync')}, on_overflow=overflows.append)
+	for n in range(4):
+		assert scheduler.put_nowait(command('pin_set', n=n))
+	assert not scheduler.put_nowait(command('pin_set', n=4))
+	assert scheduler.put_nowait({'type': 'pong'})  # Other classes are unaffected
+
+	async def take(count):
+		return [await scheduler.get() for _ in range(count)]
+	asyncio.run(take(2))  # Pong, then one game message - room again, but not yet drained to half
+	assert not scheduler.put_nowait(command('pin_set', n=5))
+	assert overflows == []
+	asyncio.run(take(1))
+	assert overflows == ['game']
+	assert scheduler.put_nowait(command('pin_set', n=6))
+	scheduler.put_nowait(command('pin_set', n=7))
+	assert not scheduler.put_nowait(command('pin_set', n=8))
+	stats = scheduler.get_stats()['game']
+	assert (stats['dropped'], stats['overflows']) == (3, 2)
+	assert [m['data']['n'] for m in drain(scheduler)] == [2, 3, 6, 7]
+	assert overflows == ['game', 'game']
+
+def test_put_never_waits_on_a_full_class():
+	async def run():
+		scheduler = InboundScheduler(limits={GAME: (1, 'resync')})
+		await scheduler.put(command('start_game'))
+		await asyncio.wait_for(scheduler.put(command('pin_set')), 0.1)
+		return scheduler.qsize()
+	assert asyncio.run(run()) == 1
+
+def test_resync_requests_are_never_dropped_and_keep_one_copy():
+	scheduler = InboundScheduler(limits={CONTROL: (2, 'drop_oldest')})
+	assert scheduler.classify('game_data_request') == CONTROL
+	scheduler.put_nowait({'type': 'game_data_request', 'n': 1})
+	scheduler.put_nowait(command('game_sync_request'))
+	for n in range(3):
+		scheduler.put_nowait({'type': 'pong', 'n': n})
+	scheduler.put_nowait({'type': 'game_data_request', 'n': 2})
+	kinds = [(message_kind(m), m.get('n')) for m in drain(scheduler)]
+	assert kinds == [('game_data_request', 2), ('game_sync_request', None), ('pong', 2)]
+
+def test_get_waits_for_a_message():
+	async def run():
+		scheduler = InboundScheduler()
+		getter = asyncio.ensure_future(scheduler.get())
+		await asyncio.sleep(0)
+		assert not getter.done()
+		scheduler.put_nowait({'type': 'pong'})
+		return await asyncio.wait_for(getter, 1)
+	assert asyncio.run(run()) == {'type': 'pong'}
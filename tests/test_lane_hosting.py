@@ -0,0 +1,84 @@
+import asyncio
+import json
+
+from lane_dispatcher import LaneDispatcher, get_lane_dispatcher
+
+class MultiplexServer:
+	"""Accepts hosted lanes on the host's connection, as a multiplexing server does"""
+	def __init__(self):
+		self.received = []
+		self.writers = []
+
+	async def handle(self, reader, writer):
+		self.writers.append(writer)
+		while True:
+			line = await reader.readline()
+			if not line:
+				break
+			message = json.loads(line)
+			self.received.append(message)
+			if message.get('type') == 'registration' and message.get('via_lane'):
+				self.send({'type': 'registration_response', 'status': 'success', 'to_lane': message['lane_id']})
+			elif message.get('type') == 'registration':
+				self.send({'status': 'success', 'multiplex': True})
+
+	def send(self, message):
+		self.writers[-1].write(json.dumps(message).encode('utf-8') + b'\n')
+
+def recorder(lane_dispatcher, events, *names):
+	for name in names:
+		lane_dispatcher.register_listener(name, lambda data, name=name: events.append((name, data)))
+
+async def wait_for(condition, timeout=3.0):
+	deadline = asyncio.get_running_loop().time() + timeout
+	while not condition():
+		assert asyncio.get_running_loop().time() < deadline, "timed out"
+		await asyncio.sleep(0.02)
+
+def test_two_lanes_share_one_connection_and_keep_their_events_apart(lane_client):
+	server = MultiplexServer()
+	host_events, hosted_events = [], []
+
+	async def run():
+		listener = await asyncio.start_server(server.handle, '127.0.0.1', 0)
+		port = listener.sockets[0].getsockname()[1]
+		host = lane_client.AsyncLaneClient(lane_id='1', host='127.0.0.1', port=port)
+		host.dispatcher = LaneDispatcher('1')  # Keep the process-wide dispatcher out of the test
+		hosted = host.host_lane('2')
+		assert hosted.dispatcher is get_lane_dispatcher('2') and host.host_lane('2') is hosted
+		recorder(host.dispatcher, host_events, 'quick_game', 'team_move')
+		recorder(hosted.dispatcher, hosted_events, 'quick_game', 'team_move')
+
+		task = asyncio.create_task(host.run_client())
+		try:
+			await wait_for(hosted.registered.is_set)
+			assert host.multiplexed and len(server.writers) == 1
+			registrations = [m for m in server.received if m.get('type') == 'registration']
+			assert [(m['lane_id'], m.get('via_lane')) for m in registrations] == [('1', None), ('2', '1')]
+
+			# The server addresses lanes with to_lane; no to_lane means the host
+			server.send({'type': 'quick_game', 'to_lane': '2', 'data': {'bowlers': ['Ann']}})
+			server.send({'type': 'quick_game', 'data': {'bowlers': ['Bob']}})
+			await wait_for(lambda: hosted_events and host_events)
+			assert hosted_events == [('quick_game', {'bowlers': ['Ann']})]
+			assert host_events == [('quick_game', {'bowlers': ['Bob']})]
+
+			# Lane to lane traffic stays in the process
+			host.post_to_lane('2', 'team_move', {'type': 'team_move', 'n': 5})
+			await wait_for(lambda: len(hosted_events) == 2)
+			assert hosted_events[1][0] == 'team_move' and host.p2p_stats['local'] == 1
+			assert host_events == [('quick_game', {'bowlers': ['Bob']})]
+
+			# The hosted lane's own messages go out on the shared connection, marked as its own
+			hosted.post_message({'type': 'status_update', 'lane_id': '2'})
+			await wait_for(lambda: any(m.get('type') == 'status_update' for m in server.received))
+			status = next(m for m in server.received if m.get('type') == 'status_update')
+			assert status['from_lane'] == '2'
+			assert not any(m.get('type') == 'lane_command' for m in server.received)
+		finally:
+			host.stop()
+			await asyncio.wait_for(task, 5)
+			listener.close()
+		assert not hosted.running
+
+	asyncio.run(run())
@@ -0,0 +1,33 @@
+import asyncio
+
+import pytest
+
+def inbound(client):
+	return [entry[1] for queue in client.message_queue.queues.values() for entry in queue]
+
+@pytest.mark.parametrize('message', [
+	{'type': 'game_records_ack', 'batch_id': 'b', 'ids': ['x']},
+	{'type': 'registration_response', 'status': 'success'},
+	{'type': 'lane_command', 'data': {'type': 'quick_game', 'bowlers': ['Mallory']}},
+	{'type': 'lane_command', 'data': 'team_move'},
+	{'type': 'team_move'},
+])
+def test_server_messages_from_the_p2p_link_are_dropped(lane_client, message):
+	async def run():
+		client = lane_client.AsyncLaneClient(lane_id='1', host='127.0.0.1', port=1)
+		await client._on_p2p_message(message)
+		return client
+	client = asyncio.run(run())
+	assert inbound(client) == []
+	assert client.metrics.counter('p2p_rejected').value >= 1
+
+def test_paired_lane_game_traffic_is_accepted_and_acked(lane_client):
+	sent = []
+	async def run():
+		client = lane_client.AsyncLaneClient(lane_id='1', host='127.0.0.1', port=1)
+		client.p2p_connection = type('Link', (), {'send_nowait': lambda self, m: sent.append(m) or True})()
+		await client._on_p2p_message({'type': 'lane_command', 'data': {'type': 'team_move', 'relay_id': 'r1'}})
+		return client
+	client = asyncio.run(run())
+	assert [m['data']['type'] for m in inbound(client)] == ['team_move']
+	assert sent == [{'type': 'p2p_ack', 'relay_id': 'r1'}]
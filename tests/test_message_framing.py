@@ -0,0 +1,87 @@
+import asyncio
+import base64
+import json
+import zlib
+
+import pytest
+
+from message_framing import COMPRESSED_PREFIX, FrameEncoder, FrameReader
+
+HEARTBEAT = {'type': 'heartbeat', 'lane_id': '3', 'timestamp': '2026-10-19 12:34:56'}
+LARGE = {'type': 'game_data', 'lane_id': '3', 'frames': ['X'] * 2000}
+
+def read_all(data: bytes, **kwargs):
+	"""Every message FrameReader decodes from data, plus its stats"""
+	async def run():
+		stream = asyncio.StreamReader()
+		stream.feed_data(data)
+		stream.feed_eof()
+		reader = FrameReader(stream, **kwargs)
+		messages = []
+		while (message := await reader.read_message()) is not None:
+			messages.append(message)
+		return messages, reader.stats
+	return asyncio.run(run())
+
+@pytest.mark.parametrize('read_size', [1, 3, 64 * 1024])
+def test_json_round_trip_across_read_boundaries(read_size):
+	encoder = FrameEncoder()
+	messages = [HEARTBEAT, {'type': 'pong', 'ping_id': 'a'}, LARGE]
+	decoded, stats = read_all(b''.join(encoder.encode(m) for m in messages), read_size=read_size)
+	assert decoded == messages
+	assert stats['messages'] == 3
+
+def test_blank_lines_and_bad_json_are_skipped():
+	decoded, stats = read_all(b'\n  \r\n{"type": "a"}\n{not json}\n{"type": "b"}\r\n')
+	assert decoded == [{'type': 'a'}, {'type': 'b'}]
+	assert stats['decode_errors'] == 1
+
+def test_compresses_large_frames_only_once_negotiated():
+	encoder = FrameEncoder()
+	assert encoder.encode(LARGE)[:1] == b'{'
+	assert encoder.negotiate(['gzip']) is False
+	assert encoder.negotiate('zlib') is True
+
+	small, large = encoder.encode(HEARTBEAT), encoder.encode(LARGE)
+	assert small == json.dumps(HEARTBEAT).encode('utf-8') + b'\n'
+	assert large.startswith(COMPRESSED_PREFIX) and large.endswith(b'\n') and b'\n' not in large[:-1]
+	assert encoder.stats['compressed'] == 1 and encoder.stats['bytes_saved'] > 0
+
+	decoded, stats = read_all(small + large)
+	assert decoded == [HEARTBEAT, LARGE]
+	assert stats['compressed'] == 1
+
+def test_oversized_frames_are_dropped_without_losing_sync():
+	big = json.dumps(LARGE).encode('utf-8') + b'\n'
+	data = big + b'{"type": "a"}\n' + big + b'{"type": "b"}\n'
+	decoded, stats = read_all(data, max_message_size=100, read_size=16)
+	assert decoded == [{'type': 'a'}, {'type': 'b'}]
+	assert stats['oversized'] == 2
+
+def test_compressed_frame_inflating_past_the_limit_is_dropped():
+	bomb = COMPRESSED_PREFIX + base64.b64encode(zlib.compress(b'{"x": "' + b'a' * 10000 + b'"}')) + b'\n'
+	decoded, stats = read_all(bomb + b'{"type": "a"}\n', max_message_size=1000)
+	assert decoded == [{'type': 'a'}]
+	assert stats['oversized'] == 1
+
+def test_corrupt_compressed_frame_is_skipped():
+	decoded, stats = read_all(COMPRESSED_PREFIX + b'not base64!\n{"type": "a"}\n')
+	assert decoded == [{'type': 'a'}]
+	assert stats['decode_errors'] == 1
+
+@pytest.mark.parametrize('read_size', [1, 64 * 1024])
+def test_binary_and_json_frames_mix(read_size):
+	encoder = FrameEncoder()
+	assert encoder.negotiate_codec(['binary', 'json'])
+	status = {'type': 'status_update', 'lane_id': '3'}
+	heartbeat = encoder.encode(HEARTBEAT)
+	assert heartbeat[:1] == b'\x00'
+	decoded, stats = read_all(heartbeat + encoder.encode(status) + heartbeat, read_size=read_size)
+	assert decoded == [HEARTBEAT, status, HEARTBEAT]
+	assert stats['binary'] == 2
+
+def test_binary_payload_falls_back_to_json_without_the_codec():
+	binary = FrameEncoder()
+	binary.negotiate_codec(['binary'])
+	line = binary.serialize(HEARTBEAT)
+	assert FrameEncoder().frame(line) == json.dumps(HEARTBEAT).encode('utf-8') + b'\n'
@@ -0,0 +1,93 @@
+import json
+
+from session_stream import SessionStream
+
+def started(**kwargs):
+	stream = SessionStream(**kwargs)
+	assert stream.on_registered({'session': {'resumed': False}}) is None
+	return stream
+
+def sent(data: bytes):
+	return json.loads(data)
+
+def test_disabled_until_the_server_confirms_sessions():
+	stream = SessionStream()
+	message = {'type': 'status_update'}
+	assert sent(stream.encode(message)) == message
+	assert not stream.unacked
+	assert stream.on_registered({'type': 'registration_response'}) is None
+	assert not stream.enabled
+
+def test_sequences_and_buffers_without_touching_the_callers_dict():
+	stream = started()
+	message = {'type': 'status_update'}
+	first, second = sent(stream.encode(message)), sent(stream.encode(message))
+	assert message == {'type': 'status_update'}
+	assert (first['msg_seq'], second['msg_seq']) == (1, 2)
+	assert [seq for seq, _ in stream.unacked] == [1, 2]
+	assert 'msg_seq' not in sent(stream.encode({'type': 'heartbeat'}))
+
+def test_outbound_messages_carry_pending_acks_once():
+	stream = started()
+	assert stream.accept({'type': 'x', 'msg_seq': 1}) is True
+	assert stream.needs_ack()
+	assert sent(stream.encode({'type': 'heartbeat'}))['ack_seq'] == 1
+	assert not stream.needs_ack()
+	assert 'ack_seq' not in sent(stream.encode({'type': 'heartbeat'}))
+
+def test_acks_release_the_replay_buffer():
+	stream = started()
+	for _ in range(3):
+		stream.encode({'type': 'status_update'})
+	stream.accept({'type': 'heartbeat_response', 'ack_seq': 2})
+	assert [seq for seq, _ in stream.unacked] == [3]
+	stream.on_ack(3)
+	assert not stream.unacked and stream.unacked_bytes == 0
+
+def test_inbound_duplicates_and_gaps():
+	stream = started()
+	assert stream.accept({'msg_seq': 1}) is True
+	assert stream.accept({'msg_seq': 1}) is False
+	assert stream.accept({'msg_seq': 3}) is None
+	assert stream.resend_request() == {'type': 'session_resend', 'from_seq': 2}
+	assert stream.resend_request() is None  # Already asked for this gap
+	assert stream.accept({'msg_seq': 2}) is True
+	assert stream.accept({'type': 'unsequenced'}) is True
+	assert stream.stats['duplicates'] == 1 and stream.stats['gaps'] == 1
+
+def test_resume_replays_only_unacked_messages():
+	stream = started()
+	payloads = [stream.encode({'type': 'status_update', 'n': n}) for n in range(3)]
+	stream.accept({'msg_seq': 1})
+	assert stream.resume_info() == {'session_id': stream.session_id, 'last_received_seq': 1}
+	assert stream.on_registered({'session': {'resumed': True, 'ack_seq': 1}}) == payloads[1:]
+	assert stream.stats['resumes'] == 1
+
+def test_fresh_session_restarts_numbering():
+	stream = started()
+	stream.encode({'type': 'status_update'})
+	stream.accept({'msg_seq': 1})
+	assert stream.on_registered({'session': {'resumed': False}}) is None
+	assert (stream.next_seq, stream.last_received, len(stream.unacked)) == (1, 0, 0)
+
+def test_overflow_falls_back_to_a_full_resync():
+	stream = started(max_messages=2)
+	for n in range(4):
+		stream.encode({'type': 'status_update', 'n': n})
+	assert stream.overflowed and [seq for seq, _ in stream.unacked] == [3, 4]
+	assert stream.on_registered({'session': {'resumed': True, 'ack_seq': 1}}) is None
+	assert not stream.unacked
+
+def test_overflow_is_harmless_when_the_server_already_has_the_dropped_messages():
+	stream = started(max_bytes=120)
+	payloads = [stream.encode({'type': 'status_update', 'n': n}) for n in range(4)]
+	dropped = 4 - len(stream.unacked)
+	assert stream.overflowed and dropped
+	replay = stream.on_registered({'session': {'resumed': True, 'ack_seq': dropped}})
+	assert replay == payloads[dropped:]
+
+def test_custom_serializer_gets_the_stamped_message():
+	stream = started()
+	seen = []
+	stream.encode({'type': 'status_update'}, lambda message: seen.append(message) or b'x')
+	assert seen == [{'type': 'status_update', 'msg_seq': 1}]
@@ -0,0 +1,132 @@
+import asyncio
+
+from task_supervisor import TaskSupervisor
+
+class Flaky:
+	"""Task factory whose first `failures` runs crash, then runs until cancelled"""
+	def __init__(self, failures):
+		self.failures = failures
+		self.runs = 0
+
+	async def __call__(self):
+		self.runs += 1
+		if self.runs <= self.failures:
+			raise RuntimeError(f"crash {self.runs}")
+		await asyncio.Event().wait()
+
+def row(supervisor, name):
+	return next(entry for entry in supervisor.table() if entry['name'] == name)
+
+async def wait_for(condition, timeout=2.0):
+	deadline = asyncio.get_running_loop().time() + timeout
+	while not condition():
+		assert asyncio.get_running_loop().time() < deadline, "timed out"
+		await asyncio.sleep(0.01)
+
+def test_crashed_critical_task_is_restarted():
+	async def run():
+		supervisor = TaskSupervisor(base_delay=0.01)
+		flaky = Flaky(failures=2)
+		supervisor.spawn('listener', flaky, critical=True)
+		await wait_for(lambda: flaky.runs == 3)
+		await asyncio.sleep(0.02)
+		entry = row(supervisor, 'listener')
+		await supervisor.stop()
+		return entry, row(supervisor, 'listener')['state']
+	entry, stopped = asyncio.run(run())
+	assert (entry['state'], entry['restarts'], entry['critical']) == ('running', 2, True)
+	assert entry['last_error'] == 'RuntimeError: crash 2' and entry['uptime'] >= 0
+	assert stopped == 'cancelled'
+
+def test_critical_task_that_exits_is_restarted_but_not_while_stopping():
+	async def run():
+		running = [True]
+		supervisor = TaskSupervisor(base_delay=0.01, keep_running=lambda: running[0])
+		runs = []
+		async def once():
+			runs.append(1)
+		supervisor.spawn('writer', once, critical=True)
+		await wait_for(lambda: len(runs) == 2)
+		running[0] = False  # The owner is shutting down, so the pending restart is dropped
+		await asyncio.sleep(0.05)
+		stopped = row(supervisor, 'writer')
+
+		supervisor = TaskSupervisor(keep_running=lambda: False)
+		supervisor.spawn('writer', once, critical=True)
+		await asyncio.sleep(0.01)
+		return len(runs), stopped, row(supervisor, 'writer')
+	runs, stopped, exited = asyncio.run(run())
+	assert runs == 3 and stopped['restarts'] == 1 and stopped['last_error'] == 'exited unexpectedly'
+	assert stopped['state'] == 'cancelled' and exited['state'] == 'done'
+
+def test_failed_task_that_is_not_critical_stays_down():
+	async def run():
+		supervisor = TaskSupervisor(base_delay=0.01)
+		flaky = Flaky(failures=1)
+		supervisor.spawn('metrics', flaky)
+		await asyncio.sleep(0.05)
+		return flaky.runs, row(supervisor, 'metrics')
+	runs, entry = asyncio.run(run())
+	assert runs == 1 and (entry['state'], entry['restarts'], entry['uptime']) == ('failed', 0, 0.0)
+
+def test_task_out_of_restart_budget_waits_for_the_window():
+	async def run():
+		supervisor = TaskSupervisor(max_restarts=2, restart_window=0.3, base_delay=0.01)
+		flaky = Flaky(failures=3)
+		supervisor.spawn('heartbeat', flaky, critical=True)
+		await wait_for(lambda: flaky.runs == 3)
+		await asyncio.sleep(0.05)
+		exhausted = row(supervisor, 'heartbeat')
+		runs_while_failed = flaky.runs
+		await wait_for(lambda: flaky.runs == 4)  # Tried again once the oldest restart leaves the window
+		await asyncio.sleep(0.02)
+		recovered = row(supervisor, 'heartbeat')
+		await supervisor.stop()
+		return exhausted, runs_while_failed, recovered
+	exhausted, runs_while_failed, recovered = asyncio.run(run())
+	assert (exhausted['state'], exhausted['restarts'], runs_while_failed) == ('failed', 2, 3)
+	assert exhausted['last_error'] == 'RuntimeError: crash 3'
+	assert (recovered['state'], recovered['restarts']) == ('running', 3)
+
+def test_stop_cancels_pending_restarts():
+	async def run():
+		supervisor = TaskSupervisor(base_delay=0.05)
+		flaky = Flaky(failures=1)
+		supervisor.spawn('processor', flaky, critical=True)
+		await asyncio.sleep(0.01)
+		assert row(supervisor, 'processor')['state'] == 'restarting'
+		await supervisor.stop()
+		await asyncio.sleep(0.1)
+		return flaky.runs, row(supervisor, 'processor')['state']
+	assert asyncio.run(run()) == (1, 'cancelled')
+
+def test_spawn_refuses_a_running_name_and_replaces_a_finished_one():
+	async def run():
+		supervisor = TaskSupervisor()
+		first = supervisor.spawn('p2p', Flaky(failures=0))
+		try:
+			supervisor.spawn('p2p', Flaky(failures=0))
+		except RuntimeError:
+			refused = True
+		first.cancel()
+		await asyncio.sleep(0)
+		second = supervisor.spawn('p2p', Flaky(failures=0))
+		table = supervisor.table()
+		await supervisor.stop()
+		return refused, second is not first, [entry['name'] for entry in table]
+	assert asyncio.run(run()) == (True, True, ['p2p'])
+
+def test_client_task_table(lane_client):
+	async def run():
+		client = lane_client.AsyncLaneClient(lane_id='1', host='127.0.0.1', port=1)
+		client.supervisor = TaskSupervisor(base_delay=0.01)
+		flaky = Flaky(failures=1)
+		client.supervisor.spawn('listener', flaky, critical=True)
+		client.supervisor.spawn('metrics', Flaky(failures=1))
+		await wait_for(lambda: flaky.runs == 2)
+		table = client.get_task_table()
+		await client.supervisor.stop()
+		return table
+	table = {entry['name']: entry for entry in asyncio.run(run())}
+	assert (table['listener']['state'], table['listener']['restarts']) == ('running', 1)
+	assert (table['metrics']['state'], table['metrics']['last_error']) == ('failed', 'RuntimeError: crash 1')
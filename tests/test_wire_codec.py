@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+from wire_codec import BINARY_PREFIX, decode_message, encode_message, frame_size
+
+DELTA = {
+	'type': 'game_delta', 'msg_seq': 70000, 'ack_seq': 12, 'lane_id': '3', 'from_lane': '4',
+	'game_id': 'g-1', 'seq': 9,
+	'changes': [
+		{'kind': 'ball', 'bowler': 0, 'frame': 2, 'ball': 1, 'value': 5, 'symbol': '5', 'pin_config': [1, 1, 0, 0, 0]},
+		{'kind': 'ball', 'bowler': 1, 'frame': 0, 'ball': 0, 'value': -1, 'symbol': 'F', 'pin_config': [0, 0, 0, 0, 0]},
+		{'kind': 'totals', 'bowler': 0, 'frames': {'0': 15, '1': 30}, 'total_score': 30},
+		{'kind': 'bowler', 'bowler': 1},
+	]
+}
+
+@pytest.mark.parametrize('message', [
+	{'type': 'heartbeat', 'lane_id': '3', 'timestamp': '2026-10-19 12:34:56'},
+	{'type': 'heartbeat_response', 'ack_seq': 4},
+	{'type': 'ping', 'ping_id': 'p-1', 'from_lane': '4'},
+	{'type': 'pong', 'ping_id': 'p-1'},
+	{'type': 'session_ack', 'ack_seq': 40},
+	DELTA,
+])
+def test_round_trip(message):
+	frame = encode_message(message)
+	assert frame[:1] == BINARY_PREFIX
+	assert frame_size(frame) == len(frame)
+	assert decode_message(frame) == message
+	assert len(frame) < len(json.dumps(message))
+
+def test_same_timestamp_packs_the_same_from_any_caller():
+	first = {'type': 'heartbeat', 'timestamp': '2026-10-19 12:34:56'}
+	second = {'type': 'heartbeat', 'timestamp': '2026-10-19 12:34:57'}
+	assert decode_message(encode_message(first)) == first
+	assert decode_message(encode_message(second)) == second
+	assert decode_message(encode_message(first)) == first
+
+@pytest.mark.parametrize('message', [
+	{'type': 'status_update'},
+	{'type': 'heartbeat', 'extra': 1},
+	{'type': 'heartbeat', 'timestamp': '2026-10-19T12:34:56'},
+	{'type': 'heartbeat', 'timestamp': '2026-13-19 12:34:56x'},
+	{'type': 'heartbeat', 'timestamp': 1700000000},
+	{'type': 'ping', 'ping_id': 'x' * 256},
+	{'type': 'session_ack', 'ack_seq': -1},
+	dict(DELTA, changes=[{'kind': 'ball', 'bowler': 0}]),
+	dict(DELTA, changes=[{'kind': 'pins', 'bowler': 0}]),
+	dict(DELTA, note='x'),
+])
+def test_messages_without_a_binary_form_raise_value_error(message):
+	with pytest.raises(ValueError):
+		encode_message(message)
+
+def test_frame_size_needs_the_length_field():
+	frame = encode_message({'type': 'pong', 'ping_id': 'p'})
+	assert frame_size(frame[:2]) == 0
+	assert frame_size(frame[:3]) == len(frame)
+
+@pytest.mark.parametrize('corrupt', [
+	lambda frame: frame[:-1],
+	lambda frame: frame + b'\x00',
+	lambda frame: frame[:3] + b'\x7f' + frame[4:],
+	lambda frame: frame[:10],
+])
+def test_corrupt_frames_raise_value_error(corrupt):
+	with pytest.raises(ValueError):
+		decode_message(corrupt(encode_message(DELTA)))
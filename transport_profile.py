@@ -0,0 +1,130 @@
+"""
+Socket tuning for lane connections.
+
+A TransportProfile is applied to every lane socket right after it
+connects (server link and both ends of the P2P link): TCP_NODELAY so a
+small pin-control message is not held back by Nagle, OS keepalive with
+short timings so a half-open link is torn down by the kernel, an
+optional TCP_USER_TIMEOUT for data that is never acknowledged, and
+optional buffer sizes. Options the platform lacks are skipped. Each
+tuned connection gets a ConnectionStats record with what was applied,
+traffic counters and, on Linux, the kernel's own RTT and retransmit
+figures from TCP_INFO.
+"""
+
+import logging
+import socket
+import struct
+import time
+from dataclasses import dataclass, fields
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# struct tcp_info up to tcpi_total_retrans: 8 u8 fields then 24 u32 fields
+_TCP_INFO = struct.Struct('8B24I')
+TCP_ESTABLISHED = 1  # tcpi_state
+
+@dataclass
+class TransportProfile:
+	nodelay: bool = True
+	keepalive: bool = True
+	keepalive_idle: int = 10  # Seconds of silence before the first probe
+	keepalive_interval: int = 3  # Seconds between probes
+	keepalive_count: int = 3  # Unanswered probes before the kernel drops the link
+	user_timeout_ms: Optional[int] = 20000  # Max time sent data may stay unacknowledged (Linux)
+	send_buffer: Optional[int] = None  # None keeps the OS default
+	recv_buffer: Optional[int] = None
+
+	@classmethod
+	def from_settings(cls, settings: Optional[Dict[str, Any]]) -> 'TransportProfile':
+		"""Profile from the 'Transport' block of settings.json; unknown keys are ignored"""
+		names = {field.name for field in fields(cls)}
+		return cls(**{key: value for key, value in (settings or {}).items() if key in names})
+
+	def apply(self, sock: Optional[socket.socket]) -> Dict[str, Any]:
+		"""Set the profile's options on a connected TCP socket; returns what was applied"""
+		applied: Dict[str, Any] = {}
+		if sock is None:
+			return applied
+		options = [(socket.IPPROTO_TCP, 'TCP_NODELAY', int(self.nodelay), 'nodelay')]
+		options.append((socket.SOL_SOCKET, 'SO_KEEPALIVE', int(self.keepalive), 'keepalive'))
+		if self.keepalive:
+			# macOS names the idle time TCP_KEEPALIVE
+			idle = 'TCP_KEEPIDLE' if hasattr(socket, 'TCP_KEEPIDLE') else 'TCP_KEEPALIVE'
+			options += [
+				(socket.IPPROTO_TCP, idle, self.keepalive_idle, 'keepalive_idle'),
+				(socket.IPPROTO_TCP, 'TCP_KEEPINTVL', self.keepalive_interval, 'keepalive_interval'),
+				(socket.IPPROTO_TCP, 'TCP_KEEPCNT', self.keepalive_count, 'keepalive_count')
+			]
+		if self.user_timeout_ms is not None:
+			options.append((socket.IPPROTO_TCP, 'TCP_USER_TIMEOUT', self.user_timeout_ms, 'user_timeout_ms'))
+		if self.send_buffer:
+			options.append((socket.SOL_SOCKET, 'SO_SNDBUF', self.send_buffer, 'send_buffer'))
+		if self.recv_buffer:
+			options.append((socket.SOL_SOCKET, 'SO_RCVBUF', self.recv_buffer, 'recv_buffer'))
+
+		for level, name, value, key in options:
+			option = getattr(socket, name, None)
+			if option is None:
+				continue
+			try:
+				sock.setsockopt(level, option, value)
+				applied[key] = value
+			except OSError as e:
+				logger.debug(f"Could not set {name}: {e}")
+		return applied
+
+def tcp_info(sock: Optional[socket.socket]) -> Dict[str, Any]:
+	"""Kernel view of a TCP connection (Linux only, empty elsewhere)"""
+	if sock is None or not hasattr(socket, 'TCP_INFO'):
+		return {}
+	try:
+		raw = sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_INFO, _TCP_INFO.size)
+		info = _TCP_INFO.unpack(raw[:_TCP_INFO.size])
+	except (OSError, struct.error):
+		return {}
+	return {
+		'state': info[0],
+		'rtt_ms': info[23] / 1000,
+		'rttvar_ms': info[24] / 1000,
+		'unacked': info[12],
+		'lost': info[14],
+		'retransmits': info[31]
+	}
+
+class ConnectionStats:
+	def __init__(self, label: str, writer, options: Dict[str, Any]):
+		self.label = label
+		self.writer = writer
+		self.options = options
+		self.peer = writer.get_extra_info('peername')
+		self.local = writer.get_extra_info('sockname')
+		self.opened_at = time.time()
+		self.bytes_sent = 0
+		self.writes = 0
+
+	def sent(self, size: int):
+		self.bytes_sent += size
+		self.writes += 1
+
+	def snapshot(self) -> Dict[str, Any]:
+		stats = {
+			'label': self.label,
+			'peer': list(self.peer) if self.peer else None,
+			'local': list(self.local) if self.local else None,
+			'age': round(time.time() - self.opened_at, 1),
+			'open': not self.writer.is_closing(),
+			'options': self.options,
+			'bytes_sent': self.bytes_sent,
+			'writes': self.writes
+		}
+		if stats['open']:
+			stats.update(tcp_info(self.writer.get_extra_info('socket')))
+		return stats
+
+def tune_connection(writer, profile: TransportProfile, label: str) -> ConnectionStats:
+	"""Apply the profile to a stream's socket and start its stats record"""
+	options = profile.apply(writer.get_extra_info('socket'))
+	logger.debug(f"Tuned {label} connection: {options}")
+	return ConnectionStats(label, writer, options)
@@ -0,0 +1,113 @@
+"""
+Single path from lane events to the Tk thread.
+
+Tk widgets may only be touched from the thread running mainloop, while
+dispatcher events arrive on the lane client's loop thread. Each Tk root
+(BaseUI) owns a UIBridge, and listeners that touch its widgets are
+registered through ui_listener() with that bridge: called on the Tk
+thread they run at once, called from any other thread they go on the
+bridge's thread-safe queue, which it drains with after() every
+interval_ms, up to max_per_tick calls per tick so a burst cannot stall
+redraws. Stopping one root's bridge leaves the others untouched. The
+client loop never waits on Tk work, and an event reaches the screen
+within one tick. UI listeners are plain functions - there is no loop on
+the Tk thread to await in. Games reach another component's handler with
+notify() on their lane's dispatcher instead of indexing its listeners.
+Queue depth and the time from an event being posted to its handler
+running go to the lane's metrics.
+"""
+
+import asyncio
+import functools
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from event_dispatcher import dispatcher
+from lane_metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+class UIBridge:
+	def __init__(self, root, interval_ms: int = 20, max_per_tick: int = 50, lane_id: Optional[str] = None):
+		self.root = root
+		self.interval_ms = interval_ms
+		self.max_per_tick = max_per_tick
+		self.queue = queue.SimpleQueue()  # (posted at, fn, args)
+		self.tk_thread = threading.get_ident()  # Created on the thread that runs mainloop
+		self._after_id = None
+		self.running = False
+		metrics = get_metrics(lane_id)
+		metrics.gauge('queue_depth', self.queue.qsize, queue='ui')
+		self._latency = metrics.histogram('ui_event_latency_ms')
+		self._calls = metrics.counter('ui_calls')
+		self._errors = metrics.counter('ui_errors')
+
+	def on_tk_thread(self) -> bool:
+		return threading.get_ident() == self.tk_thread
+
+	def post(self, fn: Callable, *args):
+		"""Run fn(*args) on the Tk thread at the next tick; safe from any thread"""
+		self.queue.put((time.perf_counter(), fn, args))
+
+	def call(self, fn: Callable, *args) -> Any:
+		"""Run fn now if this is the Tk thread, otherwise post it"""
+		if self.on_tk_thread():
+			return fn(*args)
+		if not self.running:
+			logger.warning(f"UI stopped, dropping call to {getattr(fn, '__name__', fn)}")
+			return None
+		self.post(fn, *args)
+		return None
+
+	def start(self):
+		"""Start draining on the Tk thread"""
+		self.running = True
+		if self._after_id is None:
+			self._after_id = self.root.after(self.interval_ms, self._drain)
+
+	def stop(self):
+		self.running = False
+		if self._after_id is not None:
+			self.root.after_cancel(self._after_id)
+			self._after_id = None
+
+	def _drain(self):
+		try:
+			for _ in range(self.max_per_tick):
+				try:
+					posted, fn, args = self.queue.get_nowait()
+				except queue.Empty:
+					break
+				self._latency.observe((time.perf_counter() - posted) * 1000)
+				self._calls.inc()
+				try:
+					fn(*args)
+				except Exception as e:
+					self._errors.inc()
+					logger.error(f"Error in UI call {getattr(fn, '__name__', fn)}: {e}")
+		finally:
+			if self.running:
+				self._after_id = self.root.after(self.interval_ms, self._drain)
+
+def ui_listener(handler: Callable, bridge: Optional[UIBridge]) -> Callable:
+	"""Dispatcher listener that runs handler on the Tk thread of the root owning bridge"""
+	if asyncio.iscoroutinefunction(handler):
+		raise TypeError(f"UI listener {handler.__name__} must be a plain function")
+	if bridge is None:
+		return handler  # Headless (no Tk root) - called directly as before
+
+	@functools.wraps(handler)
+	def listener(data=None):
+		return bridge.call(handler, data)
+	return listener
+
+def notify(event: str, data: Any = None, lane_dispatcher=None) -> bool:
+	"""Call the first listener registered for event on the lane's dispatcher (the shared one by default); False if there is none"""
+	handlers = (lane_dispatcher or dispatcher).listeners.get(event)
+	if not handlers:
+		return False
+	handlers[0](data)
+	return True
@@ -0,0 +1,224 @@
+"""
+Compact binary wire format for the lane protocol's frequent messages.
+
+Lanes and servers offer the wire codecs they read in WIRE_CODECS
+('codecs' in the registration and p2p_offer); JSON lines stay the
+default and are always understood. Once the other side lists 'binary',
+heartbeats, their responses, pings, session acks and game_delta
+messages made only of ball/totals/bowler changes are sent as a binary
+record: BINARY_PREFIX, the body length, a type id and a flags byte for
+the optional fields, then struct-packed values with each ball's pins as
+one mask byte (the game_record_codec encoding). Anything the format
+does not cover raises ValueError from encode_message() and goes out as
+JSON. The prefix byte never starts a JSON line or a compressed frame, so
+both forms share one stream.
+"""
+
+import struct
+from typing import Any, Dict, Tuple
+
+from game_record_codec import BALL_EXPLICIT_VALUE, PIN_CONFIGS, PIN_MASKS
+
+BINARY_PREFIX = b'\x00'
+WIRE_CODECS = ['binary', 'json']
+
+HEADER = struct.Struct('<cHBB')  # prefix, body length (after the length field), type id, flags
+LENGTH_END = 3  # Prefix plus length field
+U32 = struct.Struct('<I')
+TIME = struct.Struct('<HBBBBB')  # year, month, day, hour, minute, second
+DELTA = struct.Struct('<IB')  # seq, change count
+BALL = struct.Struct('<BBBB')  # bowler, frame, ball, pin mask
+TOTALS = struct.Struct('<BHB')  # bowler, total_score, frame count
+FRAME_TOTAL = struct.Struct('<BH')
+VALUE = struct.Struct('<h')
+
+TIME_FORMAT = '%04d-%02d-%02d %02d:%02d:%02d'
+
+MSG_SEQ = 0x01
+ACK_SEQ = 0x02
+LANE_ID = 0x04
+FROM_LANE = 0x08
+TIMESTAMP = 0x10
+PING_ID = 0x20
+
+CONTROL_TYPES = ['heartbeat', 'heartbeat_response', 'ping', 'pong', 'session_ack']
+GAME_DELTA = 16
+TYPE_IDS = {message_type: type_id for type_id, message_type in enumerate(CONTROL_TYPES, 1)}
+TYPE_IDS['game_delta'] = GAME_DELTA
+TYPE_NAMES = {type_id: message_type for message_type, type_id in TYPE_IDS.items()}
+
+COMMON_KEYS = {'type', 'msg_seq', 'ack_seq', 'lane_id', 'from_lane'}
+CONTROL_KEYS = COMMON_KEYS | {'timestamp', 'ping_id'}
+DELTA_KEYS = COMMON_KEYS | {'game_id', 'seq', 'changes'}
+
+KIND_BALL = 1
+KIND_TOTALS = 2
+KIND_BOWLER = 3
+BALL_CHANGE_KEYS = {'kind', 'bowler', 'frame', 'ball', 'value', 'symbol', 'pin_config'}
+TOTALS_CHANGE_KEYS = {'kind', 'bowler', 'frames', 'total_score'}
+BOWLER_CHANGE_KEYS = {'kind', 'bowler'}
+
+def _pack_str(body: bytearray, text: Any):
+	if not isinstance(text, str):
+		raise ValueError(f"Expected a string, got {type(text).__name__}")
+	data = text.encode('utf-8')
+	if len(data) > 255:
+		raise ValueError(f"String too long for a binary frame: {text[:20]}...")
+	body.append(len(data))
+	body += data
+
+def _unpack_str(data: bytes, pos: int) -> Tuple[str, int]:
+	end = pos + 1 + data[pos]
+	return data[pos + 1:end].decode('utf-8'), end
+
+def _pack_time(body: bytearray, timestamp: Any):
+	"""'%Y-%m-%d %H:%M:%S' as 7 bytes; any other form is left to JSON"""
+	if not isinstance(timestamp, str) or len(timestamp) != 19:
+		raise ValueError(f"Unsupported timestamp {timestamp!r}")
+	values = (int(timestamp[0:4]), int(timestamp[5:7]), int(timestamp[8:10]),
+			  int(timestamp[11:13]), int(timestamp[14:16]), int(timestamp[17:19]))
+	if TIME_FORMAT % values != timestamp:
+		raise ValueError(f"Unsupported timestamp {timestamp!r}")
+	body += TIME.pack(*values)
+
+def _pack_common(message: Dict[str, Any], body: bytearray) -> int:
+	flags = 0
+	if 'msg_seq' in message:
+		flags |= MSG_SEQ
+		body += U32.pack(message['msg_seq'])
+	if 'ack_seq' in message:
+		flags |= ACK_SEQ
+		body += U32.pack(message['ack_seq'])
+	if 'lane_id' in message:
+		flags |= LANE_ID
+		_pack_str(body, message['lane_id'])
+	if 'from_lane' in message:
+		flags |= FROM_LANE
+		_pack_str(body, message['from_lane'])
+	return flags
+
+def _unpack_common(flags: int, data: bytes, pos: int, message: Dict[str, Any]) -> int:
+	if flags & MSG_SEQ:
+		message['msg_seq'], = U32.unpack_from(data, pos)
+		pos += 4
+	if flags & ACK_SEQ:
+		message['ack_seq'], = U32.unpack_from(data, pos)
+		pos += 4
+	if flags & LANE_ID:
+		message['lane_id'], pos = _unpack_str(data, pos)
+	if flags & FROM_LANE:
+		message['from_lane'], pos = _unpack_str(data, pos)
+	return pos
+
+def _pack_changes(changes: Any, body: bytearray):
+	for change in changes:
+		keys = change.keys()
+		if keys == BALL_CHANGE_KEYS and change['kind'] == 'ball':
+			mask, value = PIN_MASKS[tuple(change['pin_config'])]
+			explicit = change['value'] != value
+			body.append(KIND_BALL)
+			body += BALL.pack(change['bowler'], change['frame'], change['ball'], mask | (BALL_EXPLICIT_VALUE if explicit else 0))
+			if explicit:
+				body += VALUE.pack(change['value'])
+			_pack_str(body, change['symbol'])
+		elif keys == TOTALS_CHANGE_KEYS and change['kind'] == 'totals':
+			frames = change['frames']
+			body.append(KIND_TOTALS)
+			body += TOTALS.pack(change['bowler'], change['total_score'], len(frames))
+			for frame_idx, total in frames.items():
+				body += FRAME_TOTAL.pack(int(frame_idx), total)
+		elif keys == BOWLER_CHANGE_KEYS and change['kind'] == 'bowler':
+			body.append(KIND_BOWLER)
+			body.append(change['bowler'])
+		else:
+			raise ValueError(f"No binary form for {change.get('kind')} changes")
+
+def _unpack_changes(count: int, data: bytes, pos: int) -> Tuple[list, int]:
+	changes = []
+	for _ in range(count):
+		kind = data[pos]
+		pos += 1
+		if kind == KIND_BALL:
+			bowler, frame, ball, mask = BALL.unpack_from(data, pos)
+			pos += BALL.size
+			pins, value = PIN_CONFIGS[mask & 0x1F]
+			if mask & BALL_EXPLICIT_VALUE:
+				value, = VALUE.unpack_from(data, pos)
+				pos += VALUE.size
+			symbol, pos = _unpack_str(data, pos)
+			changes.append({'kind': 'ball', 'bowler': bowler, 'frame': frame, 'ball': ball,
+							'value': value, 'symbol': symbol, 'pin_config': list(pins)})
+		elif kind == KIND_TOTALS:
+			bowler, total_score, frame_count = TOTALS.unpack_from(data, pos)
+			pos += TOTALS.size
+			frames = {}
+			for _ in range(frame_count):
+				frame_idx, total = FRAME_TOTAL.unpack_from(data, pos)
+				pos += FRAME_TOTAL.size
+				frames[str(frame_idx)] = total  # As a JSON round trip would leave the keys
+			changes.append({'kind': 'totals', 'bowler': bowler, 'frames': frames, 'total_score': total_score})
+		elif kind == KIND_BOWLER:
+			changes.append({'kind': 'bowler', 'bowler': data[pos]})
+			pos += 1
+		else:
+			raise ValueError(f"Unknown change kind {kind}")
+	return changes, pos
+
+def encode_message(message: Dict[str, Any]) -> bytes:
+	"""Binary frame for a message, or ValueError if it has no binary form"""
+	type_id = TYPE_IDS.get(message.get('type'))
+	if type_id is None:
+		raise ValueError(f"No binary form for {message.get('type')} messages")
+	body = bytearray()
+	try:
+		flags = _pack_common(message, body)
+		if type_id == GAME_DELTA:
+			if not message.keys() <= DELTA_KEYS:
+				raise ValueError(f"Unsupported game_delta fields {message.keys() - DELTA_KEYS}")
+			_pack_str(body, message['game_id'])
+			changes = message['changes']
+			body += DELTA.pack(message['seq'], len(changes))
+			_pack_changes(changes, body)
+		else:
+			if not message.keys() <= CONTROL_KEYS:
+				raise ValueError(f"Unsupported {message['type']} fields {message.keys() - CONTROL_KEYS}")
+			if 'timestamp' in message:
+				flags |= TIMESTAMP
+				_pack_time(body, message['timestamp'])
+			if 'ping_id' in message:
+				flags |= PING_ID
+				_pack_str(body, message['ping_id'])
+		return HEADER.pack(BINARY_PREFIX, len(body) + 2, type_id, flags) + body
+	except (struct.error, KeyError, TypeError, AttributeError) as e:
+		raise ValueError(f"Cannot pack {message.get('type')}: {e}") from e
+
+def frame_size(buffer) -> int:
+	"""Total size of the binary frame at the start of buffer, or 0 if the length is not in yet"""
+	if len(buffer) < LENGTH_END:
+		return 0
+	return LENGTH_END + buffer[1] + (buffer[2] << 8)
+
+def decode_message(frame: bytes) -> Dict[str, Any]:
+	"""Message from a complete binary frame; ValueError if it is malformed"""
+	try:
+		_, length, type_id, flags = HEADER.unpack_from(frame)
+		message_type = TYPE_NAMES.get(type_id)
+		if message_type is None:
+			raise ValueError(f"Unknown binary message type {type_id}")
+		message = {'type': message_type}
+		pos = _unpack_common(flags, frame, HEADER.size, message)
+		if type_id == GAME_DELTA:
+			message['game_id'], pos = _unpack_str(frame, pos)
+			message['seq'], count = DELTA.unpack_from(frame, pos)
+			message['changes'], pos = _unpack_changes(count, frame, pos + DELTA.size)
+		else:
+			if flags & TIMESTAMP:
+				message['timestamp'] = TIME_FORMAT % TIME.unpack_from(frame, pos)
+				pos += TIME.size
+			if flags & PING_ID:
+				message['ping_id'], pos = _unpack_str(frame, pos)
+	except (struct.error, IndexError, KeyError, UnicodeDecodeError) as e:
+		raise ValueError(f"Corrupt binary frame: {e}") from e
+	if pos != LENGTH_END + length or pos != len(frame):
+		raise ValueError(f"Binary frame length mismatch ({pos} of {len(frame)} bytes)")
+	return message